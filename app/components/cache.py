@@ -15,7 +15,12 @@ Uso:
     data = get_cached_dashboard_data(db_path, fiscal_year, fiscal_method)
 """
 
+import functools
+import threading
+
 import streamlit as st
+import pandas as pd
+import numpy as np
 from typing import Dict, Any, List, Optional
 from datetime import datetime
 
@@ -64,6 +69,41 @@ def get_cached_positions(db_path: str) -> Dict[str, Any]:
         }
 
 
+def _cached_positions_frame(db_path: str) -> pd.DataFrame:
+    """
+    Posiciones de get_cached_positions como DataFrame (vacío si no hay).
+    Permite que los cálculos de YOC reutilicen la misma lectura cacheada.
+    """
+    data = get_cached_positions(db_path)
+    return data['positions'] if data['has_positions'] else pd.DataFrame()
+
+
+@st.cache_data(ttl=60, show_spinner=False)
+def get_cached_analysis_positions(db_path: str) -> Dict[str, Any]:
+    """
+    Posiciones de get_cached_positions preparadas para la página de Análisis.
+    Las conversiones de tipo se hacen una vez aquí y no en cada rerun.
+    """
+    data = get_cached_positions(db_path)
+    if not data['has_positions']:
+        return data
+
+    positions = data['positions'].copy()
+    # Columnas de baja cardinalidad como category: isin/groupby sobre códigos
+    for col in ('asset_type', 'currency'):
+        if col in positions.columns:
+            positions[col] = positions[col].astype('category')
+
+    # Columnas numéricas como buffers float64 contiguos e independientes:
+    # las reducciones de la página (sum, max, argsort...) son por columna
+    for col in ('market_value', 'cost_basis', 'unrealized_gain',
+                'unrealized_gain_pct', 'quantity', 'avg_price'):
+        if col in positions.columns:
+            positions[col] = np.ascontiguousarray(positions[col].to_numpy(dtype='float64'))
+
+    return {**data, 'positions': positions}
+
+
 @st.cache_data(ttl=120, show_spinner=False)
 def get_cached_portfolio_metrics(
     db_path: str,
@@ -127,6 +167,35 @@ def get_cached_database_stats(db_path: str) -> Dict[str, Any]:
     return stats
 
 
+@st.cache_data(ttl=300, show_spinner=False)
+def get_cached_tickers_info(db_path: str) -> pd.DataFrame:
+    """
+    Resumen por ticker de las transacciones (tabla de Gestion de Activos).
+
+    Los filtros de la pagina trabajan sobre este DataFrame, asi que cambiar
+    un widget no vuelve a leer la BD ni a repetir la agregacion.
+    """
+    from src.data import Database
+
+    db = Database(db_path=db_path)
+    tickers_info = db.get_tickers_summary()  # GROUP BY ticker en la BD
+    db.close()
+
+    if tickers_info.empty:
+        return pd.DataFrame()
+
+    tickers_info.columns = [
+        'Ticker', 'Nombre', 'Tipo', 'Divisa', 'Mercado',
+        'Primera Op.', 'Última Op.', 'Nº Operaciones'
+    ]
+    # Columnas de baja cardinalidad: los filtros comparan codigos, no strings
+    for col in ('Tipo', 'Divisa', 'Mercado'):
+        tickers_info[col] = tickers_info[col].astype('category')
+    # Columna auxiliar para la busqueda por prefijo (no se muestra)
+    tickers_info['_ticker_upper'] = tickers_info['Ticker'].str.upper()
+    return tickers_info
+
+
 # =============================================================================
 # CACHE PARA FISCAL Y DIVIDENDOS
 # =============================================================================
@@ -148,6 +217,40 @@ def get_cached_fiscal_summary(
     return summary
 
 
+@st.cache_data(ttl=300, show_spinner=False)
+def get_cached_fiscal_detail(
+    db_path: str,
+    fiscal_year: int,
+    fiscal_method: str = 'FIFO'
+) -> pd.DataFrame:
+    """
+    Obtiene el detalle de ventas del año fiscal con cache de 5 minutos.
+    """
+    from src.tax_calculator import TaxCalculator
+
+    tax = TaxCalculator(method=fiscal_method, db_path=db_path)
+    detail = tax.get_fiscal_year_detail(fiscal_year)
+    tax.close()
+    return detail
+
+
+@st.cache_data(ttl=300, show_spinner=False)
+def get_cached_wash_sales(
+    db_path: str,
+    fiscal_year: int,
+    fiscal_method: str = 'FIFO'
+) -> pd.DataFrame:
+    """
+    Obtiene las ventas afectadas por la regla de los 2 meses con cache.
+    """
+    from src.tax_calculator import TaxCalculator
+
+    tax = TaxCalculator(method=fiscal_method, db_path=db_path)
+    wash_sales = tax.get_wash_sales_in_year(fiscal_year)
+    tax.close()
+    return wash_sales
+
+
 @st.cache_data(ttl=120, show_spinner=False)
 def get_cached_dividend_totals(
     db_path: str,
@@ -164,23 +267,187 @@ def get_cached_dividend_totals(
     return totals
 
 
+@st.cache_data(ttl=300, show_spinner=False)
+def get_cached_dividend_calendar(db_path: str, year: int) -> pd.DataFrame:
+    """
+    Obtiene el calendario mensual de dividendos con cache de 5 minutos.
+    """
+    from src.dividends import DividendManager
+
+    dm = DividendManager(db_path=db_path)
+    calendar = dm.get_dividend_calendar(year)
+    dm.close()
+    return calendar
+
+
+@st.cache_data(ttl=300, show_spinner=False)
+def get_cached_dividends_by_asset(db_path: str, year: int) -> pd.DataFrame:
+    """
+    Obtiene dividendos agrupados por activo con cache de 5 minutos.
+    """
+    from src.dividends import DividendManager
+
+    dm = DividendManager(db_path=db_path)
+    by_asset = dm.get_dividends_by_asset(year=year)
+    dm.close()
+    return by_asset
+
+
+@st.cache_data(ttl=300, show_spinner=False)
+def get_cached_portfolio_yield(db_path: str) -> Dict[str, Any]:
+    """
+    Obtiene el yield on cost de la cartera con cache de 5 minutos.
+    """
+    from src.dividends import DividendManager
+
+    dm = DividendManager(db_path=db_path)
+    portfolio_yield = dm.get_portfolio_yield(positions=_cached_positions_frame(db_path))
+    dm.close()
+    return portfolio_yield
+
+
+@st.cache_data(ttl=300, show_spinner=False)
+def get_cached_dividend_yields(db_path: str) -> pd.DataFrame:
+    """
+    Obtiene el YOC de todos los activos (una sola consulta) con cache.
+    """
+    from src.dividends import DividendManager
+
+    dm = DividendManager(db_path=db_path)
+    yields = dm.get_dividend_yields_all(positions=_cached_positions_frame(db_path))
+    dm.close()
+    return yields
+
+
 @st.cache_data(ttl=120, show_spinner=False)
 def get_cached_dividends_by_ticker(
     db_path: str,
     year: int,
     ticker: Optional[str] = None
-) -> List[Dict]:
+) -> pd.DataFrame:
     """
-    Obtiene dividendos filtrados con cache.
+    Obtiene dividendos filtrados (DataFrame) con cache.
     """
     from src.dividends import DividendManager
 
     dm = DividendManager(db_path=db_path)
-    dividends = dm.get_dividends(year=year, ticker=ticker if ticker != "Todos" else None)
+    dividends = dm.get_dividends_df(year=year, ticker=ticker if ticker != "Todos" else None)
     dm.close()
     return dividends
 
 
+# =============================================================================
+# CACHE PARA BENCHMARKS Y PRECIOS DE MERCADO
+# =============================================================================
+#
+# Las fechas se pasan como 'YYYY-MM-DD' para que la clave de cache sea estable.
+
+@st.cache_data(ttl=60, show_spinner=False)
+def get_cached_download_status(db_path: str) -> pd.DataFrame:
+    """
+    Obtiene el estado de descarga de precios por activo con cache de 1 minuto.
+    """
+    from src.market_data import MarketDataManager
+
+    mdm = MarketDataManager(db_path=db_path)
+    status = mdm.get_download_status()
+    mdm.close()
+    return status
+
+
+@st.cache_data(ttl=300, show_spinner=False)
+def get_cached_investing_data(db_path: str, start_date: str, end_date: str) -> pd.DataFrame:
+    """
+    Obtiene la evolución del valor de la cartera (estilo Investing) con cache.
+    """
+    from src.market_data import MarketDataManager
+
+    mdm = MarketDataManager(db_path=db_path)
+    data = mdm.get_investing_style_data(start_date, end_date)
+    mdm.close()
+    return data
+
+
+@st.cache_data(ttl=300, show_spinner=False)
+def get_cached_portfolio_value_series(
+    db_path: str,
+    start_date: str,
+    end_date: str,
+    open_only: bool = False,
+    only_with_market_prices: bool = False
+) -> pd.DataFrame:
+    """
+    Obtiene la serie de valor de mercado de la cartera con cache.
+
+    Con open_only=True solo considera las posiciones abiertas hoy y con
+    only_with_market_prices=True omite los días sin precios de mercado.
+    """
+    from src.market_data import MarketDataManager
+
+    mdm = MarketDataManager(db_path=db_path)
+    if open_only:
+        series = mdm.get_open_positions_only_series(
+            start_date, end_date, only_with_market_prices=only_with_market_prices
+        )
+    else:
+        series = mdm.get_portfolio_market_value_series(
+            start_date, end_date, include_closed=True,
+            only_with_market_prices=only_with_market_prices
+        )
+    mdm.close()
+    return series
+
+
+@st.cache_data(ttl=300, show_spinner=False)
+def get_cached_available_benchmarks(db_path: str) -> Dict[str, Dict]:
+    """
+    Obtiene los benchmarks descargados, indexados por nombre, con cache.
+    """
+    from src.benchmarks import BenchmarkComparator
+
+    bc = BenchmarkComparator(db_path=db_path)
+    benchmarks = {b['name']: b for b in bc.get_available_benchmarks()}
+    bc.close()
+    return benchmarks
+
+
+@st.cache_data(ttl=300, show_spinner=False)
+def get_cached_benchmark_series(
+    db_path: str,
+    benchmark_name: str,
+    start_date: str,
+    end_date: str
+) -> pd.Series:
+    """
+    Obtiene la serie de un benchmark con cache de 5 minutos.
+    """
+    from src.benchmarks import BenchmarkComparator
+
+    bc = BenchmarkComparator(db_path=db_path)
+    series = bc.get_benchmark_series(benchmark_name, start_date, end_date)
+    bc.close()
+    return series
+
+
+@st.cache_data(ttl=300, show_spinner=False)
+def get_cached_risk_metrics(
+    db_path: str,
+    benchmark_name: str,
+    start_date: str,
+    end_date: str,
+    risk_free_rate: float
+) -> Dict[str, Any]:
+    """
+    Obtiene las métricas de riesgo frente a un benchmark con cache.
+    """
+    from src.benchmarks import BenchmarkComparator
+
+    bc = BenchmarkComparator(db_path=db_path)
+    metrics = bc.get_full_risk_metrics(benchmark_name, start_date, end_date, risk_free_rate)
+    bc.close()
+    return metrics
+
+
 # =============================================================================
 # CACHE PARA TRANSACCIONES (solo lectura)
 # =============================================================================
@@ -210,6 +477,104 @@ def get_cached_transactions(
     return transactions[:limit]
 
 
+# =============================================================================
+# RECURSOS COMPARTIDOS (conexiones reutilizadas entre reruns)
+# =============================================================================
+#
+# Con @st.cache_resource el objeto NO se copia ni se serializa: todas las
+# ejecuciones comparten la misma instancia. No llamar a .close() sobre ellos.
+# Su sesion ORM serviria filas desactualizadas tras una escritura: las
+# funciones invalidate_* los descartan junto a la cache de datos asociada.
+# Solo para lecturas; las escrituras usan una conexion propia y de vida corta.
+# Streamlit atiende cada sesion del navegador en su propio hilo y la sesion
+# ORM no es thread-safe: cada recurso va envuelto en _LockedResource.
+
+
+class _LockedResource:
+    """
+    Envoltorio que serializa las llamadas a un recurso compartido.
+
+    Cada metodo del recurso se ejecuta con el lock tomado, de modo que dos
+    sesiones (o un ThreadPoolExecutor) nunca usan a la vez su sesion ORM.
+    """
+
+    def __init__(self, resource):
+        self._resource = resource
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name):
+        attr = getattr(self._resource, name)
+        if not callable(attr):
+            return attr
+
+        @functools.wraps(attr)
+        def locked_call(*args, **kwargs):
+            with self._lock:
+                return attr(*args, **kwargs)
+
+        return locked_call
+
+
+@st.cache_resource(ttl=300, show_spinner=False)
+def get_shared_portfolio_service(db_path: str):
+    """
+    Obtiene un PortfolioService compartido (evita reabrir la BD en cada rerun).
+    """
+    from src.services.portfolio_service import PortfolioService
+
+    return _LockedResource(PortfolioService(db_path=db_path))
+
+
+@st.cache_resource(ttl=300, show_spinner=False)
+def get_shared_tax_calculator(db_path: str, fiscal_method: str = 'FIFO'):
+    """
+    Obtiene un TaxCalculator compartido por (cartera, metodo).
+    """
+    from src.tax_calculator import TaxCalculator
+
+    return _LockedResource(TaxCalculator(method=fiscal_method, db_path=db_path))
+
+
+@st.cache_resource(ttl=300, show_spinner=False)
+def get_shared_dividend_manager(db_path: str):
+    """
+    Obtiene un DividendManager compartido.
+    """
+    from src.dividends import DividendManager
+
+    return _LockedResource(DividendManager(db_path=db_path))
+
+
+@st.cache_resource(ttl=300, show_spinner=False)
+def get_shared_benchmark_comparator(db_path: str):
+    """
+    Obtiene un BenchmarkComparator compartido.
+    """
+    from src.benchmarks import BenchmarkComparator
+
+    return _LockedResource(BenchmarkComparator(db_path=db_path))
+
+
+@st.cache_resource(ttl=300, show_spinner=False)
+def get_shared_market_data_manager(db_path: str):
+    """
+    Obtiene un MarketDataManager compartido (conserva su cache de precios).
+    """
+    from src.market_data import MarketDataManager
+
+    return _LockedResource(MarketDataManager(db_path=db_path))
+
+
+@st.cache_resource(ttl=300, show_spinner=False)
+def get_shared_fund_service(db_path: str):
+    """
+    Obtiene un FundService compartido para las lecturas del catalogo de fondos.
+    """
+    from src.services.fund_service import FundService
+
+    return _LockedResource(FundService(db_path=db_path))
+
+
 # =============================================================================
 # FUNCIONES PARA INVALIDAR CACHE
 # =============================================================================
@@ -218,6 +583,7 @@ def invalidate_dashboard_cache():
     """Invalida cache del dashboard cuando hay cambios."""
     get_cached_dashboard_data.clear()
     get_cached_positions.clear()
+    get_cached_analysis_positions.clear()
     get_cached_portfolio_metrics.clear()
 
 
@@ -225,6 +591,23 @@ def invalidate_transaction_cache():
     """Invalida cache de transacciones cuando hay cambios."""
     get_cached_transactions.clear()
     get_cached_tickers.clear()
+    get_cached_tickers_info.clear()
+    # Ganancias realizadas y antichurning dependen de compras/ventas
+    get_cached_fiscal_summary.clear()
+    get_cached_fiscal_detail.clear()
+    get_cached_wash_sales.clear()
+    # Recursos compartidos: su sesion ORM guardaria filas ya modificadas
+    get_shared_tax_calculator.clear()
+    get_shared_portfolio_service.clear()
+    get_shared_benchmark_comparator.clear()
+    get_shared_market_data_manager.clear()
+    # Curva de valor y metricas de riesgo de Benchmarks salen del historico
+    get_cached_investing_data.clear()
+    get_cached_portfolio_value_series.clear()
+    get_cached_risk_metrics.clear()
+    # Los yields sobre coste usan las posiciones actuales
+    get_cached_portfolio_yield.clear()
+    get_cached_dividend_yields.clear()
     invalidate_dashboard_cache()
 
 
@@ -232,6 +615,24 @@ def invalidate_dividend_cache():
     """Invalida cache de dividendos cuando hay cambios."""
     get_cached_dividend_totals.clear()
     get_cached_dividends_by_ticker.clear()
+    get_cached_dividend_calendar.clear()
+    get_cached_dividends_by_asset.clear()
+    get_cached_portfolio_yield.clear()
+    get_cached_dividend_yields.clear()
+    get_shared_dividend_manager.clear()
+
+
+def invalidate_market_data_cache():
+    """Invalida cache de precios y benchmarks tras una descarga."""
+    get_cached_download_status.clear()
+    get_cached_available_benchmarks.clear()
+    get_cached_investing_data.clear()
+    get_cached_portfolio_value_series.clear()
+    get_cached_benchmark_series.clear()
+    get_cached_risk_metrics.clear()
+    # Recursos compartidos: sesion ORM y cache de precios desactualizadas
+    get_shared_benchmark_comparator.clear()
+    get_shared_market_data_manager.clear()
 
 
 def invalidate_all_cache():
@@ -239,5 +640,7 @@ def invalidate_all_cache():
     invalidate_dashboard_cache()
     invalidate_transaction_cache()
     invalidate_dividend_cache()
+    invalidate_market_data_cache()
     get_cached_currencies.clear()
     get_cached_database_stats.clear()
+    get_shared_fund_service.clear()
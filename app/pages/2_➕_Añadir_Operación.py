@@ -26,6 +26,10 @@ if not require_auth("Gestión de Operaciones", "➕"):
 from src.database import Database
 from src.logger import get_logger
 
+# Importar componentes
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from components.cache import invalidate_transaction_cache, invalidate_dividend_cache
+
 logger = get_logger(__name__)
 
 st.title("➕ Gestión de Operaciones")
@@ -236,6 +240,7 @@ with tab_buy:
             if is_valid:
                 try:
                     trans_id = db.add_transaction(data)
+                    invalidate_transaction_cache()
                     logger.info(f"Compra registrada: {buy_quantity} {buy_ticker} @ {buy_price} {buy_currency}")
                     st.session_state.operation_success = f"✅ Compra de {buy_quantity} {buy_ticker} registrada correctamente (ID: {trans_id})"
                     st.balloons()
@@ -351,6 +356,7 @@ with tab_sell:
             if is_valid:
                 try:
                     trans_id = db.add_transaction(data)
+                    invalidate_transaction_cache()
                     logger.info(f"Venta registrada: {sell_quantity} {sell_ticker} @ {sell_price} {sell_currency}")
                     st.session_state.operation_success = f"✅ Venta de {sell_quantity} {sell_ticker} registrada correctamente (ID: {trans_id})"
                     st.rerun()
@@ -446,6 +452,7 @@ with tab_dividend:
                 
                 try:
                     div_id = db.add_dividend(data)
+                    invalidate_dividend_cache()
                     logger.info(f"Dividendo registrado: {div_gross} {div_currency} de {div_ticker}")
                     st.session_state.operation_success = f"✅ Dividendo de {div_gross} {div_currency} de {div_ticker} registrado (ID: {div_id})"
                     st.rerun()
@@ -562,6 +569,7 @@ with tab_transfer:
                         'notes': f"Traspaso desde {trans_from_ticker}. {trans_notes or ''}"
                     }
                     id_in = db.add_transaction(data_in)
+                    invalidate_transaction_cache()
                     
                     # Actualizar el link en la salida
                     db.update_transaction(id_out, {'transfer_link_id': id_in})
@@ -759,6 +767,7 @@ try:
                     if st.button("✅ Sí, eliminar", type="primary"):
                         try:
                             db.delete_transaction(trans_id)
+                            invalidate_transaction_cache()
                             logger.info(f"Transacción eliminada: ID {trans_id}")
                             st.session_state.operation_success = f"✅ Operación {trans_id} eliminada correctamente"
                             st.session_state.show_delete_confirm = None
@@ -861,6 +870,7 @@ try:
                             
                             try:
                                 db.update_transaction(trans_id, update_data)
+                                invalidate_transaction_cache()
                                 logger.info(f"Transacción actualizada: ID {trans_id}")
                                 st.session_state.operation_success = f"✅ Operación {trans_id} actualizada correctamente"
                                 st.session_state.editing_transaction_id = None
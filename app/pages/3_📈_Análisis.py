@@ -5,6 +5,7 @@ Análisis detallado de rentabilidad y composición de la cartera
 
 import streamlit as st
 import pandas as pd
+import numpy as np
 import sys
 from pathlib import Path
 from datetime import datetime, timedelta
@@ -18,9 +19,6 @@ from app.components.auth import require_auth
 if not require_auth("Análisis", "📈"):
     st.stop()
 
-from src.portfolio import Portfolio
-from src.database import Database
-from src.services.portfolio_service import PortfolioService
 from src.core.utils import smart_truncate
 
 # Importar componentes
@@ -30,13 +28,229 @@ from components.charts import (
     plot_allocation_donut
 )
 from components.tables import create_positions_table
-from components.cache import get_cached_currencies, get_cached_positions
+from components.metrics import metrics_row
+from components.cache import (
+    get_cached_analysis_positions,
+    get_shared_portfolio_service
+)
+
+
+# =============================================================================
+# FUNCIONES CACHEADAS PARA RENDIMIENTO
+# =============================================================================
+
+# Opciones de ordenación -> (columna, ascendente)
+SORT_OPTIONS = {
+    "Rentabilidad % (mayor a menor)": ('unrealized_gain_pct', False),
+    "Rentabilidad % (menor a mayor)": ('unrealized_gain_pct', True),
+    "Ganancia € (mayor a menor)": ('unrealized_gain', False),
+    "Valor de mercado": ('market_value', False),
+}
+
+# Período de análisis -> días (None = todo el histórico)
+PERIOD_OPTIONS = {
+    "1 mes": 30,
+    "3 meses": 90,
+    "6 meses": 180,
+    "1 año": 365,
+    "2 años": 730,
+    "Todo": None
+}
+
+BENCHMARK_OPTIONS = ("SP500", "IBEX35", "MSCIWORLD", "EUROSTOXX50")
+
+
+@st.cache_data(ttl=300, show_spinner=False)
+def get_position_orderings(positions_key: int, _positions: pd.DataFrame) -> dict:
+    """
+    Calcula una vez las permutaciones de ordenación de las posiciones.
+    Cambiar el criterio de orden pasa a ser una indexación, no un sort.
+    """
+    orderings = {}
+    for sort_option, (col, ascending) in SORT_OPTIONS.items():
+        values = _positions[col].to_numpy()
+        orderings[sort_option] = np.argsort(values if ascending else -values, kind='stable')
+    return orderings
+
+
+@st.cache_data(ttl=300, show_spinner=False)
+def build_performance_bar(positions_key: int, sort_option: str, top_n: int,
+                          _positions: pd.DataFrame):
+    """
+    Figura de rentabilidad top-N con cache por (contenido, orden, N).
+    El top-k se obtiene por selección parcial O(N) en lugar de sort completo.
+    """
+    sort_col, sort_ascending = SORT_OPTIONS[sort_option]
+    if sort_ascending:
+        top_idx = _positions[sort_col].nsmallest(top_n).index
+    else:
+        top_idx = _positions[sort_col].nlargest(top_n).index
+
+    # Usa display_name para labels, name para tooltip
+    return plot_performance_bar(
+        _positions.loc[top_idx],
+        ticker_col='ticker',
+        performance_col='unrealized_gain_pct',
+        name_col='name',
+        display_name_col='display_name',
+        title=f"Top {top_n} por Rentabilidad",
+        top_n=top_n
+    )
+
+
+@st.cache_data(ttl=300, show_spinner=False)
+def build_asset_donut(positions_key: int, _positions: pd.DataFrame):
+    """Figura de distribución por activo con cache por contenido."""
+    return plot_allocation_donut(
+        _positions,
+        labels_col='display_name',
+        values_col='market_value',
+        names_col='name',
+        title=""
+    )
+
+
+@st.cache_data(ttl=300, show_spinner=False)
+def build_type_donut(positions_key: int, _positions: pd.DataFrame):
+    """Figura de distribución por tipo de activo con cache por contenido."""
+    # Sin ordenar grupos ni expandir categorías no observadas
+    by_type = _positions.groupby(
+        'asset_type', sort=False, observed=True, as_index=False
+    )['market_value'].sum()
+
+    type_names = {'accion': 'Acciones', 'fondo': 'Fondos', 'etf': 'ETFs'}
+    by_type['asset_type'] = by_type['asset_type'].map(type_names).fillna(by_type['asset_type'])
+
+    return plot_allocation_donut(
+        by_type,
+        labels_col='asset_type',
+        values_col='market_value',
+        title=""
+    )
+
+
+@st.cache_data(ttl=300, show_spinner=False)
+def positions_to_csv(positions_key: int, sort_option: str, _positions: pd.DataFrame) -> bytes:
+    """
+    Serializa las posiciones ordenadas a CSV con cache.
+    (positions_key, sort_option) identifican el contenido; el DataFrame no se
+    hashea para no pagar dos veces el recorrido completo.
+    """
+    return _positions.to_csv(index=False).encode('utf-8')
+
+
+@st.fragment
+def render_advanced_metrics(db_path: str, now: datetime):
+    """
+    Panel de métricas avanzadas como fragmento: cambiar período, benchmark
+    o tasa libre de riesgo solo re-ejecuta este bloque, no la página entera.
+    """
+    # Selectores de período y benchmark (st.sidebar no admite fragmentos)
+    col_period, col_bench, col_rf = st.columns(3)
+
+    with col_period:
+        # Período de análisis
+        periodo_seleccionado = st.selectbox(
+            "Período de análisis",
+            list(PERIOD_OPTIONS),
+            index=3  # Default: 1 año
+        )
+
+    with col_bench:
+        # Benchmark
+        benchmark_seleccionado = st.selectbox(
+            "Benchmark",
+            BENCHMARK_OPTIONS,
+            index=0
+        )
+
+    with col_rf:
+        # Tasa libre de riesgo
+        risk_free = st.slider(
+            "Tasa libre de riesgo (%)",
+            min_value=0.0,
+            max_value=5.0,
+            value=2.0,
+            step=0.25
+        ) / 100
+
+    # Calcular fechas
+    end_date = now.strftime('%Y-%m-%d')
+    dias = PERIOD_OPTIONS[periodo_seleccionado]
+    if dias:
+        start_date = (now - timedelta(days=dias)).strftime('%Y-%m-%d')
+    else:
+        start_date = None  # Todo el histórico
+
+    # Obtener métricas usando el servicio compartido (sin reabrir la BD)
+    service = get_shared_portfolio_service(db_path)
+    metrics = service.get_portfolio_metrics(
+        start_date=start_date,
+        end_date=end_date,
+        benchmark_name=benchmark_seleccionado,
+        risk_free_rate=risk_free
+    )
+
+    performance = metrics['performance']
+    risk = metrics['risk']
+    has_benchmark = metrics['meta']['has_benchmark_data']
+
+    beta = risk['beta']
+    beta_interpretation = "Más volátil que mercado" if beta > 1 else "Menos volátil que mercado" if beta < 1 else "Igual que mercado"
+
+    # Mostrar métricas en dos filas
+    # Fila 1: Métricas de Rendimiento
+    st.markdown("#### Rendimiento")
+    metrics_row([
+        {'title': "Retorno Total", 'value': f"{performance['total_return']:+.2%}",
+         'help': "Rentabilidad acumulada en el período"},
+        {'title': "CAGR", 'value': f"{performance['cagr']:+.2%}",
+         'help': "Tasa de crecimiento anual compuesto"},
+        {'title': "Sharpe Ratio", 'value': f"{performance['sharpe_ratio']:.2f}",
+         'help': "Retorno ajustado por riesgo. >1 es bueno, >2 es excelente"},
+        {'title': "Sortino Ratio", 'value': f"{performance['sortino_ratio']:.2f}",
+         'help': "Similar a Sharpe pero solo considera volatilidad negativa"},
+        {'title': "Alpha", 'value': f"{performance['alpha']:+.2%}",
+         'delta': f"vs {benchmark_seleccionado}" if has_benchmark else "Sin benchmark",
+         'help': "Exceso de retorno sobre el benchmark ajustado por riesgo"},
+    ], columns=5)
+
+    # Fila 2: Métricas de Riesgo
+    st.markdown("#### Riesgo")
+    metrics_row([
+        {'title': "Volatilidad", 'value': f"{risk['volatility']:.2%}",
+         'help': "Desviación estándar anualizada de los retornos"},
+        {'title': "VaR 95%", 'value': f"{risk['var_95']:.2%}",
+         'help': "Pérdida máxima esperada en un día con 95% de confianza"},
+        {'title': "Max Drawdown", 'value': f"{risk['max_drawdown']:.2%}",
+         'help': "Máxima caída desde un pico anterior"},
+        {'title': "Beta", 'value': f"{beta:.2f}",
+         'delta': beta_interpretation if has_benchmark else "Sin benchmark",
+         'help': "Sensibilidad al mercado. Beta=1 significa igual volatilidad que el benchmark"},
+    ], columns=4)
+
+    # Info sobre el período analizado
+    trading_days = metrics['meta']['trading_days']
+
+    if trading_days > 0:
+        info_text = f"Análisis basado en {trading_days} días de trading"
+        if has_benchmark:
+            info_text += f" | Benchmark: {benchmark_seleccionado}"
+        else:
+            info_text += f" | Sin datos de {benchmark_seleccionado} (Beta=1.0, Alpha=0.0)"
+        st.caption(info_text)
+    else:
+        st.warning("No hay suficientes datos históricos para calcular métricas avanzadas. Descarga precios en Configuración.")
+
 
 st.title("📈 Análisis de Cartera")
 
 # Obtener db_path
 db_path = st.session_state.get('db_path')
 
+# Instante de referencia único para fechas de análisis y nombre del CSV
+now = datetime.now()
+
 # Sidebar - Filtros
 with st.sidebar:
     st.header("🔍 Filtros")
@@ -48,8 +262,11 @@ with st.sidebar:
         default=["accion", "fondo", "etf"]
     )
 
-    # Divisa (cacheado)
-    currencies = get_cached_currencies(db_path)
+    # Divisa: derivada de las posiciones cacheadas (sin consulta extra a la BD)
+    pos_data = get_cached_analysis_positions(db_path)
+    currencies = []
+    if pos_data['has_positions'] and 'currency' in pos_data['positions'].columns:
+        currencies = sorted(pos_data['positions']['currency'].dropna().unique().tolist())
 
     currency_filter = st.multiselect(
         "Divisa",
@@ -64,9 +281,7 @@ with st.sidebar:
     )
 
 try:
-    # Cargar datos con cache
-    pos_data = get_cached_positions(db_path)
-
+    # Datos cargados con cache al construir el sidebar
     if not pos_data['has_positions']:
         st.warning("⚠️ No hay posiciones en la cartera")
         st.stop()
@@ -83,21 +298,27 @@ try:
             lambda x: smart_truncate(x, 15) if x else ''
         )
 
-    # Aplicar filtros
+    # Aplicar filtros: una sola máscara booleana y una única copia al final
+    mask = np.ones(len(positions), dtype=bool)
     if asset_filter and 'asset_type' in positions.columns:
-        positions = positions[positions['asset_type'].isin(asset_filter)]
+        mask &= positions['asset_type'].isin(asset_filter).to_numpy()
     
     if currency_filter and 'currency' in positions.columns:
-        positions = positions[positions['currency'].isin(currency_filter)]
+        mask &= positions['currency'].isin(currency_filter).to_numpy()
     
     if gain_loss_filter == "Solo ganancias":
-        positions = positions[positions['unrealized_gain'] > 0]
+        mask &= positions['unrealized_gain'].to_numpy() > 0
     elif gain_loss_filter == "Solo pérdidas":
-        positions = positions[positions['unrealized_gain'] < 0]
+        mask &= positions['unrealized_gain'].to_numpy() < 0
+    
+    positions = positions.loc[mask]
     
     if positions.empty:
         st.warning("No hay posiciones que coincidan con los filtros")
         st.stop()
+
+    # Hash del contenido filtrado: clave de las caches de orden y exportación
+    positions_key = int(pd.util.hash_pandas_object(positions).sum())
     
     # =========================================================================
     # MÉTRICAS DE RENDIMIENTO
@@ -145,160 +366,7 @@ try:
     # =========================================================================
     st.markdown("### 📈 Métricas Avanzadas de Riesgo y Rendimiento")
 
-    # Selector de período y benchmark en el sidebar
-    with st.sidebar:
-        st.markdown("---")
-        st.subheader("Métricas Avanzadas")
-
-        # Período de análisis
-        periodo_opciones = {
-            "1 mes": 30,
-            "3 meses": 90,
-            "6 meses": 180,
-            "1 año": 365,
-            "2 años": 730,
-            "Todo": None
-        }
-        periodo_seleccionado = st.selectbox(
-            "Período de análisis",
-            list(periodo_opciones.keys()),
-            index=3  # Default: 1 año
-        )
-
-        # Benchmark
-        benchmark_opciones = ["SP500", "IBEX35", "MSCIWORLD", "EUROSTOXX50"]
-        benchmark_seleccionado = st.selectbox(
-            "Benchmark",
-            benchmark_opciones,
-            index=0
-        )
-
-        # Tasa libre de riesgo
-        risk_free = st.slider(
-            "Tasa libre de riesgo (%)",
-            min_value=0.0,
-            max_value=5.0,
-            value=2.0,
-            step=0.25
-        ) / 100
-
-    # Calcular fechas
-    end_date = datetime.now().strftime('%Y-%m-%d')
-    dias = periodo_opciones[periodo_seleccionado]
-    if dias:
-        start_date = (datetime.now() - timedelta(days=dias)).strftime('%Y-%m-%d')
-    else:
-        start_date = None  # Todo el histórico
-
-    # Obtener métricas usando el servicio
-    db_path = st.session_state.get('db_path')
-    with PortfolioService(db_path=db_path) as service:
-        metrics = service.get_portfolio_metrics(
-            start_date=start_date,
-            end_date=end_date,
-            benchmark_name=benchmark_seleccionado,
-            risk_free_rate=risk_free
-        )
-
-    # Mostrar métricas en dos filas
-    # Fila 1: Métricas de Rendimiento
-    st.markdown("#### Rendimiento")
-    col1, col2, col3, col4, col5 = st.columns(5)
-
-    with col1:
-        total_ret = metrics['performance']['total_return']
-        st.metric(
-            "Retorno Total",
-            f"{total_ret:+.2%}",
-            help="Rentabilidad acumulada en el período"
-        )
-
-    with col2:
-        cagr = metrics['performance']['cagr']
-        st.metric(
-            "CAGR",
-            f"{cagr:+.2%}",
-            help="Tasa de crecimiento anual compuesto"
-        )
-
-    with col3:
-        sharpe = metrics['performance']['sharpe_ratio']
-        sharpe_color = "normal" if sharpe > 0 else "inverse"
-        st.metric(
-            "Sharpe Ratio",
-            f"{sharpe:.2f}",
-            help="Retorno ajustado por riesgo. >1 es bueno, >2 es excelente"
-        )
-
-    with col4:
-        sortino = metrics['performance']['sortino_ratio']
-        st.metric(
-            "Sortino Ratio",
-            f"{sortino:.2f}",
-            help="Similar a Sharpe pero solo considera volatilidad negativa"
-        )
-
-    with col5:
-        alpha = metrics['performance']['alpha']
-        alpha_delta = f"vs {benchmark_seleccionado}"
-        st.metric(
-            "Alpha",
-            f"{alpha:+.2%}",
-            delta=alpha_delta if metrics['meta']['has_benchmark_data'] else "Sin benchmark",
-            help="Exceso de retorno sobre el benchmark ajustado por riesgo"
-        )
-
-    # Fila 2: Métricas de Riesgo
-    st.markdown("#### Riesgo")
-    col1, col2, col3, col4 = st.columns(4)
-
-    with col1:
-        vol = metrics['risk']['volatility']
-        st.metric(
-            "Volatilidad",
-            f"{vol:.2%}",
-            help="Desviación estándar anualizada de los retornos"
-        )
-
-    with col2:
-        var = metrics['risk']['var_95']
-        st.metric(
-            "VaR 95%",
-            f"{var:.2%}",
-            help="Pérdida máxima esperada en un día con 95% de confianza"
-        )
-
-    with col3:
-        max_dd = metrics['risk']['max_drawdown']
-        st.metric(
-            "Max Drawdown",
-            f"{max_dd:.2%}",
-            help="Máxima caída desde un pico anterior"
-        )
-
-    with col4:
-        beta = metrics['risk']['beta']
-        beta_interpretation = "Más volátil que mercado" if beta > 1 else "Menos volátil que mercado" if beta < 1 else "Igual que mercado"
-        st.metric(
-            "Beta",
-            f"{beta:.2f}",
-            delta=beta_interpretation if metrics['meta']['has_benchmark_data'] else "Sin benchmark",
-            help="Sensibilidad al mercado. Beta=1 significa igual volatilidad que el benchmark"
-        )
-
-    # Info sobre el período analizado
-    trading_days = metrics['meta']['trading_days']
-    has_benchmark = metrics['meta']['has_benchmark_data']
-
-    if trading_days > 0:
-        info_text = f"Análisis basado en {trading_days} días de trading"
-        if has_benchmark:
-            info_text += f" | Benchmark: {benchmark_seleccionado}"
-        else:
-            info_text += f" | Sin datos de {benchmark_seleccionado} (Beta=1.0, Alpha=0.0)"
-        st.caption(info_text)
-    else:
-        st.warning("No hay suficientes datos históricos para calcular métricas avanzadas. Descarga precios en Configuración.")
+    render_advanced_metrics(db_path, now)
 
     st.divider()
 
@@ -313,18 +381,11 @@ try:
         # Selector de ordenación
         sort_option = st.selectbox(
             "Ordenar por",
-            ["Rentabilidad % (mayor a menor)", "Rentabilidad % (menor a mayor)", 
-             "Ganancia € (mayor a menor)", "Valor de mercado"]
+            list(SORT_OPTIONS.keys())
         )
         
-        if sort_option == "Rentabilidad % (mayor a menor)":
-            positions_sorted = positions.sort_values('unrealized_gain_pct', ascending=False)
-        elif sort_option == "Rentabilidad % (menor a mayor)":
-            positions_sorted = positions.sort_values('unrealized_gain_pct', ascending=True)
-        elif sort_option == "Ganancia € (mayor a menor)":
-            positions_sorted = positions.sort_values('unrealized_gain', ascending=False)
-        else:
-            positions_sorted = positions.sort_values('market_value', ascending=False)
+        orderings = get_position_orderings(positions_key, positions)
+        positions_sorted = positions.iloc[orderings[sort_option]]
     
     with col2:
         # Ajustar slider para funcionar con cualquier número de posiciones
@@ -337,16 +398,8 @@ try:
         else:
             show_top = num_positions  # Si solo hay 1 posición, mostrar esa
     
-    # Gráfico de barras (usa display_name para labels, name para tooltip)
-    fig = plot_performance_bar(
-        positions_sorted.head(show_top),
-        ticker_col='ticker',
-        performance_col='unrealized_gain_pct',
-        name_col='name',
-        display_name_col='display_name',
-        title=f"Top {show_top} por Rentabilidad",
-        top_n=show_top
-    )
+    # Gráfico de barras (figura cacheada: no se reconstruye en cada rerun)
+    fig = build_performance_bar(positions_key, sort_option, show_top, positions)
     st.plotly_chart(fig, use_container_width=True)
     
     st.divider()
@@ -356,18 +409,15 @@ try:
     # =========================================================================
     st.markdown("### 📋 Detalle de Posiciones")
     
-    # Preparar tabla con más columnas
-    detail_df = positions_sorted.copy()
-    
-    # Añadir peso en cartera
-    detail_df['weight'] = (detail_df['market_value'] / total_value * 100)
-    
-    # Seleccionar columnas para mostrar
+    # Seleccionar columnas para mostrar (solo se copian las necesarias)
     display_cols = ['ticker', 'name', 'quantity', 'avg_price', 'cost_basis', 
-                   'market_value', 'unrealized_gain', 'unrealized_gain_pct', 'weight']
+                   'market_value', 'unrealized_gain', 'unrealized_gain_pct']
     
-    available_cols = [c for c in display_cols if c in detail_df.columns]
-    detail_df = detail_df[available_cols]
+    available_cols = [c for c in display_cols if c in positions_sorted.columns]
+    detail_df = positions_sorted[available_cols].copy()
+    
+    # Añadir peso en cartera
+    detail_df['weight'] = positions_sorted['market_value'].to_numpy() * (100.0 / total_value)
     
     # Renombrar
     col_names = {
@@ -402,11 +452,11 @@ try:
     st.dataframe(detail_df, use_container_width=True, hide_index=True)
     
     # Botón de exportar
-    csv = positions_sorted.to_csv(index=False)
+    csv = positions_to_csv(positions_key, sort_option, positions_sorted)
     st.download_button(
         label="📥 Exportar análisis a CSV",
         data=csv,
-        file_name=f"analisis_cartera_{datetime.now().strftime('%Y%m%d')}.csv",
+        file_name=f"analisis_cartera_{now.strftime('%Y%m%d')}.csv",
         mime="text/csv"
     )
     
@@ -421,33 +471,14 @@ try:
     
     with col1:
         st.markdown("#### Por Activo")
-        fig = plot_allocation_donut(
-            positions,
-            labels_col='display_name',
-            values_col='market_value',
-            names_col='name',
-            title=""
-        )
+        fig = build_asset_donut(positions_key, positions)
         st.plotly_chart(fig, use_container_width=True)
     
     with col2:
         # Por tipo de activo
         if 'asset_type' in positions.columns:
             st.markdown("#### Por Tipo de Activo")
-            
-            by_type = positions.groupby('asset_type').agg({
-                'market_value': 'sum'
-            }).reset_index()
-            
-            type_names = {'accion': 'Acciones', 'fondo': 'Fondos', 'etf': 'ETFs'}
-            by_type['asset_type'] = by_type['asset_type'].map(lambda x: type_names.get(x, x))
-            
-            fig2 = plot_allocation_donut(
-                by_type,
-                labels_col='asset_type',
-                values_col='market_value',
-                title=""
-            )
+            fig2 = build_type_donut(positions_key, positions)
             st.plotly_chart(fig2, use_container_width=True)
     
     st.divider()
@@ -456,53 +487,50 @@ try:
     # ESTADÍSTICAS ADICIONALES
     # =========================================================================
     st.markdown("### 📊 Estadísticas")
+
+    # Escalares reutilizados en los avisos y en la tabla de estadísticas
+    gain_max = positions['unrealized_gain'].max()
+    gain_min = positions['unrealized_gain'].min()
+    gain_pct_mean = positions['unrealized_gain_pct'].mean()
+    top5_concentration = positions['market_value'].nlargest(5).sum() / total_value * 100
+    
+    # Posiciones destacadas por posición entera (nan* = mismo skipna que idxmax)
+    gain_pct_values = positions['unrealized_gain_pct'].to_numpy()
+    best = positions.iloc[int(np.nanargmax(gain_pct_values))]
+    worst = positions.iloc[int(np.nanargmin(gain_pct_values))]
+    largest = positions.iloc[int(np.nanargmax(positions['market_value'].to_numpy()))]
     
     col1, col2, col3 = st.columns(3)
     
     with col1:
         st.markdown("**Mejor posición**")
-        if not positions.empty:
-            best = positions.loc[positions['unrealized_gain_pct'].idxmax()]
-            st.success(f"🏆 {best['name']}: {best['unrealized_gain_pct']:+.2f}%")
+        st.success(f"🏆 {best['name']}: {best['unrealized_gain_pct']:+.2f}%")
     
     with col2:
         st.markdown("**Peor posición**")
-        if not positions.empty:
-            worst = positions.loc[positions['unrealized_gain_pct'].idxmin()]
-            st.error(f"📉 {worst['name']}: {worst['unrealized_gain_pct']:+.2f}%")
+        st.error(f"📉 {worst['name']}: {worst['unrealized_gain_pct']:+.2f}%")
     
     with col3:
         st.markdown("**Mayor posición**")
-        if not positions.empty:
-            largest = positions.loc[positions['market_value'].idxmax()]
-            weight = (largest['market_value'] / total_value * 100)
-            st.info(f"💰 {largest['name']}: {weight:.1f}% de la cartera")
-    
-    # Tabla de estadísticas
-    stats_data = {
-        'Métrica': [
-            'Número de posiciones',
-            'Posiciones ganadoras',
-            'Posiciones perdedoras',
-            'Posición media',
-            'Mayor ganancia',
-            'Mayor pérdida',
-            'Rentabilidad media',
-            'Concentración (top 5)'
-        ],
-        'Valor': [
-            len(positions),
-            len(winners),
-            len(losers),
-            f"{total_value / len(positions):,.2f}€",
-            f"{positions['unrealized_gain'].max():+,.2f}€",
-            f"{positions['unrealized_gain'].min():+,.2f}€",
-            f"{positions['unrealized_gain_pct'].mean():+.2f}%",
-            f"{positions.nlargest(5, 'market_value')['market_value'].sum() / total_value * 100:.1f}%"
-        ]
-    }
-    
-    st.dataframe(pd.DataFrame(stats_data), use_container_width=True, hide_index=True)
+        weight = (largest['market_value'] / total_value * 100)
+        st.info(f"💰 {largest['name']}: {weight:.1f}% de la cartera")
+    
+    # Tabla de estadísticas (pares clave-valor: sin construir un DataFrame)
+    stats_data = [
+        ('Número de posiciones', len(positions)),
+        ('Posiciones ganadoras', len(winners)),
+        ('Posiciones perdedoras', len(losers)),
+        ('Posición media', f"{total_value / len(positions):,.2f}€"),
+        ('Mayor ganancia', f"{gain_max:+,.2f}€"),
+        ('Mayor pérdida', f"{gain_min:+,.2f}€"),
+        ('Rentabilidad media', f"{gain_pct_mean:+.2f}%"),
+        ('Concentración (top 5)', f"{top5_concentration:.1f}%")
+    ]
+    
+    st.markdown(
+        "| Métrica | Valor |\n|---|---|\n"
+        + "\n".join(f"| {label} | {value} |" for label, value in stats_data)
+    )
 
 except Exception as e:
     st.error(f"Error cargando datos: {e}")
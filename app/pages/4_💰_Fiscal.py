@@ -18,14 +18,31 @@ from app.components.auth import require_auth
 if not require_auth("Fiscal", "💰"):
     st.stop()
 
-from src.tax_calculator import TaxCalculator
-from src.portfolio import Portfolio
-from src.database import Database
-
 # Importar componentes
 sys.path.insert(0, str(Path(__file__).parent.parent))
 from components.charts import plot_gains_waterfall
 from components.tables import create_fiscal_table
+from components.cache import (
+    get_shared_tax_calculator,
+    get_cached_positions,
+    get_cached_fiscal_summary,
+    get_cached_fiscal_detail,
+    get_cached_wash_sales,
+    get_cached_dividend_totals
+)
+
+# Columnas del detalle fiscal -> etiqueta mostrada (en orden de visualización)
+DETAIL_COLUMNS = {
+    'sale_date': 'Fecha',
+    'ticker': 'Ticker',
+    'name': 'Nombre',
+    'quantity': 'Cantidad',
+    'cost_basis': 'Coste',
+    'sale_proceeds': 'Venta',
+    'gain_eur': 'Ganancia',
+    'days_held': 'Días'
+}
+DETAIL_COLUMN_KEYS = pd.Index(list(DETAIL_COLUMNS))
 
 st.title("💰 Información Fiscal")
 
@@ -64,15 +81,15 @@ with st.sidebar:
     """)
 
 try:
-    # Cargar datos
-    tax = TaxCalculator(method=fiscal_method, db_path=db_path)
+    # Cargar datos (instancias compartidas entre reruns: no se cierran)
+    tax = get_shared_tax_calculator(db_path, fiscal_method)
     
     # =========================================================================
     # RESUMEN FISCAL DEL AÑO
     # =========================================================================
     st.markdown(f"### 📊 Resumen Fiscal {fiscal_year}")
     
-    summary = tax.get_fiscal_year_summary(fiscal_year)
+    summary = get_cached_fiscal_summary(db_path, fiscal_year, fiscal_method)
     
     col1, col2, col3, col4 = st.columns(4)
     
@@ -116,13 +133,10 @@ try:
     # =========================================================================
     st.markdown("### 📊 Desglose de Rendimientos")
     
-    # Obtener dividendos del año
+    # Obtener dividendos del año (cacheado)
     try:
-        from src.dividends import DividendManager
-        dm = DividendManager(db_path=db_path)
-        div_totals = dm.get_total_dividends(year=fiscal_year)
+        div_totals = get_cached_dividend_totals(db_path, fiscal_year)
         dividends = div_totals.get('total_net', 0)
-        dm.close()
     except:
         dividends = 0
     
@@ -141,49 +155,36 @@ try:
     # =========================================================================
     st.markdown(f"### 📋 Detalle de Operaciones {fiscal_year}")
     
-    # Obtener detalle fiscal
-    fiscal_detail = tax.get_fiscal_year_detail(fiscal_year)
+    # Obtener detalle fiscal (cacheado)
+    fiscal_detail = get_cached_fiscal_detail(db_path, fiscal_year, fiscal_method)
     
     if not fiscal_detail.empty:
-        # Formatear tabla
-        display_df = fiscal_detail.copy()
-        
-        # Renombrar columnas si existen
-        col_renames = {
-            'sale_date': 'Fecha',
-            'ticker': 'Ticker',
-            'name': 'Nombre',
-            'quantity': 'Cantidad',
-            'cost_basis': 'Coste',
-            'sale_proceeds': 'Venta',
-            'gain': 'Ganancia',
-            'holding_days': 'Días'
-        }
-        
-        available_cols = [c for c in col_renames.keys() if c in display_df.columns]
-        display_df = display_df[available_cols]
-        display_df.columns = [col_renames[c] for c in available_cols]
+        # Renombrar columnas si existen (intersección hash, conserva el orden)
+        available_cols = DETAIL_COLUMN_KEYS.intersection(fiscal_detail.columns, sort=False)
+        display_df = fiscal_detail[available_cols].rename(columns=DETAIL_COLUMNS)
         
-        # Formatear valores
-        if 'Cantidad' in display_df.columns:
-            display_df['Cantidad'] = display_df['Cantidad'].apply(lambda x: f"{x:,.2f}")
-        if 'Coste' in display_df.columns:
-            display_df['Coste'] = display_df['Coste'].apply(lambda x: f"{x:,.2f}€")
-        if 'Venta' in display_df.columns:
-            display_df['Venta'] = display_df['Venta'].apply(lambda x: f"{x:,.2f}€")
-        if 'Ganancia' in display_df.columns:
-            display_df['Ganancia'] = display_df['Ganancia'].apply(lambda x: f"{x:+,.2f}€")
-        
-        st.dataframe(display_df, use_container_width=True, hide_index=True)
+        # Formato numérico en el cliente (sin columnas de texto intermedias)
+        st.dataframe(
+            display_df,
+            use_container_width=True,
+            hide_index=True,
+            column_config={
+                'Cantidad': st.column_config.NumberColumn(format="%.2f"),
+                'Coste': st.column_config.NumberColumn(format="%.2f€"),
+                'Venta': st.column_config.NumberColumn(format="%.2f€"),
+                'Ganancia': st.column_config.NumberColumn(format="%+.2f€")
+            }
+        )
         
-        # Estadísticas
+        # Estadísticas (reducciones booleanas, sin copias filtradas)
+        gains_col = fiscal_detail['gain_eur'].to_numpy()
         col1, col2, col3 = st.columns(3)
         with col1:
             st.metric("Operaciones", len(fiscal_detail))
         with col2:
-            st.metric("Operaciones ganadoras", len(fiscal_detail[fiscal_detail['gain'] > 0]))
+            st.metric("Operaciones ganadoras", int((gains_col > 0).sum()))
         with col3:
-            st.metric("Operaciones perdedoras", len(fiscal_detail[fiscal_detail['gain'] < 0]))
+            st.metric("Operaciones perdedoras", int((gains_col < 0).sum()))
     else:
         st.info(f"No hay ventas registradas en {fiscal_year}")
     
@@ -195,7 +196,7 @@ try:
     st.markdown("### ⚠️ Alertas Fiscales")
     
     try:
-        wash_sales_df = tax.get_wash_sales_in_year(fiscal_year)
+        wash_sales_df = get_cached_wash_sales(db_path, fiscal_year, fiscal_method)
         
         if not wash_sales_df.empty:
             st.warning(f"⚠️ Se detectaron {len(wash_sales_df)} posibles operaciones afectadas por la regla de los 2 meses")
@@ -207,11 +208,16 @@ try:
                 en los 2 meses anteriores o posteriores a la venta.
                 """)
                 
-                for _, ws in wash_sales_df.iterrows():
-                    st.markdown(f"""
-                    - **{ws.get('ticker', 'N/A')}** ({ws.get('name', '')}): 
-                      Venta el {ws.get('date', 'N/A')} con pérdida de {ws.get('loss', 0):,.2f}€.
-                    """)
+                # Una sola llamada a st.markdown para todas las ventas
+                st.markdown("\n".join(
+                    f"- **{ticker}** ({name}): Venta el {date} con pérdida de {loss:,.2f}€."
+                    for ticker, name, date, loss in zip(
+                        wash_sales_df['ticker'],
+                        wash_sales_df['name'].fillna(''),
+                        wash_sales_df['date'],
+                        wash_sales_df['loss']
+                    )
+                ))
         else:
             st.success("✅ No se detectaron operaciones afectadas por la regla de los 2 meses")
     except Exception as e:
@@ -225,19 +231,19 @@ try:
     st.markdown("### 🎯 Simulador de Venta")
     st.info("💡 Simula el impacto fiscal de una venta antes de realizarla")
     
-    # Obtener posiciones actuales para el selector
-    portfolio = Portfolio(db_path=db_path)
-    positions = portfolio.get_current_positions()
-    portfolio.close()
+    # Posiciones actuales (una sola lectura cacheada, compartida con el resto
+    # de páginas y reutilizada por el simulador y los lotes)
+    pos_data = get_cached_positions(db_path)
+    positions = pos_data['positions'] if pos_data['has_positions'] else pd.DataFrame()
     
     if not positions.empty:
         col1, col2 = st.columns(2)
         
         with col1:
             # Selector de activo
-            tickers_with_names = positions.apply(
-                lambda x: f"{x['ticker']} - {x['name']}" if x['name'] else x['ticker'], 
-                axis=1
+            names = positions['name'].fillna('')
+            tickers_with_names = positions['ticker'].where(
+                names == '', positions['ticker'] + ' - ' + names
             ).tolist()
             
             selected = st.selectbox("Selecciona activo", tickers_with_names)
@@ -314,24 +320,21 @@ try:
         )
         
         if selected_for_lots:
-            lots = tax.get_available_lots(selected_for_lots)
+            lots_df = tax.get_available_lots(selected_for_lots, as_dataframe=True)
             
-            if lots:
-                lots_df = pd.DataFrame(lots)
-                
-                # Formatear
-                if 'date' in lots_df.columns:
-                    lots_df['date'] = pd.to_datetime(lots_df['date']).dt.strftime('%Y-%m-%d')
-                if 'quantity' in lots_df.columns:
-                    lots_df['quantity'] = lots_df['quantity'].apply(lambda x: f"{x:,.2f}")
-                if 'price' in lots_df.columns:
-                    lots_df['price'] = lots_df['price'].apply(lambda x: f"{x:,.4f}€")
-                if 'total' in lots_df.columns:
-                    lots_df['total'] = lots_df['total'].apply(lambda x: f"{x:,.2f}€")
-                
-                lots_df.columns = ['Fecha', 'Cantidad', 'Precio', 'Total'][:len(lots_df.columns)]
-                
-                st.dataframe(lots_df, use_container_width=True, hide_index=True)
+            if not lots_df.empty:
+                st.dataframe(
+                    lots_df,
+                    use_container_width=True,
+                    hide_index=True,
+                    column_order=['date', 'quantity', 'price', 'cost'],
+                    column_config={
+                        'date': st.column_config.DateColumn("Fecha", format="YYYY-MM-DD"),
+                        'quantity': st.column_config.NumberColumn("Cantidad", format="%.2f"),
+                        'price': st.column_config.NumberColumn("Precio", format="%.4f€"),
+                        'cost': st.column_config.NumberColumn("Total", format="%.2f€")
+                    }
+                )
                 st.caption(f"Los lotes se venden en orden {fiscal_method} (primero el más {'antiguo' if fiscal_method == 'FIFO' else 'reciente'})")
             else:
                 st.info("No hay lotes disponibles para este activo")
@@ -348,20 +351,16 @@ try:
     with col1:
         if st.button("📥 Generar Informe Excel", use_container_width=True):
             try:
-                filepath = tax.export_fiscal_report(
-                    fiscal_year,
-                    filepath=f"data/exports/informe_fiscal_{fiscal_year}.xlsx"
-                )
-                st.success(f"✅ Informe generado: {filepath}")
+                # Generado en memoria: sin escribir ni releer el fichero
+                report = tax.export_fiscal_report_bytes(fiscal_year)
+                st.success("✅ Informe generado")
                 
-                # Ofrecer descarga
-                with open(filepath, 'rb') as f:
-                    st.download_button(
-                        label="📥 Descargar Informe",
-                        data=f,
-                        file_name=f"informe_fiscal_{fiscal_year}.xlsx",
-                        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-                    )
+                st.download_button(
+                    label="📥 Descargar Informe",
+                    data=report,
+                    file_name=f"informe_fiscal_{fiscal_year}.xlsx",
+                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                )
             except Exception as e:
                 st.error(f"Error generando informe: {e}")
     
@@ -375,8 +374,6 @@ try:
         - Información por trimestres
         - Desglose por tramos IRPF
         """)
-    
-    tax.close()
 
 except Exception as e:
     st.error(f"Error cargando datos fiscales: {e}")
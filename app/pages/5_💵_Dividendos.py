@@ -5,6 +5,7 @@ Tracking de dividendos, calendario, yields y análisis
 
 import streamlit as st
 import pandas as pd
+import io
 import sys
 from pathlib import Path
 from datetime import datetime
@@ -18,14 +19,31 @@ from app.components.auth import require_auth
 if not require_auth("Dividendos", "💵"):
     st.stop()
 
-from src.dividends import DividendManager
-from src.database import Database
-
 # Importar componentes
 sys.path.insert(0, str(Path(__file__).parent.parent))
 from components.charts import plot_dividend_calendar, plot_allocation_donut
 from components.tables import create_dividends_table
-from components.cache import get_cached_tickers, get_cached_dividend_totals
+from components.cache import (
+    get_cached_tickers,
+    get_cached_dividend_totals,
+    get_cached_dividend_calendar,
+    get_cached_dividends_by_asset,
+    get_cached_portfolio_yield,
+    get_cached_dividend_yields,
+    get_cached_dividends_by_ticker,
+    get_shared_dividend_manager
+)
+
+# Nombres de mes en español (categorías ordenadas del calendario)
+MONTHS_ES = ('Ene', 'Feb', 'Mar', 'Abr', 'May', 'Jun',
+             'Jul', 'Ago', 'Sep', 'Oct', 'Nov', 'Dic')
+
+# Confianza de la proyección -> (emoji, texto)
+CONFIDENCE_LABELS = {
+    'high': ('🟢', 'Alta'),
+    'medium': ('🟡', 'Media'),
+    'low': ('🔴', 'Baja')
+}
 
 st.title("💵 Dividendos")
 
@@ -80,33 +98,24 @@ try:
     
     st.divider()
 
-    # DividendManager para operaciones detalladas (no cacheadas)
-    dm = DividendManager(db_path=db_path)
+    # DividendManager compartido entre reruns (no se cierra)
+    dm = get_shared_dividend_manager(db_path)
 
     # =========================================================================
     # CALENDARIO DE DIVIDENDOS
     # =========================================================================
     st.markdown(f"### 📅 Calendario {div_year}")
 
-    calendar = dm.get_dividend_calendar(div_year)
+    calendar = get_cached_dividend_calendar(db_path, div_year)
     
-    if calendar:
-        # Convertir a DataFrame
-        months_es = ['Ene', 'Feb', 'Mar', 'Abr', 'May', 'Jun', 
-                     'Jul', 'Ago', 'Sep', 'Oct', 'Nov', 'Dic']
-        
-        cal_data = []
-        for month_num in range(1, 13):
-            month_data = calendar.get(month_num, {'gross': 0, 'net': 0, 'count': 0})
-            cal_data.append({
-                'month': month_num,
-                'month_name': months_es[month_num - 1],
-                'gross': month_data['gross'],
-                'net': month_data['net'],
-                'count': month_data['count']
-            })
-        
-        cal_df = pd.DataFrame(cal_data)
+    if calendar['payments'].sum() > 0:
+        cal_df = (
+            calendar.set_index('month')[['gross', 'net', 'payments']]
+            .reindex(range(1, 13), fill_value=0)
+            .rename_axis('month')
+            .reset_index()
+        )
+        cal_df['month_name'] = pd.Categorical.from_codes(cal_df['month'] - 1, MONTHS_ES, ordered=True)
         
         # Gráfico de barras
         fig = plot_dividend_calendar(cal_df, 'month_name', 'net', f"Dividendos Netos por Mes ({div_year})")
@@ -114,11 +123,19 @@ try:
         
         # Tabla mensual
         with st.expander("Ver detalle mensual"):
-            display_cal = cal_df[['month_name', 'count', 'gross', 'net']].copy()
-            display_cal.columns = ['Mes', 'Cobros', 'Bruto', 'Neto']
-            display_cal['Bruto'] = display_cal['Bruto'].apply(lambda x: f"{x:,.2f}€")
-            display_cal['Neto'] = display_cal['Neto'].apply(lambda x: f"{x:,.2f}€")
-            st.dataframe(display_cal, use_container_width=True, hide_index=True)
+            # Columnas y etiquetas vía column_order/column_config: sin copiar datos
+            st.dataframe(
+                cal_df,
+                use_container_width=True,
+                hide_index=True,
+                column_order=['month_name', 'payments', 'gross', 'net'],
+                column_config={
+                    'month_name': st.column_config.TextColumn("Mes"),
+                    'payments': st.column_config.NumberColumn("Cobros"),
+                    'gross': st.column_config.NumberColumn("Bruto", format="%.2f€"),
+                    'net': st.column_config.NumberColumn("Neto", format="%.2f€")
+                }
+            )
     else:
         st.info(f"No hay dividendos registrados en {div_year}")
     
@@ -129,27 +146,33 @@ try:
     # =========================================================================
     st.markdown(f"### 🏆 Dividendos por Activo")
     
-    by_asset = dm.get_dividends_by_asset(year=div_year)
+    by_asset = get_cached_dividends_by_asset(db_path, div_year)
     
     if not by_asset.empty:
         col1, col2 = st.columns([1, 1])
         
         with col1:
             # Tabla
-            display_asset = by_asset.copy()
-            display_asset['total_gross'] = display_asset['total_gross'].apply(lambda x: f"{x:,.2f}€")
-            display_asset['total_net'] = display_asset['total_net'].apply(lambda x: f"{x:,.2f}€")
-            display_asset['pct_of_total'] = display_asset['pct_of_total'].apply(lambda x: f"{x:.1f}%")
-            
-            display_asset.columns = ['Ticker', 'Cobros', 'Bruto', 'Neto', '% del Total']
-            st.dataframe(display_asset, use_container_width=True, hide_index=True)
+            st.dataframe(
+                by_asset,
+                use_container_width=True,
+                hide_index=True,
+                column_order=['ticker', 'payments', 'gross', 'net', 'pct_of_total'],
+                column_config={
+                    'ticker': st.column_config.TextColumn("Ticker"),
+                    'payments': st.column_config.NumberColumn("Cobros"),
+                    'gross': st.column_config.NumberColumn("Bruto", format="%.2f€"),
+                    'net': st.column_config.NumberColumn("Neto", format="%.2f€"),
+                    'pct_of_total': st.column_config.NumberColumn("% del Total", format="%.1f%%")
+                }
+            )
         
         with col2:
             # Donut chart
             fig = plot_allocation_donut(
                 by_asset,
                 labels_col='ticker',
-                values_col='total_net',
+                values_col='net',
                 title="Distribución de Dividendos"
             )
             st.plotly_chart(fig, use_container_width=True)
@@ -163,7 +186,7 @@ try:
     # =========================================================================
     st.markdown("### 📈 Yield on Cost (YOC)")
     
-    portfolio_yield = dm.get_portfolio_yield()
+    portfolio_yield = get_cached_portfolio_yield(db_path)
     
     if portfolio_yield and portfolio_yield.get('portfolio_yoc_net', 0) > 0:
         col1, col2, col3 = st.columns(3)
@@ -184,30 +207,30 @@ try:
         with col3:
             st.metric(
                 "Activos con dividendos",
-                f"{portfolio_yield['assets_with_dividends']} de {portfolio_yield['total_positions']}"
+                f"{portfolio_yield['dividend_payers']} de {portfolio_yield['total_positions']}"
             )
         
-        # YOC por activo
+        # YOC por activo (todos los tickers en una sola llamada cacheada;
+        # los activos sin coste base llegan con NaN y se descartan aquí)
         st.markdown("#### YOC por Activo")
         
-        yoc_data = []
-        for ticker in dm.db.get_all_tickers():
-            try:
-                yoc = dm.get_dividend_yield(ticker)
-                if yoc and yoc.get('yoc_net', 0) > 0:
-                    yoc_data.append({
-                        'Ticker': ticker,
-                        'YOC Bruto': f"{yoc['yoc_gross']:.2f}%",
-                        'YOC Neto': f"{yoc['yoc_net']:.2f}%",
-                        'Dividendo Anual': f"{yoc.get('annual_dividend', 0):.2f}€",
-                        'Coste Base': f"{yoc.get('cost_basis', 0):,.2f}€"
-                    })
-            except:
-                pass
+        yoc_df = get_cached_dividend_yields(db_path)
+        yoc_df = yoc_df[yoc_df['yoc_net'] > 0].dropna(subset=['yoc_gross', 'yoc_net'])
         
-        if yoc_data:
-            yoc_df = pd.DataFrame(yoc_data)
-            st.dataframe(yoc_df, use_container_width=True, hide_index=True)
+        if not yoc_df.empty:
+            st.dataframe(
+                yoc_df,
+                use_container_width=True,
+                hide_index=True,
+                column_order=['ticker', 'yoc_gross', 'yoc_net', 'annual_dividends_gross', 'cost_basis'],
+                column_config={
+                    'ticker': st.column_config.TextColumn("Ticker"),
+                    'yoc_gross': st.column_config.NumberColumn("YOC Bruto", format="%.2f%%"),
+                    'yoc_net': st.column_config.NumberColumn("YOC Neto", format="%.2f%%"),
+                    'annual_dividends_gross': st.column_config.NumberColumn("Dividendo Anual", format="%.2f€"),
+                    'cost_basis': st.column_config.NumberColumn("Coste Base", format="%.2f€")
+                }
+            )
         else:
             st.info("No hay datos de YOC disponibles")
     else:
@@ -220,47 +243,43 @@ try:
     # =========================================================================
     st.markdown("### 📋 Historial de Dividendos")
     
-    # Obtener dividendos según filtros
-    if ticker_filter == "Todos":
-        dividends = dm.get_dividends(year=div_year)
-    else:
-        dividends = dm.get_dividends(ticker=ticker_filter, year=div_year)
+    # Obtener dividendos según filtros (DataFrame directo de la BD, cacheado)
+    div_df = get_cached_dividends_by_ticker(db_path, div_year, ticker_filter)
     
-    if dividends:
-        # Convertir a DataFrame
-        div_data = []
-        for d in dividends:
-            div_data.append({
-                'id': d.id,
-                'date': d.date.strftime('%Y-%m-%d'),
-                'ticker': d.ticker,
-                'name': d.name or d.ticker,
-                'gross_amount': d.gross_amount,
-                'net_amount': d.net_amount,
-                'withholding_tax': d.withholding_tax,
-                'currency': d.currency
-            })
+    if not div_df.empty:
+        div_df['name'] = div_df['name'].fillna(div_df['ticker'])
         
-        div_df = pd.DataFrame(div_data)
-        
-        # Formatear para mostrar
-        display_div = div_df.copy()
-        display_div['gross_amount'] = display_div['gross_amount'].apply(lambda x: f"{x:.2f}€")
-        display_div['net_amount'] = display_div['net_amount'].apply(lambda x: f"{x:.2f}€")
-        display_div['withholding_tax'] = display_div['withholding_tax'].apply(lambda x: f"{x:.2f}€")
-        
-        display_div.columns = ['ID', 'Fecha', 'Ticker', 'Nombre', 'Bruto', 'Neto', 'Retención', 'Divisa']
-        
-        st.dataframe(display_div.drop('ID', axis=1), use_container_width=True, hide_index=True)
-        
-        # Exportar
-        csv = div_df.to_csv(index=False)
-        st.download_button(
-            label="📥 Exportar a CSV",
-            data=csv,
-            file_name=f"dividendos_{div_year}.csv",
-            mime="text/csv"
+        # Formato y etiquetas aplicados por Streamlit (sin copia para mostrar)
+        st.dataframe(
+            div_df,
+            use_container_width=True,
+            hide_index=True,
+            column_order=['date', 'ticker', 'name', 'gross_amount', 'net_amount',
+                          'withholding_tax', 'currency'],
+            column_config={
+                'date': st.column_config.DateColumn("Fecha", format="YYYY-MM-DD"),
+                'ticker': st.column_config.TextColumn("Ticker"),
+                'name': st.column_config.TextColumn("Nombre"),
+                'gross_amount': st.column_config.NumberColumn("Bruto", format="%.2f€"),
+                'net_amount': st.column_config.NumberColumn("Neto", format="%.2f€"),
+                'withholding_tax': st.column_config.NumberColumn("Retención", format="%.2f€"),
+                'currency': st.column_config.TextColumn("Divisa")
+            }
         )
+        
+        # Exportar (solo bajo petición, escrito por bloques en un buffer binario)
+        if st.button("📄 Preparar CSV"):
+            csv_buffer = io.BytesIO()
+            div_df[['id', 'date', 'ticker', 'name', 'gross_amount',
+                    'net_amount', 'withholding_tax', 'currency']].to_csv(
+                csv_buffer, index=False, chunksize=10_000, encoding='utf-8'
+            )
+            st.download_button(
+                label="📥 Exportar a CSV",
+                data=csv_buffer.getvalue(),
+                file_name=f"dividendos_{div_year}.csv",
+                mime="text/csv"
+            )
     else:
         st.info(f"No hay dividendos registrados" + (f" para {ticker_filter}" if ticker_filter != "Todos" else ""))
     
@@ -285,26 +304,33 @@ try:
         
         with col2:
             confidence = projection.get('confidence', 'low')
-            confidence_emoji = {'high': '🟢', 'medium': '🟡', 'low': '🔴'}
-            confidence_text = {'high': 'Alta', 'medium': 'Media', 'low': 'Baja'}
+            emoji, text = CONFIDENCE_LABELS.get(confidence, ('❓', 'Desconocida'))
             
             st.metric(
                 "Confianza",
-                f"{confidence_emoji.get(confidence, '❓')} {confidence_text.get(confidence, 'Desconocida')}"
+                f"{emoji} {text}"
             )
         
         if projection.get('by_ticker'):
             with st.expander("Ver proyección por activo"):
-                proj_data = []
-                for ticker, data in projection['by_ticker'].items():
-                    proj_data.append({
-                        'Ticker': ticker,
-                        'Estimado Anual': f"{data.get('estimated_annual', 0):.2f}€",
-                        'Pagos últimos 12m': data.get('payments_last_year', 0),
-                        'Frecuencia': data.get('frequency', 'unknown')
-                    })
+                proj_df = (
+                    pd.DataFrame.from_dict(projection['by_ticker'], orient='index')
+                    .rename_axis('ticker')
+                    .reset_index()
+                )
                 
-                st.dataframe(pd.DataFrame(proj_data), use_container_width=True, hide_index=True)
+                st.dataframe(
+                    proj_df,
+                    use_container_width=True,
+                    hide_index=True,
+                    column_order=['ticker', 'estimated_annual', 'payments_last_year', 'frequency'],
+                    column_config={
+                        'ticker': st.column_config.TextColumn("Ticker"),
+                        'estimated_annual': st.column_config.NumberColumn("Estimado Anual", format="%.2f€"),
+                        'payments_last_year': st.column_config.NumberColumn("Pagos últimos 12m"),
+                        'frequency': st.column_config.TextColumn("Frecuencia")
+                    }
+                )
     else:
         st.info("No hay suficientes datos para proyectar dividendos")
     
@@ -317,23 +343,21 @@ try:
     
     if st.button("📥 Generar Informe Excel", use_container_width=True):
         try:
-            filepath = dm.export_dividends(
-                filepath=f"data/exports/dividendos_{div_year}.xlsx",
-                year=div_year
-            )
-            st.success(f"✅ Informe generado: {filepath}")
+            # Generado en memoria: sin escribir ni releer el fichero
+            report = dm.export_dividends_bytes(year=div_year)
             
-            with open(filepath, 'rb') as f:
+            if report:
+                st.success("✅ Informe generado")
                 st.download_button(
                     label="📥 Descargar Informe",
-                    data=f,
+                    data=report,
                     file_name=f"dividendos_{div_year}.xlsx",
                     mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
                 )
+            else:
+                st.info(f"No hay dividendos para exportar en {div_year}")
         except Exception as e:
             st.error(f"Error generando informe: {e}")
-    
-    dm.close()
 
 except Exception as e:
     st.error(f"Error cargando datos: {e}")
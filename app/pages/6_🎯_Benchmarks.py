@@ -11,9 +11,9 @@ Incluye:
 
 import streamlit as st
 import pandas as pd
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
+import numpy as np
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from datetime import datetime, timedelta
 
@@ -29,6 +29,32 @@ if not require_auth("Benchmarks", "🎯"):
 from src.benchmarks import BenchmarkComparator, BENCHMARK_SYMBOLS, YFINANCE_AVAILABLE
 from src.market_data import MarketDataManager
 
+# Importar componentes
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from components.cache import (
+    get_cached_download_status,
+    get_cached_available_benchmarks,
+    get_cached_investing_data,
+    get_cached_portfolio_value_series,
+    get_cached_benchmark_series,
+    get_cached_risk_metrics,
+    invalidate_market_data_cache
+)
+
+# Benchmarks disponibles (nombre -> símbolo en BENCHMARK_SYMBOLS)
+BENCHMARK_OPTIONS = list(BENCHMARK_SYMBOLS.keys())
+
+# Período de análisis -> días
+PERIOD_OPTIONS = {
+    "1 mes": 30,
+    "3 meses": 90,
+    "6 meses": 180,
+    "1 año": 365,
+    "2 años": 730,
+    "3 años": 1095,
+    "Máximo": 3650
+}
+
 st.title("🎯 Comparación con Benchmarks")
 
 # Verificar yfinance
@@ -44,10 +70,9 @@ with st.sidebar:
     
     # Benchmark
     st.markdown("**Selecciona benchmark:**")
-    benchmark_options = list(BENCHMARK_SYMBOLS.keys())
     selected_benchmark = st.selectbox(
         "Benchmark",
-        benchmark_options,
+        BENCHMARK_OPTIONS,
         format_func=lambda x: f"{x} ({BENCHMARK_SYMBOLS[x]})",
         label_visibility="collapsed"
     )
@@ -56,24 +81,18 @@ with st.sidebar:
     
     # Período
     st.markdown("**Período de análisis:**")
-    period_options = {
-        "1 mes": 30,
-        "3 meses": 90,
-        "6 meses": 180,
-        "1 año": 365,
-        "2 años": 730,
-        "3 años": 1095,
-        "Máximo": 3650
-    }
-    
-    selected_period = st.selectbox("Período", list(period_options.keys()), index=3)
-    days = period_options[selected_period]
+    selected_period = st.selectbox("Período", list(PERIOD_OPTIONS), index=3)
+    days = PERIOD_OPTIONS[selected_period]
     
     end_date = datetime.now()
     start_date = end_date - timedelta(days=days)
     
-    st.caption(f"Desde: {start_date.strftime('%Y-%m-%d')}")
-    st.caption(f"Hasta: {end_date.strftime('%Y-%m-%d')}")
+    # Fechas formateadas una sola vez (también son la clave de la cache)
+    start_str = start_date.strftime('%Y-%m-%d')
+    end_str = end_date.strftime('%Y-%m-%d')
+    
+    st.caption(f"Desde: {start_str}")
+    st.caption(f"Hasta: {end_str}")
     
     st.divider()
     
@@ -109,11 +128,8 @@ with st.sidebar:
 db_path = st.session_state.get('db_path')
 
 try:
-    bc = BenchmarkComparator(db_path=db_path)
-    mdm = MarketDataManager(db_path=db_path)
-    
-    # Limpiar caché para asegurar datos actualizados
-    mdm.clear_price_cache()
+    # Las lecturas van por las funciones cacheadas; cada descarga escribe con
+    # un gestor propio que se cierra al terminar (nunca el compartido).
     
     # =========================================================================
     # SECCIÓN 1: GESTIÓN DE DATOS
@@ -124,14 +140,14 @@ try:
     
     # --- TAB 1: Benchmark ---
     with tab_benchmark:
-        available_benchmarks = bc.get_available_benchmarks()
-        available_names = [b['name'] for b in available_benchmarks]
+        # Benchmarks descargados por nombre (cacheado; se invalida al descargar)
+        available_benchmarks = get_cached_available_benchmarks(db_path)
         
         col1, col2 = st.columns([3, 1])
         
         with col1:
-            if selected_benchmark in available_names:
-                bench_info = next(b for b in available_benchmarks if b['name'] == selected_benchmark)
+            bench_info = available_benchmarks.get(selected_benchmark)
+            if bench_info:
                 st.success(f"✅ {selected_benchmark}: {bench_info['records']} registros ({bench_info['start_date']} → {bench_info['end_date']})")
             else:
                 st.warning(f"⚠️ No hay datos de {selected_benchmark}")
@@ -139,12 +155,17 @@ try:
         with col2:
             if st.button("📥 Descargar Benchmark", use_container_width=True):
                 with st.spinner(f"Descargando {selected_benchmark}..."):
-                    count = bc.download_benchmark(
-                        selected_benchmark,
-                        start_date.strftime('%Y-%m-%d'),
-                        end_date.strftime('%Y-%m-%d')
-                    )
+                    bc = BenchmarkComparator(db_path=db_path)
+                    try:
+                        count = bc.download_benchmark(
+                            selected_benchmark,
+                            start_str,
+                            end_str
+                        )
+                    finally:
+                        bc.close()
                     if count > 0:
+                        invalidate_market_data_cache()
                         st.success(f"✅ {count} registros")
                         st.rerun()
                     else:
@@ -159,8 +180,8 @@ try:
         necesitamos los precios históricos de tus activos.
         """)
         
-        # Mostrar estado de precios
-        download_status = mdm.get_download_status()
+        # Mostrar estado de precios (cacheado; se invalida al descargar)
+        download_status = get_cached_download_status(db_path)
         
         if not download_status.empty:
             st.dataframe(
@@ -182,33 +203,65 @@ try:
             
             with col1:
                 if st.button("📥 Descargar TODOS los precios", use_container_width=True):
-                    with st.spinner("Descargando precios de todos los activos..."):
+                    progress = st.progress(0.0, text="Descargando precios de todos los activos...")
+                    mdm = MarketDataManager(db_path=db_path)
+                    try:
                         results = mdm.download_portfolio_prices(
-                            start_date.strftime('%Y-%m-%d'),
-                            end_date.strftime('%Y-%m-%d')
+                            start_str,
+                            end_str,
+                            progress_callback=lambda done, total, ticker: progress.progress(
+                                done / total, text=f"{ticker} ({done}/{total})"
+                            )
                         )
-                        
-                        success = sum(1 for v in results.values() if v > 0)
-                        st.success(f"✅ Descargados precios de {success}/{len(results)} activos")
-                        st.rerun()
+                    finally:
+                        mdm.close()
+                    invalidate_market_data_cache()
+                    
+                    success = sum(1 for v in results.values() if v > 0)
+                    st.success(f"✅ Descargados precios de {success}/{len(results)} activos")
+                    st.rerun()
             
             with col2:
                 # Descargar solo los que faltan
                 missing = download_status[~download_status['has_prices']]['ticker'].tolist()
                 if missing:
                     if st.button(f"📥 Descargar faltantes ({len(missing)})", use_container_width=True):
-                        with st.spinner("Descargando..."):
+                        progress = st.progress(0.0, text="Descargando...")
+                        mdm = MarketDataManager(db_path=db_path)
+                        try:
                             results = mdm.download_portfolio_prices(
-                                start_date.strftime('%Y-%m-%d'),
-                                end_date.strftime('%Y-%m-%d'),
-                                tickers=missing
+                                start_str,
+                                end_str,
+                                tickers=missing,
+                                progress_callback=lambda done, total, ticker: progress.progress(
+                                    done / total, text=f"{ticker} ({done}/{total})"
+                                )
                             )
-                            st.rerun()
+                        finally:
+                            mdm.close()
+                        invalidate_market_data_cache()
+                        st.rerun()
         else:
             st.info("No hay activos en la cartera")
     
     st.divider()
     
+    # Consultas independientes de las secciones 2-4 lanzadas en paralelo:
+    # cada helper cacheado abre su propia conexión a la BD en su hilo
+    open_only = comparison_mode == "Posiciones actuales"
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        investing_future = executor.submit(
+            get_cached_investing_data, db_path, start_str, end_str
+        )
+        portfolio_future = executor.submit(
+            get_cached_portfolio_value_series, db_path, start_str, end_str,
+            open_only, True
+        )
+        risk_future = executor.submit(
+            get_cached_risk_metrics, db_path, selected_benchmark,
+            start_str, end_str, risk_free_rate
+        )
+    
     # =========================================================================
     # SECCIÓN 2: GRÁFICO ESTILO INVESTING.COM (Valor Real)
     # =========================================================================
@@ -219,51 +272,52 @@ try:
     similar a como lo hace Investing.com.
     """)
     
-    # Obtener datos estilo Investing
-    investing_data = mdm.get_investing_style_data(
-        start_date.strftime('%Y-%m-%d'),
-        end_date.strftime('%Y-%m-%d')
-    )
+    # Obtener datos estilo Investing (cacheado, consultado en paralelo)
+    investing_data = investing_future.result()
     
     if not investing_data.empty:
-        # Crear gráfico con múltiples líneas
-        fig = go.Figure()
-        
-        # Línea 1: Valor total de la cartera
-        fig.add_trace(go.Scatter(
-            x=investing_data['date'],
-            y=investing_data['total_portfolio_value'],
-            mode='lines',
-            name='Valor Total (con P&L cerrado)',
-            line=dict(color='#2E86AB', width=2),
-            hovertemplate='%{x}<br>Total: %{y:,.2f}€<extra></extra>'
-        ))
+        # Plotly solo se importa cuando hay gráfico que dibujar
+        import plotly.graph_objects as go
         
-        # Línea 2: Valor de posiciones abiertas
-        fig.add_trace(go.Scatter(
-            x=investing_data['date'],
-            y=investing_data['open_positions_value'],
-            mode='lines',
-            name='Posiciones Abiertas',
-            line=dict(color='#28A745', width=2),
-            hovertemplate='%{x}<br>Abiertas: %{y:,.2f}€<extra></extra>'
-        ))
+        # Importes en float64: el hover muestra céntimos y float32 solo guarda
+        # ~7 cifras significativas (a partir de ~130k€ los céntimos cambiarían)
         
-        # Línea 3: Capital invertido (coste)
-        fig.add_trace(go.Scatter(
-            x=investing_data['date'],
-            y=investing_data['invested_capital'],
-            mode='lines',
-            name='Capital Invertido',
-            line=dict(color='#6C757D', width=1, dash='dash'),
-            hovertemplate='%{x}<br>Invertido: %{y:,.2f}€<extra></extra>'
-        ))
+        # Trazas construidas en una lista y figura creada de una vez
+        traces = [
+            # Línea 1: Valor total de la cartera
+            go.Scattergl(
+                x=investing_data['date'],
+                y=investing_data['total_portfolio_value'].to_numpy(),
+                mode='lines',
+                name='Valor Total (con P&L cerrado)',
+                line=dict(color='#2E86AB', width=2),
+                hovertemplate='%{x}<br>Total: %{y:,.2f}€<extra></extra>'
+            ),
+            # Línea 2: Valor de posiciones abiertas
+            go.Scattergl(
+                x=investing_data['date'],
+                y=investing_data['open_positions_value'].to_numpy(),
+                mode='lines',
+                name='Posiciones Abiertas',
+                line=dict(color='#28A745', width=2),
+                hovertemplate='%{x}<br>Abiertas: %{y:,.2f}€<extra></extra>'
+            ),
+            # Línea 3: Capital invertido (coste)
+            go.Scattergl(
+                x=investing_data['date'],
+                y=investing_data['invested_capital'].to_numpy(),
+                mode='lines',
+                name='Capital Invertido',
+                line=dict(color='#6C757D', width=1, dash='dash'),
+                hovertemplate='%{x}<br>Invertido: %{y:,.2f}€<extra></extra>'
+            )
+        ]
         
         # Línea 4: P&L cerrado (como área si hay valores)
-        if investing_data['closed_positions_pnl'].abs().sum() > 0:
-            fig.add_trace(go.Scatter(
+        if (investing_data['closed_positions_pnl'].to_numpy() != 0).any():
+            traces.append(go.Scattergl(
                 x=investing_data['date'],
-                y=investing_data['closed_positions_pnl'],
+                y=investing_data['closed_positions_pnl'].to_numpy(),
                 mode='lines',
                 name='P&L Posiciones Cerradas',
                 line=dict(color='#FFC107', width=1),
@@ -272,57 +326,62 @@ try:
                 hovertemplate='%{x}<br>P&L Cerrado: %{y:+,.2f}€<extra></extra>'
             ))
         
-        fig.update_layout(
-            title="Evolución del Valor de la Cartera",
-            xaxis_title="Fecha",
-            yaxis_title="Valor (€)",
-            hovermode='x unified',
-            height=450,
-            legend=dict(
-                orientation="h",
-                yanchor="bottom",
-                y=1.02,
-                xanchor="right",
-                x=1
-            ),
-            template='plotly_white'
+        fig = go.Figure(
+            data=traces,
+            layout=go.Layout(
+                title="Evolución del Valor de la Cartera",
+                xaxis_title="Fecha",
+                yaxis_title="Valor (€)",
+                hovermode='x unified',
+                height=450,
+                legend=dict(
+                    orientation="h",
+                    yanchor="bottom",
+                    y=1.02,
+                    xanchor="right",
+                    x=1
+                ),
+                template='plotly_white'
+            )
         )
         
         st.plotly_chart(fig, use_container_width=True)
         
-        # Métricas resumen
-        if len(investing_data) > 0:
-            last_row = investing_data.iloc[-1]
-            first_row = investing_data.iloc[0]
-            
-            col1, col2, col3, col4 = st.columns(4)
-            
-            with col1:
-                st.metric(
-                    "Valor Actual",
-                    f"{last_row['total_portfolio_value']:,.2f}€"
-                )
-            
-            with col2:
-                st.metric(
-                    "Capital Invertido",
-                    f"{last_row['invested_capital']:,.2f}€"
-                )
-            
-            with col3:
-                pnl_total = last_row['unrealized_pnl'] + last_row['closed_positions_pnl']
-                pct = (pnl_total/last_row['invested_capital']*100) if last_row['invested_capital'] > 0 else 0
-                st.metric(
-                    "P&L Total",
-                    f"{pnl_total:+,.2f}€",
-                    delta=f"{pct:+.2f}%"
-                )
-            
-            with col4:
-                st.metric(
-                    "P&L Cerrado",
-                    f"{last_row['closed_positions_pnl']:+,.2f}€"
-                )
+        # Métricas resumen (valores del último día, leídos una sola vez)
+        last = {
+            c: investing_data[c].iat[-1]
+            for c in ('total_portfolio_value', 'invested_capital',
+                      'unrealized_pnl', 'closed_positions_pnl')
+        }
+        
+        col1, col2, col3, col4 = st.columns(4)
+        
+        with col1:
+            st.metric(
+                "Valor Actual",
+                f"{last['total_portfolio_value']:,.2f}€"
+            )
+        
+        with col2:
+            st.metric(
+                "Capital Invertido",
+                f"{last['invested_capital']:,.2f}€"
+            )
+        
+        with col3:
+            pnl_total = last['unrealized_pnl'] + last['closed_positions_pnl']
+            pct = (pnl_total/last['invested_capital']*100) if last['invested_capital'] > 0 else 0
+            st.metric(
+                "P&L Total",
+                f"{pnl_total:+,.2f}€",
+                delta=f"{pct:+.2f}%"
+            )
+        
+        with col4:
+            st.metric(
+                "P&L Cerrado",
+                f"{last['closed_positions_pnl']:+,.2f}€"
+            )
     else:
         st.info("""
         📊 No hay datos suficientes para mostrar el gráfico.
@@ -347,134 +406,115 @@ try:
     """)
     
     # Verificar que hay datos del benchmark
-    if selected_benchmark not in available_names:
+    if selected_benchmark not in available_benchmarks:
         st.warning(f"👆 Descarga primero los datos del {selected_benchmark}")
     else:
-        # Obtener serie de cartera según modo
-        if comparison_mode == "Posiciones actuales":
-            portfolio_df = mdm.get_open_positions_only_series(
-                start_date.strftime('%Y-%m-%d'),
-                end_date.strftime('%Y-%m-%d')
+        # Serie de cartera según modo (cacheada, consultada en paralelo).
+        # Solo se construyen los días con precios reales de mercado.
+        portfolio_df = portfolio_future.result()
+        without_market_prices = portfolio_df.empty
+        if without_market_prices:
+            # Sin precios descargados: serie completa valorada a coste
+            portfolio_df = get_cached_portfolio_value_series(
+                db_path,
+                start_str,
+                end_str,
+                open_only=open_only
             )
+        if open_only:
             mode_description = "Solo las posiciones que tienes ACTUALMENTE"
         else:
-            portfolio_df = mdm.get_portfolio_market_value_series(
-                start_date.strftime('%Y-%m-%d'),
-                end_date.strftime('%Y-%m-%d'),
-                include_closed=True
-            )
             mode_description = "Toda la cartera incluyendo posiciones cerradas"
         
         if not portfolio_df.empty and len(portfolio_df) > 1:
             st.caption(f"📊 Modo: {mode_description}")
 
-            # Filtrar solo días con precios reales de mercado (evitar línea plana)
-            if 'has_market_prices' in portfolio_df.columns:
-                portfolio_with_prices = portfolio_df[portfolio_df['has_market_prices'] == True].copy()
-                if portfolio_with_prices.empty:
-                    st.warning("""
-                    ⚠️ **No hay precios de mercado descargados** para los activos de esta cartera.
+            if without_market_prices:
+                st.warning("""
+                ⚠️ **No hay precios de mercado descargados** para los activos de esta cartera.
 
-                    Los datos mostrados usan el precio de compra como aproximación.
-                    Para ver valores de mercado reales, ve a la pestaña "Precios de mi Cartera"
-                    y descarga los precios de tus activos.
-                    """)
-                    portfolio_df = portfolio_df.copy()
-                else:
-                    # Informar si hay días sin datos
-                    days_without_prices = len(portfolio_df) - len(portfolio_with_prices)
-                    if days_without_prices > 0:
-                        st.info(f"ℹ️ Se omiten {days_without_prices} días sin precios de mercado disponibles.")
-                    portfolio_df = portfolio_with_prices
-            else:
-                portfolio_df = portfolio_df.copy()
+                Los datos mostrados usan el precio de compra como aproximación.
+                Para ver valores de mercado reales, ve a la pestaña "Precios de mi Cartera"
+                y descarga los precios de tus activos.
+                """)
 
-            # Obtener serie del benchmark
-            benchmark_series = bc.get_benchmark_series(
-                selected_benchmark,
-                start_date.strftime('%Y-%m-%d'),
-                end_date.strftime('%Y-%m-%d')
-            )
-
-            if not benchmark_series.empty:
-                # =================================================================
-                # CALCULAR RENDIMIENTO SOBRE COSTE (no valor absoluto)
-                # Esto evita que las aportaciones afecten la comparación
-                # =================================================================
+            # Fechas a datetime64[ns] una sola vez; la serie base 100 y el
+            # alineado con el benchmark reutilizan esta columna sin reconvertir
+            portfolio_df['date'] = portfolio_df['date'].astype('datetime64[ns]')
 
-                # Calcular rendimiento diario de la cartera como % sobre coste
-                # return_pct = (market_value / cost_basis - 1) * 100
-                portfolio_df['return_pct'] = 0.0
+            # =================================================================
+            # RENDIMIENTO SOBRE COSTE (no valor absoluto)
+            # Esto evita que las aportaciones afecten la comparación. La serie
+            # ya trae return_pct = (market_value / cost_basis - 1) * 100
+            # =================================================================
 
-                for i, row in portfolio_df.iterrows():
-                    cost = row.get('cost_basis', row.get('invested_capital', 1))
-                    value = row.get('market_value', row.get('total_value', cost))
-                    if cost > 0:
-                        portfolio_df.loc[i, 'return_pct'] = (value / cost - 1) * 100
+            # Crear serie de rendimiento de cartera (base 100)
+            portfolio_return_series = pd.Series(
+                100 + portfolio_df['return_pct'].to_numpy(),  # Base 100 + rendimiento%
+                index=portfolio_df['date'].to_numpy(),
+                name='Portfolio'
+            )
+            
+            # Serie del benchmark desde la primera fecha de la cartera
+            # (el filtro de fechas lo aplica la consulta)
+            first_portfolio_date = portfolio_return_series.index.min()
+            benchmark_filtered = get_cached_benchmark_series(
+                db_path,
+                selected_benchmark,
+                first_portfolio_date.strftime('%Y-%m-%d'),
+                end_str
+            )
+            
+            if not benchmark_filtered.empty:
+                # Normalizar benchmark a base 100
+                benchmark_base = benchmark_filtered.iloc[0]
+                benchmark_norm = (benchmark_filtered / benchmark_base) * 100
                 
-                # Crear serie de rendimiento de cartera (base 100)
-                portfolio_return_series = pd.Series(
-                    100 + portfolio_df['return_pct'].values,  # Base 100 + rendimiento%
-                    index=pd.DatetimeIndex(portfolio_df['date']),
-                    name='Portfolio'
+                # Cada fecha de la cartera toma el último valor del benchmark
+                # de la semana previa (cubre fines de semana y festivos sin
+                # arrastrar un benchmark desactualizado). Se alinean las Series
+                # por índice, sin pasar por DataFrames intermedios.
+                benchmark_aligned = benchmark_norm.reindex(
+                    portfolio_return_series.index,
+                    method='ffill',
+                    tolerance=pd.Timedelta(days=7)
+                )
+                merged = (
+                    pd.concat(
+                        [portfolio_return_series.rename('portfolio'),
+                         benchmark_aligned.rename('benchmark')],
+                        axis=1
+                    )
+                    .dropna()
+                    .rename_axis('date')
+                    .reset_index()
                 )
                 
-                # Normalizar benchmark a base 100 desde la primera fecha de la cartera
-                first_portfolio_date = portfolio_return_series.index.min()
-                
-                # Filtrar benchmark desde la primera fecha de la cartera
-                benchmark_filtered = benchmark_series[benchmark_series.index >= first_portfolio_date]
-                
-                if len(benchmark_filtered) > 0:
-                    # Normalizar benchmark a base 100
-                    benchmark_base = benchmark_filtered.iloc[0]
-                    benchmark_norm = (benchmark_filtered / benchmark_base) * 100
-                    
-                    # Alinear fechas usando merge para evitar problemas de índices
-                    portfolio_temp = portfolio_return_series.reset_index()
-                    portfolio_temp.columns = ['date', 'portfolio']
+                if len(merged) >= 2:
+                    import plotly.graph_objects as go
                     
-                    benchmark_temp = benchmark_norm.reset_index()
-                    benchmark_temp.columns = ['date', 'benchmark']
-                    
-                    # Merge por fecha
-                    merged = pd.merge(portfolio_temp, benchmark_temp, on='date', how='inner')
-                    
-                    if len(merged) < 2:
-                        # Si no hay suficientes fechas comunes, hacer outer merge y ffill
-                        merged = pd.merge(portfolio_temp, benchmark_temp, on='date', how='outer')
-                        merged = merged.sort_values('date')
-                        merged['portfolio'] = merged['portfolio'].fillna(method='ffill').fillna(method='bfill')
-                        merged['benchmark'] = merged['benchmark'].fillna(method='ffill').fillna(method='bfill')
-                        merged = merged.dropna()
-                    
-                    if len(merged) >= 2:
-                        # Crear gráfico
-                        fig = go.Figure()
-                        
-                        fig.add_trace(go.Scatter(
-                            x=merged['date'],
-                            y=merged['portfolio'],
-                            mode='lines',
-                            name='Mi Cartera (Rendimiento)',
-                            line=dict(color='#2E86AB', width=2),
-                            hovertemplate='%{x}<br>Cartera: %{y:.2f}<extra></extra>'
-                        ))
-                        
-                        fig.add_trace(go.Scatter(
-                            x=merged['date'],
-                            y=merged['benchmark'],
-                            mode='lines',
-                            name=selected_benchmark,
-                            line=dict(color='#DC3545', width=2, dash='dash'),
-                            hovertemplate='%{x}<br>' + selected_benchmark + ': %{y:.2f}<extra></extra>'
-                        ))
-                        
-                        # Línea base 100
-                        fig.add_hline(y=100, line_dash="dot", line_color="gray", 
-                                      annotation_text="Base 100")
-                        
-                        fig.update_layout(
+                    # Crear gráfico de una vez (Base 100 en float32: dos decimales en torno
+                    # a 100 caben de sobra en su precisión y el payload es la mitad)
+                    fig = go.Figure(
+                        data=[
+                            go.Scattergl(
+                                x=merged['date'],
+                                y=merged['portfolio'].to_numpy(dtype='float32'),
+                                mode='lines',
+                                name='Mi Cartera (Rendimiento)',
+                                line=dict(color='#2E86AB', width=2),
+                                hovertemplate='%{x}<br>Cartera: %{y:.2f}<extra></extra>'
+                            ),
+                            go.Scattergl(
+                                x=merged['date'],
+                                y=merged['benchmark'].to_numpy(dtype='float32'),
+                                mode='lines',
+                                name=selected_benchmark,
+                                line=dict(color='#DC3545', width=2, dash='dash'),
+                                hovertemplate='%{x}<br>' + selected_benchmark + ': %{y:.2f}<extra></extra>'
+                            )
+                        ],
+                        layout=go.Layout(
                             title=f"Mi Cartera vs {selected_benchmark} (Base 100)",
                             xaxis_title="Fecha",
                             yaxis_title="Valor (Base 100)",
@@ -482,38 +522,42 @@ try:
                             height=400,
                             template='plotly_white'
                         )
+                    )
+                    
+                    # Línea base 100
+                    fig.add_hline(y=100, line_dash="dot", line_color="gray", 
+                                  annotation_text="Base 100")
+                    
+                    st.plotly_chart(fig, use_container_width=True)
+                    
+                    # Calcular rendimientos finales
+                    dates = merged['date'].to_numpy()
+                    portfolio_return = merged['portfolio'].to_numpy()[-1] - 100
+                    benchmark_return = merged['benchmark'].to_numpy()[-1] - 100
+                    outperformance = portfolio_return - benchmark_return
+                    
+                    col1, col2, col3, col4 = st.columns(4)
+                    
+                    with col1:
+                        st.metric("Mi Cartera", f"{portfolio_return:+.2f}%")
                         
-                        st.plotly_chart(fig, use_container_width=True)
-                        
-                        # Calcular rendimientos finales
-                        portfolio_return = merged['portfolio'].iloc[-1] - 100
-                        benchmark_return = merged['benchmark'].iloc[-1] - 100
-                        outperformance = portfolio_return - benchmark_return
-                        
-                        col1, col2, col3, col4 = st.columns(4)
-                        
-                        with col1:
-                            st.metric("Mi Cartera", f"{portfolio_return:+.2f}%")
-                        
-                        with col2:
-                            st.metric(selected_benchmark, f"{benchmark_return:+.2f}%")
+                    with col2:
+                        st.metric(selected_benchmark, f"{benchmark_return:+.2f}%")
                         
-                        with col3:
-                            st.metric(
-                                "Outperformance",
-                                f"{outperformance:+.2f}%",
-                                delta=f"{'Mejor' if outperformance >= 0 else 'Peor'} que {selected_benchmark}"
-                            )
+                    with col3:
+                        st.metric(
+                            "Outperformance",
+                            f"{outperformance:+.2f}%",
+                            delta=f"{'Mejor' if outperformance >= 0 else 'Peor'} que {selected_benchmark}"
+                        )
                         
-                        with col4:
-                            days_elapsed = (merged['date'].iloc[-1] - merged['date'].iloc[0]).days
-                            st.metric("Período", f"{days_elapsed} días")
-                    else:
-                        st.warning("No hay suficientes datos comunes entre cartera y benchmark")
+                    with col4:
+                        days_elapsed = int((dates[-1] - dates[0]) // np.timedelta64(1, 'D'))
+                        st.metric("Período", f"{days_elapsed} días")
                 else:
-                    st.warning("No hay datos del benchmark para el período de la cartera")
+                    st.warning("No hay suficientes datos comunes entre cartera y benchmark")
             else:
-                st.warning("No hay datos del benchmark para el período seleccionado")
+                st.warning("No hay datos del benchmark para el período de la cartera")
         else:
             st.info("""
             No hay datos de cartera para el período seleccionado.
@@ -531,18 +575,13 @@ try:
     st.markdown("### 📊 Métricas de Riesgo")
     
     try:
-        risk_metrics = bc.calculate_risk_metrics(
-            selected_benchmark,
-            start_date.strftime('%Y-%m-%d'),
-            end_date.strftime('%Y-%m-%d'),
-            risk_free_rate
-        )
+        risk_metrics = risk_future.result()
         
         if 'error' not in risk_metrics:
             col1, col2, col3, col4 = st.columns(4)
             
             with col1:
-                vol = risk_metrics.get('portfolio_volatility', 0)
+                vol = risk_metrics['risk'].get('portfolio_volatility', 0)
                 st.metric(
                     "Volatilidad Cartera",
                     f"{vol:.2f}%",
@@ -550,14 +589,14 @@ try:
                 )
             
             with col2:
-                vol_bench = risk_metrics.get('benchmark_volatility', 0)
+                vol_bench = risk_metrics['risk'].get('benchmark_volatility', 0)
                 st.metric(
                     f"Volatilidad {selected_benchmark}",
                     f"{vol_bench:.2f}%"
                 )
             
             with col3:
-                sharpe = risk_metrics.get('sharpe_ratio', 0)
+                sharpe = risk_metrics['risk_adjusted'].get('portfolio_sharpe', 0)
                 st.metric(
                     "Sharpe Ratio",
                     f"{sharpe:.2f}",
@@ -565,7 +604,7 @@ try:
                 )
             
             with col4:
-                max_dd = risk_metrics.get('max_drawdown', 0)
+                max_dd = risk_metrics['drawdown'].get('portfolio_max_dd', 0)
                 st.metric(
                     "Max Drawdown",
                     f"{max_dd:.2f}%",
@@ -575,12 +614,6 @@ try:
             st.info("No hay datos suficientes para calcular métricas de riesgo")
     except Exception as e:
         st.info(f"No se pudieron calcular métricas de riesgo")
-    
-    # =========================================================================
-    # CLEANUP
-    # =========================================================================
-    bc.close()
-    mdm.close()
 
 except Exception as e:
     st.error(f"❌ Error: {e}")
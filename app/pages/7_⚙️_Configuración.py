@@ -10,6 +10,7 @@ Esta página permite:
 
 import streamlit as st
 import pandas as pd
+import json
 from datetime import datetime
 from pathlib import Path
 import os
@@ -27,6 +28,10 @@ if not require_auth("Configuración", "⚙️"):
 from src.database import Database
 from src.logger import get_logger
 
+# Importar componentes
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from components.cache import get_cached_tickers_info
+
 logger = get_logger(__name__)
 
 st.title("⚙️ Configuración")
@@ -50,6 +55,9 @@ DEFAULT_CONFIG = {
     'app_version': '1.0.0'
 }
 
+# Bytes leídos del final del log en la pestaña de información del sistema
+LOG_TAIL_BYTES = 64 * 1024
+
 # Cargar configuración en session_state si no existe
 for key, default_value in DEFAULT_CONFIG.items():
     if f'config_{key}' not in st.session_state:
@@ -63,6 +71,18 @@ def save_config():
     logger.info("Configuración guardada correctamente")
     st.success("✅ Configuración guardada correctamente")
 
+# ============================================================================
+# FUNCIONES CACHEADAS
+# ============================================================================
+@st.cache_data(ttl=10, show_spinner=False)
+def get_db_size_str(path_str: str):
+    """Tamaño del fichero de BD formateado (None si no existe), cacheado 10 s."""
+    path = Path(path_str)
+    if not path.exists():
+        return None
+    db_size = path.stat().st_size / 1024  # KB
+    return f"{db_size/1024:.2f} MB" if db_size > 1024 else f"{db_size:.2f} KB"
+
 # ============================================================================
 # TABS DE CONFIGURACIÓN
 # ============================================================================
@@ -169,27 +189,10 @@ with tab2:
     st.header("📊 Gestión de Activos")
     st.markdown("Visualiza y gestiona los activos de tu cartera")
     
-    # Obtener todos los tickers únicos de las transacciones
+    # Tickers únicos con su información (cacheado; los filtros no releen la BD)
     try:
-        all_transactions = db.get_transactions()
-        if all_transactions:
-            df_trans = db.transactions_to_dataframe(all_transactions)
-            
-            # Obtener tickers únicos con su información
-            tickers_info = df_trans.groupby('ticker').agg({
-                'name': 'first',
-                'asset_type': 'first',
-                'currency': 'first',
-                'market': 'first',
-                'date': ['min', 'max', 'count']
-            }).reset_index()
-            
-            # Aplanar columnas multinivel
-            tickers_info.columns = [
-                'Ticker', 'Nombre', 'Tipo', 'Divisa', 'Mercado',
-                'Primera Op.', 'Última Op.', 'Nº Operaciones'
-            ]
-            
+        tickers_info = get_cached_tickers_info(db_path)
+        if not tickers_info.empty:
             st.subheader("📋 Activos Registrados")
             
             # Filtros
@@ -203,7 +206,7 @@ with tab2:
             with col2:
                 filter_currency = st.selectbox(
                     "Filtrar por divisa:",
-                    options=['Todas'] + list(tickers_info['Divisa'].dropna().unique()),
+                    options=['Todas'] + tickers_info['Divisa'].cat.categories.tolist(),
                     index=0
                 )
             with col3:
@@ -212,16 +215,17 @@ with tab2:
                     placeholder="Ej: AAPL"
                 )
             
-            # Aplicar filtros
-            df_filtered = tickers_info.copy()
+            # Aplicar filtros (una sola máscara, una sola selección)
+            mask = pd.Series(True, index=tickers_info.index)
             if filter_type != 'Todos':
-                df_filtered = df_filtered[df_filtered['Tipo'] == filter_type]
+                mask &= tickers_info['Tipo'].eq(filter_type)
             if filter_currency != 'Todas':
-                df_filtered = df_filtered[df_filtered['Divisa'] == filter_currency]
+                mask &= tickers_info['Divisa'].eq(filter_currency)
             if search_ticker:
-                df_filtered = df_filtered[
-                    df_filtered['Ticker'].str.contains(search_ticker.upper(), na=False)
-                ]
+                mask &= tickers_info['_ticker_upper'].str.startswith(
+                    search_ticker.strip().upper(), na=False
+                )
+            df_filtered = tickers_info.loc[mask].drop(columns='_ticker_upper')
             
             # Mostrar tabla
             st.dataframe(
@@ -337,21 +341,11 @@ with tab4:
         st.subheader("📊 Estadísticas de la Base de Datos")
         
         try:
-            # Contar registros
-            all_trans = db.get_transactions()
-            all_divs = db.get_dividends()
-            all_benchmarks = db.get_available_benchmarks()
-            
-            n_transactions = len(all_trans) if all_trans else 0
-            n_dividends = len(all_divs) if all_divs else 0
-            n_benchmarks = len(all_benchmarks) if all_benchmarks else 0
-            
-            # Calcular tipos de transacciones
-            if all_trans:
-                df_trans = db.transactions_to_dataframe(all_trans)
-                trans_by_type = df_trans['type'].value_counts().to_dict()
-            else:
-                trans_by_type = {}
+            # Contar registros en la BD (COUNT / GROUP BY), sin cargar filas
+            n_transactions = db.count_transactions()
+            n_dividends = db.count_dividends()
+            n_benchmarks = len(db.get_available_benchmarks())
+            trans_by_type = db.count_transactions_by_type()
             
             # Mostrar estadísticas
             st.metric("Total de Transacciones", n_transactions)
@@ -363,18 +357,14 @@ with tab4:
                 for tipo, count in trans_by_type.items():
                     st.markdown(f"- {tipo}: {count}")
             
-            # Tamaño de la base de datos (usar la cartera seleccionada)
-            current_db_path = Path(db_path) if db_path else Path("data/database.db")
-            if current_db_path.exists():
-                db_size = current_db_path.stat().st_size / 1024  # KB
-                if db_size > 1024:
-                    st.metric("Tamaño de BD", f"{db_size/1024:.2f} MB")
-                else:
-                    st.metric("Tamaño de BD", f"{db_size:.2f} KB")
-            
         except Exception as e:
             logger.error(f"Error al obtener estadísticas: {e}")
             st.error(f"Error al obtener estadísticas: {e}")
+        
+        # Tamaño de la base de datos (usar la cartera seleccionada)
+        db_size_str = get_db_size_str(db_path or "data/database.db")
+        if db_size_str:
+            st.metric("Tamaño de BD", db_size_str)
     
     with col2:
         st.subheader("📝 Últimas Entradas del Log")
@@ -384,10 +374,15 @@ with tab4:
         
         if log_path.exists():
             try:
-                with open(log_path, 'r', encoding='utf-8') as f:
-                    # Leer últimas 50 líneas
-                    lines = f.readlines()
-                    last_lines = lines[-50:] if len(lines) > 50 else lines
+                # Leer solo el final del fichero (últimos 64 KB) y quedarse
+                # con las últimas 50 líneas
+                size = log_path.stat().st_size
+                with open(log_path, 'rb') as f:
+                    f.seek(max(0, size - LOG_TAIL_BYTES))
+                    tail = f.read().decode('utf-8', errors='replace').splitlines()
+                if size > LOG_TAIL_BYTES:
+                    tail = tail[1:]  # la primera línea puede estar cortada
+                last_lines = tail[-50:]
                 
                 # Filtrar por nivel
                 log_level = st.selectbox(
@@ -400,7 +395,7 @@ with tab4:
                     last_lines = [l for l in last_lines if log_level in l]
                 
                 # Mostrar en un área de texto
-                log_content = ''.join(last_lines[-20:])  # Últimas 20 después de filtrar
+                log_content = '\n'.join(last_lines[-20:])  # Últimas 20 después de filtrar
                 st.text_area(
                     "Log reciente:",
                     value=log_content,
@@ -408,16 +403,14 @@ with tab4:
                     disabled=True
                 )
                 
-                # Botón para descargar log completo
-                with open(log_path, 'r', encoding='utf-8') as f:
-                    full_log = f.read()
-                
-                st.download_button(
-                    label="📥 Descargar log completo",
-                    data=full_log,
-                    file_name="investment_tracker.log",
-                    mime="text/plain"
-                )
+                # Log completo: se lee solo al pulsar "Preparar"
+                if st.button("📄 Preparar log completo"):
+                    st.download_button(
+                        label="📥 Descargar log completo",
+                        data=log_path.read_bytes(),
+                        file_name="investment_tracker.log",
+                        mime="text/plain"
+                    )
                 
             except Exception as e:
                 st.error(f"Error al leer el log: {e}")
@@ -487,12 +480,11 @@ with tab4:
         if st.button("💾 Exportar configuración", type="secondary"):
             # Crear dict con la configuración actual
             config_export = {
-                key.replace('config_', ''): value 
-                for key, value in st.session_state.items() 
+                key.removeprefix('config_'): value
+                for key, value in st.session_state.items()
                 if key.startswith('config_')
             }
             
-            import json
             config_json = json.dumps(config_export, indent=2, default=str)
             
             st.download_button(
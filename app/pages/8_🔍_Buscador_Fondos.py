@@ -5,10 +5,13 @@ Importa fondos desde Morningstar y explora el catalogo
 
 import streamlit as st
 import pandas as pd
+import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
+from plotly.subplots import make_subplots
 import json
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 # Configurar path
@@ -24,33 +27,234 @@ from src.services.fund_service import FundService
 from src.providers.morningstar import FundNotFoundError, FundDataProviderError
 from src.data.models import FUND_RISK_LEVELS
 
+# Importar componentes
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from components.cache import get_shared_fund_service
+
+
+# Columnas de la tabla del catalogo
+CATALOG_COLUMNS = ['ISIN', 'Nombre', 'Mi Cat.', 'TER %', 'Riesgo', 'Rent 1A %', 'Rent 3A %']
+
+# Claves de asset allocation del preview y su etiqueta
+ALLOCATION_LABELS = {
+    'us_equity': 'RV USA',
+    'non_us_equity': 'RV Internacional',
+    'bond': 'Renta Fija',
+    'cash': 'Efectivo',
+    'other': 'Otros'
+}
+
+# Peso total minimo (%) para dibujar una seccion del preview
+MIN_CHART_WEIGHT = 1
+
 
 # =============================================================================
 # FUNCIONES CACHEADAS PARA RENDIMIENTO
 # =============================================================================
 
-@st.cache_data(ttl=60, show_spinner=False)
+@st.cache_data(ttl=300, show_spinner=False)
 def get_cached_categories(db_path: str):
-    """Obtiene categorias de la BD con cache de 1 minuto."""
-    with FundService(db_path=db_path) as service:
-        return service.get_all_categories()
+    """
+    Obtiene categorias de la BD con cache de 5 minutos. Todas las altas de
+    categorias pasan por esta pagina y llaman a invalidate_fund_cache().
+    """
+    return get_shared_fund_service(db_path).get_all_categories()
+
+
+def _format_return(val, label: str) -> str:
+    """Rentabilidad coloreada en markdown (verde/rojo)."""
+    if val is None:
+        return f"**{label}:** -"
+    color = "green" if val >= 0 else "red"
+    return f"**{label}:** :{color}[{val:+.2f}%]"
+
+
+def _preview_labels(preview: dict) -> dict:
+    """Textos de la ficha del preview, formateados una sola vez."""
+    ter = preview.get('ter')
+    risk = preview.get('risk_level')
+    aum = preview.get('aum')
+    vol_1y = preview.get('volatility_1y')
+    sharpe_1y = preview.get('sharpe_1y')
+    return {
+        'name': f"**Nombre:** {preview.get('name', '-')}",
+        'isin': f"**ISIN:** {preview.get('isin', '-')}",
+        'type': f"**Tipo:** {(preview.get('asset_type') or '-').upper()}",
+        'manager': f"**Gestora:** {preview.get('manager', '-')}",
+        'category': f"**Categoria:** {preview.get('morningstar_category') or preview.get('category_name', '-')}",
+        'ter': f"**TER:** {ter:.2f}%" if ter else "**TER:** -",
+        'risk': (
+            f"**Riesgo SRRI:** {risk}/7 ({FUND_RISK_LEVELS.get(risk, '')})"
+            if risk else "**Riesgo SRRI:** -"
+        ),
+        'aum': f"**Patrimonio:** {aum:,.0f}M EUR" if aum else "**Patrimonio:** -",
+        'distribution': f"**Distribucion:** {(preview.get('distribution_policy') or '-').capitalize()}",
+        'return_1y': _format_return(preview.get('return_1y'), "1 Ano"),
+        'return_3y': _format_return(preview.get('return_3y'), "3 Anos"),
+        'return_5y': _format_return(preview.get('return_5y'), "5 Anos"),
+        'volatility_1y': f"**Vol 1A:** {vol_1y:.2f}%" if vol_1y else "**Vol 1A:** -",
+        'sharpe_1y': f"**Sharpe 1A:** {sharpe_1y:.2f}" if sharpe_1y else "**Sharpe 1A:** -",
+    }
+
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def get_cached_fund_preview(db_path: str, isin: str):
+    """
+    Preview de Morningstar con cache de 1 hora (repetir la busqueda no relanza
+    la peticion). Incluye en '_labels' los textos de la ficha ya formateados.
+    """
+    preview = get_shared_fund_service(db_path).fetch_fund_preview(isin)
+    preview['_labels'] = _preview_labels(preview)
+    return preview
+
+
+def _nonzero_mean(values: np.ndarray) -> float:
+    """Media ignorando nulos y ceros (0 si no queda ningun valor)."""
+    values = values[~np.isnan(values) & (values != 0)]
+    return float(values.mean()) if values.size else 0.0
+
+
+def _total_weight(items: list, key: str = 'weight') -> float:
+    """Suma de pesos de una lista de dicts (nulos cuentan como 0)."""
+    return sum(d.get(key) or 0 for d in items)
+
+
+def _top_n_with_other(items: list, n: int = 12, key: str = 'weight') -> list:
+    """Top n elementos por peso; el resto se agrupa en 'Otros'."""
+    items = sorted(items, key=lambda d: -(d.get(key) or 0))
+    head, tail = items[:n], items[n:]
+    if tail:
+        head.append({'name': 'Otros', key: sum(d.get(key) or 0 for d in tail)})
+    return head
 
 
 @st.cache_data(ttl=300, show_spinner=False)
-def get_cached_funds(db_path: str, _cache_key: str, **filters):
+def get_cached_funds(db_path: str, _cache_key: str, custom_category: str = None, **filters):
     """
-    Obtiene fondos con cache de 5 minutos.
+    Obtiene la tabla del catalogo (lista para mostrar) y sus metricas resumen
+    con cache de 5 minutos. Nombres recortados y medias se calculan aqui una
+    sola vez por filtro, no en cada rerun.
     _cache_key se usa para invalidar la cache cuando hay cambios.
     """
-    with FundService(db_path=db_path) as service:
-        return service.search_funds(**filters)
+    funds = get_shared_fund_service(db_path).search_funds(**filters)
+    if custom_category:
+        funds = [f for f in funds if f.custom_category == custom_category]
+
+    df_catalog = pd.DataFrame(
+        [
+            (
+                f.isin,
+                f.name[:45] + '...' if len(f.name) > 45 else f.name,
+                f.custom_category or '-',
+                f.ter,
+                f.risk_level,
+                f.return_1y,
+                f.return_3y,
+            )
+            for f in funds
+        ],
+        columns=CATALOG_COLUMNS,
+    )
+    aum = np.fromiter((f.aum or 0.0 for f in funds), dtype=np.float64, count=len(funds))
+
+    metrics = {
+        'count': len(df_catalog),
+        'avg_ter': _nonzero_mean(df_catalog['TER %'].to_numpy(dtype=np.float64)),
+        'avg_return_1y': _nonzero_mean(df_catalog['Rent 1A %'].to_numpy(dtype=np.float64)),
+        'total_aum': float(aum.sum()),
+    }
+    return df_catalog, metrics
 
 
 @st.cache_data(ttl=300, show_spinner=False)
 def get_cached_fund_count(db_path: str, _cache_key: str):
-    """Verifica si hay fondos en el catalogo con cache."""
-    with FundService(db_path=db_path) as service:
-        return service.has_funds()
+    """Numero de fondos en el catalogo con cache (0 = catalogo vacio)."""
+    return get_shared_fund_service(db_path).count_funds()
+
+
+# Grafico de la ficha de importacion: depende solo de los datos del preview
+# (tuplas hashables), asi que no se reconstruye al tocar otros widgets
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def _preview_figure(isin: str, sectors: tuple, countries: tuple, alloc: tuple, holdings: tuple):
+    """
+    Sectores, paises, asset allocation y top holdings del preview en una sola
+    figura (una unica instancia de Plotly en el navegador).
+    sectors/countries/alloc = ((nombre, peso), ...); holdings = ((nombre, peso, sector), ...).
+    Los vacios dejan su hueco sin trazar.
+    """
+    fig = make_subplots(
+        rows=2, cols=2,
+        specs=[
+            [{'type': 'domain'}, {'type': 'xy'}],
+            [{'type': 'domain'}, {'type': 'table'}],
+        ],
+        subplot_titles=("Sectores", "Paises (Top 10)", "Asset Allocation", "Top 10 Holdings"),
+        row_heights=[0.55, 0.45],
+        vertical_spacing=0.12
+    )
+
+    if sectors:
+        names, weights = zip(*sectors)
+        fig.add_trace(go.Pie(
+            labels=list(names),
+            values=list(weights),
+            hole=0.4,
+            textposition='inside',
+            textinfo='percent',
+            marker=dict(colors=px.colors.qualitative.Pastel),
+            hovertemplate='%{label}<br>%{value:.1f}%<extra></extra>'
+        ), row=1, col=1)
+
+    if countries:
+        names, weights = zip(*countries)
+        fig.add_trace(go.Bar(
+            x=list(weights),
+            y=list(names),
+            orientation='h',
+            marker=dict(color=list(weights), colorscale=px.colors.sequential.Blues),
+            hovertemplate='%{y}<br>%{x:.1f}%<extra></extra>',
+            showlegend=False
+        ), row=1, col=2)
+        fig.update_xaxes(title_text="Peso %", row=1, col=2)
+        fig.update_yaxes(autorange="reversed", row=1, col=2)
+
+    if alloc:
+        labels, weights = zip(*alloc)
+        # Etiquetas sobre las porciones: fuera de la leyenda (que es de sectores)
+        fig.add_trace(go.Pie(
+            labels=list(labels),
+            values=list(weights),
+            hole=0.4,
+            textposition='inside',
+            textinfo='percent+label',
+            marker=dict(colors=px.colors.qualitative.Set2),
+            hovertemplate='%{label}<br>%{value:.1f}%<extra></extra>',
+            showlegend=False
+        ), row=2, col=1)
+
+    if holdings:
+        names, weights, sectors_h = zip(*holdings)
+        fig.add_trace(go.Table(
+            header=dict(values=['Nombre', 'Peso %', 'Sector'], align='left'),
+            cells=dict(
+                values=[
+                    list(names),
+                    [f"{w:.2f}%" if w is not None else '-' for w in weights],
+                    [sec or '-' for sec in sectors_h],
+                ],
+                align='left'
+            ),
+            columnwidth=[3, 1, 2]
+        ), row=2, col=2)
+
+    fig.update_layout(
+        margin=dict(t=30, b=10, l=10, r=10),
+        height=560,
+        showlegend=True,
+        legend=dict(orientation="h", yanchor="top", y=-0.02, font=dict(size=10))
+    )
+    return fig
 
 
 def invalidate_fund_cache():
@@ -58,6 +262,9 @@ def invalidate_fund_cache():
     get_cached_funds.clear()
     get_cached_fund_count.clear()
     get_cached_categories.clear()
+    # Los cambios se escriben con otra sesion: descartar la compartida para
+    # no leer objetos desactualizados de su identity map
+    get_shared_fund_service.clear()
 
 st.title("🔍 Catalogo Inteligente de Fondos")
 
@@ -78,22 +285,100 @@ tab_import, tab_catalog = st.tabs(["📥 Importar Fondo", "📊 Mi Catalogo"])
 # TAB 1: IMPORTAR FONDO
 # =============================================================================
 
+@st.fragment
+def render_import_save_section(db_path: str, preview: dict):
+    """
+    Asignar categoria y guardar el fondo del preview como fragmento: el
+    selector y el alta de categorias solo vuelven a ejecutar esta funcion,
+    no la ficha ni el grafico del preview.
+    """
+    # Selector de categoria personalizada (dinamica desde BD)
+    st.markdown("**Asignar categoria personalizada:**")
+
+    # Obtener categorias de la BD
+    db_categories = get_cached_categories(db_path)
+    category_options = ["", "➕ Crear nueva..."] + db_categories
+
+    selected_category = st.selectbox(
+        "Categoria",
+        options=category_options,
+        index=0,
+        format_func=lambda x: "Seleccionar categoria..." if x == "" else x,
+        key="import_custom_category",
+        label_visibility="collapsed"
+    )
+
+    # Si selecciona "Crear nueva", mostrar input
+    final_category = None
+    if selected_category == "➕ Crear nueva...":
+        col_new, col_add = st.columns([3, 1])
+        with col_new:
+            new_cat_name = st.text_input(
+                "Nombre de la nueva categoria",
+                placeholder="Ej: RV Small Caps",
+                key="new_category_name",
+                label_visibility="collapsed"
+            )
+        with col_add:
+            if st.button("Crear", type="secondary"):
+                if new_cat_name.strip():
+                    with FundService(db_path=db_path) as svc:
+                        if svc.add_category(new_cat_name.strip()):
+                            st.success(f"Categoria '{new_cat_name}' creada")
+                            invalidate_fund_cache()
+                            st.rerun()
+                        else:
+                            st.warning("La categoria ya existe")
+        final_category = new_cat_name.strip() if new_cat_name else None
+    elif selected_category:
+        final_category = selected_category
+
+    # Boton guardar
+    col_save, col_cancel = st.columns([1, 3])
+
+    with col_save:
+        if st.button("💾 Guardar en Base de Datos", type="primary", use_container_width=True):
+            with st.spinner("Guardando..."):
+                try:
+                    # Escrituras con una sesion propia: el servicio compartido
+                    # (cache_resource) es solo para lecturas
+                    with FundService(db_path=db_path) as service:
+                        # Reutilizar los datos del preview: sin segunda peticion a Morningstar.
+                        # La categoria personalizada va en la misma escritura
+                        fund = service.import_fund_from_preview(
+                            preview, custom_category=final_category
+                        )
+                        st.success(f"Fondo guardado: {fund.name}")
+                        st.session_state.fund_preview = None
+                        invalidate_fund_cache()
+                        st.rerun()
+                except Exception as e:
+                    st.error(f"Error guardando: {e}")
+
+    with col_cancel:
+        if st.button("Cancelar"):
+            st.session_state.fund_preview = None
+            st.rerun()
+
+
 with tab_import:
     st.markdown("### Importar fondo desde Morningstar")
     st.markdown("Introduce el ISIN de un fondo o ETF para obtener sus datos automaticamente.")
 
-    col_input, col_btn = st.columns([3, 1])
+    # Formulario: escribir el ISIN no relanza la pagina, solo al pulsar Buscar
+    with st.form("import_search_form", clear_on_submit=False, border=False):
+        col_input, col_btn = st.columns([3, 1])
 
-    with col_input:
-        isin_input = st.text_input(
-            "Codigo ISIN",
-            placeholder="Ej: IE00B3RBWM25",
-            help="Codigo ISIN de 12 caracteres del fondo",
-            label_visibility="collapsed"
-        )
+        with col_input:
+            isin_input = st.text_input(
+                "Codigo ISIN",
+                placeholder="Ej: IE00B3RBWM25",
+                help="Codigo ISIN de 12 caracteres del fondo",
+                label_visibility="collapsed"
+            )
 
-    with col_btn:
-        search_btn = st.button("🔍 Buscar", type="primary", use_container_width=True)
+        with col_btn:
+            search_btn = st.form_submit_button("🔍 Buscar", type="primary", use_container_width=True)
 
     # Estado para preview
     if 'fund_preview' not in st.session_state:
@@ -108,10 +393,14 @@ with tab_import:
         else:
             with st.spinner(f"Buscando {isin_clean} en Morningstar..."):
                 try:
-                    with FundService(db_path=db_path) as service:
-                        preview = service.fetch_fund_preview(isin_clean)
-                        st.session_state.fund_preview = preview
-                        st.success(f"Fondo encontrado: {preview['name']}")
+                    # Morningstar (HTTP) y categorias (BD) en paralelo: el selector
+                    # de categoria ya tiene la cache caliente al mostrar el preview
+                    with ThreadPoolExecutor(max_workers=2) as executor:
+                        preview_future = executor.submit(get_cached_fund_preview, db_path, isin_clean)
+                        executor.submit(get_cached_categories, db_path)
+                    preview = preview_future.result()
+                    st.session_state.fund_preview = preview
+                    st.success(f"Fondo encontrado: {preview['name']}")
                 except FundNotFoundError:
                     st.error(f"No se encontro el fondo con ISIN: {isin_clean}")
                     st.session_state.fund_preview = None
@@ -132,249 +421,112 @@ with tab_import:
         # Info basica
         col1, col2, col3 = st.columns(3)
 
+        # Un markdown por columna (saltos de linea con dos espacios finales)
+        labels = preview['_labels']
+
         with col1:
-            st.markdown("**Informacion General**")
-            st.write(f"**Nombre:** {preview.get('name', '-')}")
-            st.write(f"**ISIN:** {preview.get('isin', '-')}")
-            st.write(f"**Tipo:** {preview.get('asset_type', '-').upper()}")
-            st.write(f"**Gestora:** {preview.get('manager', '-')}")
-            st.write(f"**Categoria:** {preview.get('morningstar_category') or preview.get('category_name', '-')}")
+            st.markdown("  \n".join([
+                "**Informacion General**",
+                labels['name'],
+                labels['isin'],
+                labels['type'],
+                labels['manager'],
+                labels['category'],
+            ]))
 
         with col2:
-            st.markdown("**Costes y Riesgo**")
-            ter = preview.get('ter')
-            st.write(f"**TER:** {ter:.2f}%" if ter else "**TER:** -")
-
-            risk = preview.get('risk_level')
-            if risk:
-                risk_name = FUND_RISK_LEVELS.get(risk, '')
-                st.write(f"**Riesgo SRRI:** {risk}/7 ({risk_name})")
-            else:
-                st.write("**Riesgo SRRI:** -")
-
-            aum = preview.get('aum')
-            st.write(f"**Patrimonio:** {aum:,.0f}M EUR" if aum else "**Patrimonio:** -")
-
-            dist = preview.get('distribution_policy', '-')
-            st.write(f"**Distribucion:** {dist.capitalize()}")
+            st.markdown("  \n".join([
+                "**Costes y Riesgo**",
+                labels['ter'],
+                labels['risk'],
+                labels['aum'],
+                labels['distribution'],
+            ]))
 
         with col3:
-            st.markdown("**Rentabilidad**")
-            ret_1y = preview.get('return_1y')
-            ret_3y = preview.get('return_3y')
-            ret_5y = preview.get('return_5y')
-
-            # Colorear rentabilidades
-            def format_return(val, label):
-                if val is None:
-                    return f"**{label}:** -"
-                color = "green" if val >= 0 else "red"
-                return f"**{label}:** :{color}[{val:+.2f}%]"
-
-            st.markdown(format_return(ret_1y, "1 Ano"))
-            st.markdown(format_return(ret_3y, "3 Anos"))
-            st.markdown(format_return(ret_5y, "5 Anos"))
-
-            st.markdown("**Volatilidad**")
-            vol_1y = preview.get('volatility_1y')
-            sharpe_1y = preview.get('sharpe_1y')
-            st.write(f"**Vol 1A:** {vol_1y:.2f}%" if vol_1y else "**Vol 1A:** -")
-            st.write(f"**Sharpe 1A:** {sharpe_1y:.2f}" if sharpe_1y else "**Sharpe 1A:** -")
-
-        # Graficos: Sectores, Paises, Holdings
+            st.markdown("  \n".join([
+                "**Rentabilidad**",
+                labels['return_1y'],
+                labels['return_3y'],
+                labels['return_5y'],
+                "",
+                "**Volatilidad**",
+                labels['volatility_1y'],
+                labels['sharpe_1y'],
+            ]))
+
+        # Graficos y top holdings en una sola figura
         allocation = preview.get('allocation', {})
 
-        # Fila 1: Sectores y Paises
-        col_sectors, col_countries = st.columns(2)
-
-        with col_sectors:
-            sectors = allocation.get('sectors', [])
-            if sectors:
-                st.markdown("**Sectores**")
-                df_sectors = pd.DataFrame(sectors)
-                fig = px.pie(
-                    df_sectors,
-                    values='weight',
-                    names='name',
-                    hole=0.4,
-                    color_discrete_sequence=px.colors.qualitative.Pastel
-                )
-                fig.update_layout(
-                    margin=dict(t=10, b=10, l=10, r=10),
-                    height=250,
-                    showlegend=True,
-                    legend=dict(orientation="h", yanchor="bottom", y=-0.3, font=dict(size=10))
-                )
-                fig.update_traces(textposition='inside', textinfo='percent')
-                st.plotly_chart(fig, use_container_width=True)
-
-        with col_countries:
-            countries = allocation.get('countries', [])
-            if countries:
-                st.markdown("**Paises (Top 10)**")
-                df_countries = pd.DataFrame(countries[:10])
-                fig = px.bar(
-                    df_countries,
-                    x='weight',
-                    y='name',
-                    orientation='h',
-                    color='weight',
-                    color_continuous_scale='Blues'
-                )
-                fig.update_layout(
-                    margin=dict(t=10, b=10, l=10, r=10),
-                    height=250,
-                    xaxis_title="Peso %",
-                    yaxis_title="",
-                    showlegend=False,
-                    coloraxis_showscale=False
-                )
-                fig.update_yaxes(autorange="reversed")
-                st.plotly_chart(fig, use_container_width=True)
-
-        # Fila 2: Asset Allocation y Holdings
-        col_alloc, col_hold = st.columns(2)
-
-        with col_alloc:
-            if allocation:
-                st.markdown("**Asset Allocation**")
-                alloc_data = []
-                labels_map = {
-                    'us_equity': 'RV USA',
-                    'non_us_equity': 'RV Internacional',
-                    'bond': 'Renta Fija',
-                    'cash': 'Efectivo',
-                    'other': 'Otros'
-                }
-                for key, label in labels_map.items():
-                    val = allocation.get(key, 0)
-                    if val > 0.1:
-                        alloc_data.append({'Tipo': label, 'Peso': val})
-
-                if alloc_data:
-                    df_alloc = pd.DataFrame(alloc_data)
-                    fig = px.pie(
-                        df_alloc,
-                        values='Peso',
-                        names='Tipo',
-                        hole=0.4,
-                        color_discrete_sequence=px.colors.qualitative.Set2
-                    )
-                    fig.update_layout(
-                        margin=dict(t=10, b=10, l=10, r=10),
-                        height=220,
-                        showlegend=True,
-                        legend=dict(orientation="h", yanchor="bottom", y=-0.2)
-                    )
-                    fig.update_traces(textposition='inside', textinfo='percent+label')
-                    st.plotly_chart(fig, use_container_width=True)
-
-        with col_hold:
-            holdings = preview.get('holdings', [])
-            if holdings:
-                st.markdown("**Top 10 Holdings**")
-                df_hold = pd.DataFrame(holdings)
-                df_hold = df_hold.rename(columns={
-                    'name': 'Nombre',
-                    'weight': 'Peso %',
-                    'sector': 'Sector'
-                })
-                df_hold['Peso %'] = df_hold['Peso %'].apply(lambda x: f"{x:.2f}%")
-                st.dataframe(
-                    df_hold,
-                    use_container_width=True,
-                    hide_index=True,
-                    height=220
-                )
-
-        st.divider()
-
-        # Selector de categoria personalizada (dinamica desde BD)
-        st.markdown("**Asignar categoria personalizada:**")
+        # Descartar secciones sin peso real (< 1% en total): no se dibujan
+        sectors = allocation.get('sectors', [])
+        if _total_weight(sectors) < MIN_CHART_WEIGHT:
+            sectors = []
+        countries = allocation.get('countries', [])
+        if _total_weight(countries) < MIN_CHART_WEIGHT:
+            countries = []
+        alloc_data = ()
+        if sum(allocation.get(key) or 0 for key in ALLOCATION_LABELS) >= MIN_CHART_WEIGHT:
+            alloc_data = tuple(
+                (label, allocation[key]) for key, label in ALLOCATION_LABELS.items()
+                if (allocation.get(key) or 0) > 0.1
+            )
 
-        # Obtener categorias de la BD
-        db_categories = get_cached_categories(db_path)
-        category_options = ["", "➕ Crear nueva..."] + db_categories
+        # Acotar el numero de porciones antes de dibujar
+        sectors = _top_n_with_other(sectors)
+        countries = countries[:10]
 
-        selected_category = st.selectbox(
-            "Categoria",
-            options=category_options,
-            index=0,
-            format_func=lambda x: "Seleccionar categoria..." if x == "" else x,
-            key="import_custom_category",
-            label_visibility="collapsed"
+        holdings = tuple(
+            (h.get('name'), h.get('weight'), h.get('sector'))
+            for h in preview.get('holdings', [])[:10]
         )
 
-        # Si selecciona "Crear nueva", mostrar input
-        final_category = None
-        if selected_category == "➕ Crear nueva...":
-            col_new, col_add = st.columns([3, 1])
-            with col_new:
-                new_cat_name = st.text_input(
-                    "Nombre de la nueva categoria",
-                    placeholder="Ej: RV Small Caps",
-                    key="new_category_name",
-                    label_visibility="collapsed"
-                )
-            with col_add:
-                if st.button("Crear", type="secondary"):
-                    if new_cat_name.strip():
-                        with FundService(db_path=db_path) as svc:
-                            if svc.add_category(new_cat_name.strip()):
-                                st.success(f"Categoria '{new_cat_name}' creada")
-                                invalidate_fund_cache()
-                                st.rerun()
-                            else:
-                                st.warning("La categoria ya existe")
-            final_category = new_cat_name.strip() if new_cat_name else None
-        elif selected_category:
-            final_category = selected_category
-
-        # Boton guardar
-        col_save, col_cancel = st.columns([1, 3])
-
-        with col_save:
-            if st.button("💾 Guardar en Base de Datos", type="primary", use_container_width=True):
-                with st.spinner("Guardando..."):
-                    try:
-                        with FundService(db_path=db_path) as service:
-                            fund = service.fetch_and_import_fund(preview['isin'])
-                            # Guardar categoria personalizada si se seleccionó
-                            if final_category:
-                                fund.custom_category = final_category
-                                service.repository.update(fund)
-                            st.success(f"Fondo guardado: {fund.name}")
-                            st.session_state.fund_preview = None
-                            invalidate_fund_cache()
-                            st.rerun()
-                    except Exception as e:
-                        st.error(f"Error guardando: {e}")
+        if sectors or countries or alloc_data or holdings:
+            fig = _preview_figure(
+                preview['isin'],
+                tuple((sec['name'], sec['weight']) for sec in sectors),
+                tuple((c['name'], c['weight']) for c in countries),
+                alloc_data,
+                holdings
+            )
+            st.plotly_chart(fig, use_container_width=True)
+
+        st.divider()
 
-        with col_cancel:
-            if st.button("Cancelar"):
-                st.session_state.fund_preview = None
-                st.rerun()
+        # Categoria + guardar: fragmento, no reconstruye la ficha al interactuar
+        render_import_save_section(db_path, preview)
 
 
 # =============================================================================
 # TAB 2: MI CATALOGO
 # =============================================================================
 
-with tab_catalog:
+def _change_catalog_page(step: int):
+    """Callback de paginacion: se aplica antes del rerun del fragmento."""
+    st.session_state.catalog_page += step
+
+
+@st.fragment
+def render_catalog_tab(db_path: str):
+    """
+    Pestana del catalogo como fragmento: filtros, paginacion y seleccion de
+    fila solo vuelven a ejecutar esta funcion, no la pagina completa.
+    """
     st.markdown("### Mi Catalogo de Fondos")
 
     try:
         with FundService(db_path=db_path) as service:
-            # Verificar si hay fondos
-            if not service.has_funds():
+            # Verificar si hay fondos (conteo cacheado, sin consulta por rerun)
+            total_funds = get_cached_fund_count(db_path, st.session_state.fund_cache_key)
+            if total_funds == 0:
                 st.info("El catalogo esta vacio. Usa la pestana 'Importar Fondo' para anadir fondos.")
-                st.stop()
+                return
 
             # =================================================================
             # FILTRO POR CATEGORIA PERSONALIZADA (Pills - dinamico desde BD)
             # =================================================================
             st.markdown("**Filtrar por categoria:**")
-            db_categories = service.get_all_categories()
+            db_categories = get_cached_categories(db_path)
             category_options = ["Todas"] + db_categories
             selected_cat_filter = st.radio(
                 "Categoria",
@@ -426,50 +578,31 @@ with tab_catalog:
             filters['order_by'] = order_field
             filters['order_desc'] = order_desc
 
-            # Obtener fondos
-            all_funds = service.search_funds(**filters)
-
-            # Filtrar por categoria personalizada
-            if selected_cat_filter != "Todas":
-                funds = [f for f in all_funds if f.custom_category == selected_cat_filter]
-            else:
-                funds = all_funds
+            # Obtener fondos (tabla y metricas ya preparadas en la cache)
+            df_catalog, catalog_metrics = get_cached_funds(
+                db_path,
+                st.session_state.fund_cache_key,
+                custom_category=selected_cat_filter if selected_cat_filter != "Todas" else None,
+                **filters
+            )
 
-            if not funds:
+            if df_catalog.empty:
                 st.warning("No se encontraron fondos con esos filtros.")
-                st.stop()
+                return
 
             # Metricas resumen
             col_m1, col_m2, col_m3, col_m4 = st.columns(4)
             with col_m1:
-                st.metric("Fondos", len(funds))
+                st.metric("Fondos", catalog_metrics['count'])
             with col_m2:
-                avg_ter = sum(f.ter for f in funds if f.ter) / max(len([f for f in funds if f.ter]), 1)
-                st.metric("TER Promedio", f"{avg_ter:.2f}%")
+                st.metric("TER Promedio", f"{catalog_metrics['avg_ter']:.2f}%")
             with col_m3:
-                avg_ret = sum(f.return_1y for f in funds if f.return_1y) / max(len([f for f in funds if f.return_1y]), 1)
-                st.metric("Rent. 1A Promedio", f"{avg_ret:+.1f}%")
+                st.metric("Rent. 1A Promedio", f"{catalog_metrics['avg_return_1y']:+.1f}%")
             with col_m4:
-                total_aum = sum(f.aum for f in funds if f.aum)
-                st.metric("AUM Total", f"{total_aum:,.0f}M")
+                st.metric("AUM Total", f"{catalog_metrics['total_aum']:,.0f}M")
 
             st.divider()
 
-            # Preparar DataFrame para tabla
-            data_for_table = []
-            for f in funds:
-                data_for_table.append({
-                    'ISIN': f.isin,
-                    'Nombre': f.name[:45] + '...' if len(f.name) > 45 else f.name,
-                    'Mi Cat.': f.custom_category or '-',
-                    'TER %': f.ter,
-                    'Riesgo': f.risk_level,
-                    'Rent 1A %': f.return_1y,
-                    'Rent 3A %': f.return_3y,
-                })
-
-            df_catalog = pd.DataFrame(data_for_table)
-
             # =================================================================
             # PAGINACION
             # =================================================================
@@ -489,9 +622,11 @@ with tab_catalog:
             col_prev, col_info, col_next = st.columns([1, 2, 1])
 
             with col_prev:
-                if st.button("← Anterior", disabled=st.session_state.catalog_page <= 1):
-                    st.session_state.catalog_page -= 1
-                    st.rerun()
+                st.button(
+                    "← Anterior",
+                    disabled=st.session_state.catalog_page <= 1,
+                    on_click=_change_catalog_page, args=(-1,)
+                )
 
             with col_info:
                 st.markdown(
@@ -503,9 +638,11 @@ with tab_catalog:
                 )
 
             with col_next:
-                if st.button("Siguiente →", disabled=st.session_state.catalog_page >= total_pages):
-                    st.session_state.catalog_page += 1
-                    st.rerun()
+                st.button(
+                    "Siguiente →",
+                    disabled=st.session_state.catalog_page >= total_pages,
+                    on_click=_change_catalog_page, args=(1,)
+                )
 
             # Slice del DataFrame para la pagina actual
             start_idx = (st.session_state.catalog_page - 1) * ITEMS_PER_PAGE
@@ -617,8 +754,9 @@ with tab_catalog:
                             except Exception:
                                 pass  # Si falla el cálculo, no mostramos KPI pero sí el gráfico
 
+                            # WebGL: el historico NAV puede tener miles de puntos
                             fig_nav = go.Figure()
-                            fig_nav.add_trace(go.Scatter(
+                            fig_nav.add_trace(go.Scattergl(
                                 x=nav_df['date'],
                                 y=nav_df['nav'],
                                 mode='lines',
@@ -789,20 +927,20 @@ with tab_catalog:
                         # --- DONUT SECTORES ---
                         st.markdown("**Sectores**")
                         if sectors and len(sectors) > 0:
-                            df_sec = pd.DataFrame(sectors[:8])
-                            if 'name' in df_sec.columns and 'weight' in df_sec.columns:
+                            top_sec = sectors[:8]
+                            if 'name' in top_sec[0] and 'weight' in top_sec[0]:
+                                names_sec = [d['name'] for d in top_sec]
+                                weights_sec = [d['weight'] for d in top_sec]
                                 # Crear etiquetas personalizadas: "Nombre XX.X%"
                                 # Ocultar etiquetas para valores < 5%
-                                labels_sec = []
-                                for _, row in df_sec.iterrows():
-                                    if row['weight'] >= 5:
-                                        labels_sec.append(f"{row['name']} {row['weight']:.1f}%")
-                                    else:
-                                        labels_sec.append('')
+                                labels_sec = [
+                                    f"{n} {w:.1f}%" if w >= 5 else ''
+                                    for n, w in zip(names_sec, weights_sec)
+                                ]
 
                                 fig_sec = go.Figure(data=[go.Pie(
-                                    labels=df_sec['name'],
-                                    values=df_sec['weight'],
+                                    labels=names_sec,
+                                    values=weights_sec,
                                     hole=0.35,
                                     text=labels_sec,
                                     textposition='outside',
@@ -828,20 +966,20 @@ with tab_catalog:
                         # --- DONUT PAISES ---
                         st.markdown("**Paises**")
                         if countries and len(countries) > 0:
-                            df_cty = pd.DataFrame(countries[:8])
-                            if 'name' in df_cty.columns and 'weight' in df_cty.columns:
+                            top_cty = countries[:8]
+                            if 'name' in top_cty[0] and 'weight' in top_cty[0]:
+                                names_cty = [d['name'] for d in top_cty]
+                                weights_cty = [d['weight'] for d in top_cty]
                                 # Crear etiquetas personalizadas: "Nombre XX.X%"
                                 # Ocultar etiquetas para valores < 5%
-                                labels_cty = []
-                                for _, row in df_cty.iterrows():
-                                    if row['weight'] >= 5:
-                                        labels_cty.append(f"{row['name']} {row['weight']:.1f}%")
-                                    else:
-                                        labels_cty.append('')
+                                labels_cty = [
+                                    f"{n} {w:.1f}%" if w >= 5 else ''
+                                    for n, w in zip(names_cty, weights_cty)
+                                ]
 
                                 fig_cty = go.Figure(data=[go.Pie(
-                                    labels=df_cty['name'],
-                                    values=df_cty['weight'],
+                                    labels=names_cty,
+                                    values=weights_cty,
                                     hole=0.35,
                                     text=labels_cty,
                                     textposition='outside',
@@ -868,23 +1006,24 @@ with tab_catalog:
                         st.markdown("**Desglose detallado**")
                         tab_sec, tab_cty = st.tabs(["Sectores", "Paises"])
 
+                        # Tablas pequenas: columnas en dict, sin DataFrame intermedio
                         with tab_sec:
                             if sectors and len(sectors) > 0:
-                                df_sec_table = pd.DataFrame(sectors)
-                                if 'weight' in df_sec_table.columns:
-                                    df_sec_table['weight'] = df_sec_table['weight'].apply(lambda x: f"{x:.2f}%")
-                                    df_sec_table.columns = ['Sector', 'Peso']
-                                    st.dataframe(df_sec_table, hide_index=True, height=150)
+                                if 'weight' in sectors[0]:
+                                    st.dataframe({
+                                        'Sector': [s.get('name') for s in sectors],
+                                        'Peso': [f"{s['weight']:.2f}%" for s in sectors],
+                                    }, hide_index=True, height=150)
                             else:
                                 st.caption("Pulsa 'Actualizar datos' para cargar sectores")
 
                         with tab_cty:
                             if countries and len(countries) > 0:
-                                df_cty_table = pd.DataFrame(countries[:10])
-                                if 'weight' in df_cty_table.columns:
-                                    df_cty_table['weight'] = df_cty_table['weight'].apply(lambda x: f"{x:.2f}%")
-                                    df_cty_table.columns = ['Pais', 'Peso']
-                                    st.dataframe(df_cty_table, hide_index=True, height=150)
+                                if 'weight' in countries[0]:
+                                    st.dataframe({
+                                        'Pais': [c.get('name') for c in countries[:10]],
+                                        'Peso': [f"{c['weight']:.2f}%" for c in countries[:10]],
+                                    }, hide_index=True, height=150)
                             else:
                                 st.caption("Pulsa 'Actualizar datos' para cargar paises")
 
@@ -897,8 +1036,8 @@ with tab_catalog:
 
                     with col_cat:
                         st.markdown("**Mi Categoria:**")
-                        # Obtener categorias dinamicas de la BD
-                        edit_categories = service.get_all_categories()
+                        # Categorias dinamicas de la BD (cacheadas)
+                        edit_categories = get_cached_categories(db_path)
                         current_cat = fund.custom_category or ""
                         cat_options = ["", "➕ Nueva..."] + edit_categories
                         current_idx = cat_options.index(current_cat) if current_cat in cat_options else 0
@@ -923,14 +1062,16 @@ with tab_catalog:
                             if st.button("Crear y asignar", key=f"create_cat_{fund.isin}"):
                                 if new_cat_input.strip():
                                     service.add_category(new_cat_input.strip())
-                                    fund.custom_category = new_cat_input.strip()
-                                    service.repository.update(fund)
+                                    service.repository.set_custom_category(
+                                        fund.isin, new_cat_input.strip()
+                                    )
                                     invalidate_fund_cache()
                                     st.success(f"Categoria '{new_cat_input}' creada y asignada")
                                     st.rerun()
                         elif new_category != current_cat:
-                            fund.custom_category = new_category if new_category else None
-                            service.repository.update(fund)
+                            service.repository.set_custom_category(
+                                fund.isin, new_category if new_category else None
+                            )
                             invalidate_fund_cache()
                             st.success("Categoria actualizada")
                             st.rerun()
@@ -971,16 +1112,35 @@ with tab_catalog:
                             invalidate_fund_cache()
                             st.rerun()
 
-            # Exportar
+            # Exportar (los ficheros se generan solo al pulsar "Preparar")
             st.divider()
-            csv = df_catalog.to_csv(index=False)
-            st.download_button(
-                "📥 Exportar catalogo a CSV",
-                data=csv,
-                file_name="mi_catalogo_fondos.csv",
-                mime="text/csv"
-            )
+            col_csv, col_parquet = st.columns(2)
+            with col_csv:
+                if st.button("📄 Preparar CSV", use_container_width=True):
+                    st.download_button(
+                        "📥 Exportar catalogo a CSV",
+                        data=df_catalog.to_csv(index=False),
+                        file_name="mi_catalogo_fondos.csv",
+                        mime="text/csv",
+                        use_container_width=True
+                    )
+            with col_parquet:
+                # Parquet conserva los tipos y es mas rapido de escribir/leer
+                if st.button("📄 Preparar Parquet", use_container_width=True):
+                    st.download_button(
+                        "📦 Exportar catalogo a Parquet",
+                        data=df_catalog.to_parquet(
+                            index=False, engine='pyarrow', compression='zstd'
+                        ),
+                        file_name="mi_catalogo_fondos.parquet",
+                        mime="application/vnd.apache.parquet",
+                        use_container_width=True
+                    )
 
     except Exception as e:
         st.error(f"Error: {e}")
         st.exception(e)
+
+
+with tab_catalog:
+    render_catalog_tab(db_path)
@@ -46,6 +46,12 @@ FUND_COLUMNS = [
     ('custom_category', 'VARCHAR(50)'),
 ]
 
+# Indices a crear: (nombre, tabla, columnas)
+INDEXES = [
+    # Migración 004: consultas por ticker ordenadas por fecha
+    ('ix_transactions_ticker_date', 'transactions', 'ticker, date'),
+]
+
 # Categorias iniciales para tabla categories
 DEFAULT_CATEGORIES = [
     "RV Global",
@@ -192,6 +198,54 @@ def apply_category_migrations(db_path: Path, dry_run: bool = False) -> dict:
     return result
 
 
+def apply_index_migrations(db_path: Path, dry_run: bool = False) -> dict:
+    """
+    Crea los índices que falten en una base de datos.
+
+    Args:
+        db_path: Ruta al archivo .db
+        dry_run: Si True, solo reporta sin aplicar cambios
+
+    Returns:
+        dict con estadísticas de la migración
+    """
+    result = {
+        'db': db_path.name,
+        'indexes_created': [],
+        'errors': []
+    }
+
+    try:
+        conn = sqlite3.connect(str(db_path))
+
+        for idx_name, table, columns in INDEXES:
+            if not table_exists(conn, table):
+                continue
+
+            cursor = conn.execute(
+                "SELECT name FROM sqlite_master WHERE type='index' AND name=?",
+                (idx_name,)
+            )
+            if cursor.fetchone() is not None:
+                continue
+
+            if not dry_run:
+                try:
+                    conn.execute(f"CREATE INDEX {idx_name} ON {table}({columns})")
+                    conn.commit()
+                except Exception as e:
+                    result['errors'].append(f"{idx_name}: {e}")
+                    continue
+            result['indexes_created'].append(idx_name)
+
+        conn.close()
+
+    except Exception as e:
+        result['errors'].append(str(e))
+
+    return result
+
+
 def find_all_databases() -> list:
     """Encuentra todas las bases de datos de portfolios."""
     dbs = []
@@ -256,6 +310,7 @@ def main():
     total_columns_added = 0
     total_categories_added = 0
     total_tables_created = 0
+    total_indexes_created = 0
     total_errors = 0
 
     for db_path in databases:
@@ -291,8 +346,21 @@ def main():
             print(f"  Categorias {action}: {cat_result['categories_added']}")
             total_categories_added += cat_result['categories_added']
 
+        # Migración de índices
+        idx_result = apply_index_migrations(db_path, dry_run=args.check)
+
+        if idx_result['indexes_created']:
+            action = "Por crear" if args.check else "Creados"
+            print(f"  Indices {action}: {len(idx_result['indexes_created'])}")
+            for idx in idx_result['indexes_created']:
+                print(f"    + {idx}")
+            total_indexes_created += len(idx_result['indexes_created'])
+
         # Errores
-        all_errors = result.get('errors', []) + cat_result.get('errors', [])
+        all_errors = (
+            result.get('errors', []) + cat_result.get('errors', [])
+            + idx_result.get('errors', [])
+        )
         if all_errors:
             print(f"  Errores: {len(all_errors)}")
             for err in all_errors:
@@ -309,14 +377,17 @@ def main():
     if args.check:
         print(f"Columnas pendientes: {total_columns_added}")
         print(f"Tablas por crear: {total_tables_created}")
+        print(f"Indices por crear: {total_indexes_created}")
         print(f"Categorias por insertar: {total_categories_added}")
     else:
         print(f"Columnas añadidas: {total_columns_added}")
         print(f"Tablas creadas: {total_tables_created}")
+        print(f"Indices creados: {total_indexes_created}")
         print(f"Categorias insertadas: {total_categories_added}")
     print(f"Errores: {total_errors}")
 
-    if args.check and (total_columns_added > 0 or total_tables_created > 0):
+    if args.check and (total_columns_added > 0 or total_tables_created > 0
+                       or total_indexes_created > 0):
         print()
         print("Ejecuta sin --check para aplicar los cambios.")
 
@@ -405,7 +405,7 @@ class BenchmarkComparator:
         series = points_df['value'].reindex(date_range, method='ffill')
         
         # Rellenar NaN iniciales con el primer valor válido
-        series = series.fillna(method='bfill')
+        series = series.bfill()
         
         # Filtrar valores > 0
         series = series[series > 0]
@@ -503,7 +503,7 @@ class BenchmarkComparator:
             # y rellenar benchmark hacia adelante
             all_dates = portfolio.index
             benchmark = benchmark.reindex(all_dates, method='ffill')
-            benchmark = benchmark.fillna(method='bfill')  # Por si hay NaN al inicio
+            benchmark = benchmark.bfill()  # Por si hay NaN al inicio
             common_dates = portfolio.index
         
         portfolio = portfolio.loc[common_dates]
@@ -26,6 +26,7 @@ from pathlib import Path
 from typing import List, Dict, Optional, Protocol, runtime_checkable
 from datetime import datetime
 import shutil
+import sqlite3
 
 try:
     from src.logger import get_logger
@@ -40,6 +41,39 @@ DEFAULT_PORTFOLIOS_DIR = Path(__file__).parent.parent.parent / 'data' / 'portfol
 # Nombre del perfil por defecto (migración desde database.db existente)
 DEFAULT_PROFILE_NAME = 'Principal'
 
+# Ficheros auxiliares que SQLite crea junto a la BD en modo WAL
+SQLITE_SIDECAR_SUFFIXES = ('-wal', '-shm')
+
+# Segundos que el checkpoint espera a que terminen lectores/escritores
+SQLITE_CHECKPOINT_TIMEOUT = 5.0
+
+
+def _checkpoint_sqlite(db_path: Path):
+    """
+    Vuelca el WAL al fichero principal antes de copiar, mover o borrar la BD.
+
+    En modo WAL los cambios confirmados pueden seguir en '<bd>-wal'; sin este
+    paso una copia o un renombrado del .db no los incluiría.
+
+    Raises:
+        PermissionError: Si otra conexión mantiene abierta una transacción y
+            el WAL no se ha podido volcar por completo
+    """
+    if not Path(f'{db_path}-wal').exists():
+        return
+    conn = sqlite3.connect(str(db_path), timeout=SQLITE_CHECKPOINT_TIMEOUT)
+    try:
+        busy, log, checkpointed = conn.execute('PRAGMA wal_checkpoint(TRUNCATE)').fetchone()
+    finally:
+        conn.close()
+
+    if busy or log != checkpointed:
+        logger.warning(
+            f"Checkpoint incompleto en {db_path.name}: "
+            f"busy={busy}, log={log}, checkpointed={checkpointed}"
+        )
+        raise PermissionError(f"La cartera '{db_path.stem}' está en uso")
+
 
 @runtime_checkable
 class ProfileManagerProtocol(Protocol):
@@ -117,6 +151,7 @@ class LocalProfileManager:
 
         if old_db_path.exists() and not new_db_path.exists():
             logger.info(f"Migrando {old_db_path} -> {new_db_path}")
+            _checkpoint_sqlite(old_db_path)
             shutil.copy2(old_db_path, new_db_path)
             logger.info(f"Migración completada: {DEFAULT_PROFILE_NAME}")
 
@@ -258,6 +293,7 @@ class LocalProfileManager:
 
         Raises:
             ValueError: Si confirm no es True o el perfil no existe
+            PermissionError: Si la cartera está en uso por otra conexión
         """
         if not confirm:
             raise ValueError("Debe confirmar la eliminación con confirm=True")
@@ -272,7 +308,10 @@ class LocalProfileManager:
             raise ValueError("No se puede eliminar el último perfil")
 
         logger.warning(f"Eliminando perfil: {name}")
+        _checkpoint_sqlite(db_path)
         db_path.unlink()
+        for suffix in SQLITE_SIDECAR_SUFFIXES:
+            Path(f'{db_path}{suffix}').unlink(missing_ok=True)
         logger.info(f"Perfil eliminado: {name}")
 
         return True
@@ -290,6 +329,7 @@ class LocalProfileManager:
 
         Raises:
             ValueError: Si el perfil no existe o el nuevo nombre es inválido
+            PermissionError: Si la cartera está en uso por otra conexión
         """
         old_path = self.portfolios_dir / f'{old_name}.db'
         clean_new_name = self._sanitize_name(new_name)
@@ -306,7 +346,14 @@ class LocalProfileManager:
             raise ValueError(f"Ya existe un perfil llamado '{clean_new_name}'")
 
         logger.info(f"Renombrando perfil: {old_name} -> {clean_new_name}")
+        _checkpoint_sqlite(old_path)
         old_path.rename(new_path)
+        # Los auxiliares acompañan al .db: una conexión que siga abierta
+        # conserva así la misma BD, WAL y memoria compartida
+        for suffix in SQLITE_SIDECAR_SUFFIXES:
+            sidecar = Path(f'{old_path}{suffix}')
+            if sidecar.exists():
+                sidecar.rename(f'{new_path}{suffix}')
 
         return clean_new_name
 
@@ -323,6 +370,7 @@ class LocalProfileManager:
 
         Raises:
             ValueError: Si el origen no existe o el destino ya existe
+            PermissionError: Si la cartera está en uso por otra conexión
         """
         source_path = self.portfolios_dir / f'{source_name}.db'
         clean_new_name = self._sanitize_name(new_name)
@@ -335,6 +383,7 @@ class LocalProfileManager:
             raise ValueError(f"Ya existe un perfil llamado '{clean_new_name}'")
 
         logger.info(f"Duplicando perfil: {source_name} -> {clean_new_name}")
+        _checkpoint_sqlite(source_path)
         shutil.copy2(source_path, new_path)
 
         return str(new_path)
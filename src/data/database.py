@@ -30,7 +30,7 @@ from datetime import datetime
 from pathlib import Path
 from typing import Optional, List, Dict, Any
 
-from sqlalchemy import create_engine, Column, Integer, String, Float, Date, DateTime, Text, Boolean
+from sqlalchemy import create_engine, event, func, Index, Column, Integer, String, Float, Date, DateTime, Text, Boolean
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 import pandas as pd
@@ -52,6 +52,37 @@ Base = declarative_base()
 # Ruta por defecto de la base de datos (ajustada para nueva ubicación)
 DEFAULT_DB_PATH = Path(__file__).parent.parent.parent / 'data' / 'database.db'
 
+# PRAGMAs aplicados a cada conexión SQLite: WAL permite lectores concurrentes
+# con un escritor; cache de páginas de 64 MB y mmap/temp_store en memoria
+# reducen E/S en las lecturas. synchronous=NORMAL en WAL no corrompe la BD,
+# pero un corte de luz puede perder las últimas transacciones confirmadas.
+SQLITE_PRAGMAS = (
+    'PRAGMA journal_mode=WAL',
+    'PRAGMA synchronous=NORMAL',
+    'PRAGMA cache_size=-65536',
+    'PRAGMA temp_store=MEMORY',
+    'PRAGMA mmap_size=268435456',
+)
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    """Listener 'connect' de SQLAlchemy: configura cada conexión SQLite nueva."""
+    cursor = dbapi_connection.cursor()
+    for pragma in SQLITE_PRAGMAS:
+        cursor.execute(pragma)
+    cursor.close()
+
+
+def _year_bounds(year: int):
+    """
+    Rango [1 ene, 31 dic] de un año para filtrar por fecha en SQL.
+
+    Comparar la columna con un rango (en vez de extract('year', ...)) evita
+    evaluar una función por fila y permite usar índices sobre la fecha.
+    """
+    from datetime import date
+    return date(int(year), 1, 1), date(int(year), 12, 31)
+
 
 # =============================================================================
 # MODELOS DE DATOS
@@ -104,6 +135,11 @@ class Transaction(Base):
     created_at = Column(DateTime, default=datetime.now)
     updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
 
+    __table_args__ = (
+        # Resumen por ticker (GROUP BY ticker con MIN/MAX de fecha)
+        Index('ix_transactions_ticker_date', 'ticker', 'date'),
+    )
+
     def __repr__(self):
         return f"<Transaction(id={self.id}, {self.type} {self.quantity} {self.ticker} @ {self.price} {self.currency})>"
 
@@ -309,6 +345,7 @@ class Database:
 
             logger.debug(f"Conectando a SQLite: {self.db_path}")
             self.engine = create_engine(f'sqlite:///{self.db_path}', echo=False)
+            event.listen(self.engine, 'connect', _set_sqlite_pragmas)
 
         # Crear tablas si no existen
         Base.metadata.create_all(self.engine)
@@ -439,8 +476,8 @@ class Database:
             query = query.filter(Transaction.date <= end_date)
 
         if year:
-            from sqlalchemy import extract
-            query = query.filter(extract('year', Transaction.date) == year)
+            year_start, year_end = _year_bounds(year)
+            query = query.filter(Transaction.date >= year_start, Transaction.date <= year_end)
 
         # Ordenar
         if order.upper() == 'DESC':
@@ -453,6 +490,37 @@ class Database:
 
         return query.all()
 
+    def get_tickers_summary(self) -> pd.DataFrame:
+        """
+        Resumen por ticker agregado en la BD (una fila por ticker).
+
+        Returns:
+            DataFrame con ticker, name, asset_type, currency, market,
+            first_date, last_date y n_operations
+        """
+        rows = (
+            self.session.query(
+                Transaction.ticker,
+                func.min(Transaction.name),
+                func.min(Transaction.asset_type),
+                func.min(Transaction.currency),
+                func.min(Transaction.market),
+                func.min(Transaction.date),
+                func.max(Transaction.date),
+                func.count(Transaction.id),
+            )
+            .group_by(Transaction.ticker)
+            .order_by(Transaction.ticker)
+            .all()
+        )
+        df = pd.DataFrame(rows, columns=[
+            'ticker', 'name', 'asset_type', 'currency', 'market',
+            'first_date', 'last_date', 'n_operations'
+        ])
+        df['first_date'] = pd.to_datetime(df['first_date'])
+        df['last_date'] = pd.to_datetime(df['last_date'])
+        return df
+
     def get_transaction_by_id(self, transaction_id: int) -> Optional[Transaction]:
         """
         Obtiene una transaccion por su ID.
@@ -580,14 +648,51 @@ class Database:
         Returns:
             Lista de objetos Dividend
         """
+        return self._dividends_query(ticker, year, start_date, end_date).all()
+
+    def get_dividends_dataframe(self,
+                                ticker: str = None,
+                                year: int = None,
+                                start_date: str = None,
+                                end_date: str = None) -> pd.DataFrame:
+        """
+        Obtiene dividendos directamente como DataFrame (sin objetos ORM).
+
+        Mismos filtros que get_dividends(). La columna 'date' se parsea
+        como datetime en la propia lectura.
+
+        Returns:
+            DataFrame con id, ticker, name, date, gross_amount, net_amount,
+            withholding_tax, currency y notes (orden por fecha descendente)
+        """
+        query = self._dividends_query(ticker, year, start_date, end_date).with_entities(
+            Dividend.id,
+            Dividend.ticker,
+            Dividend.name,
+            Dividend.date,
+            Dividend.gross_amount,
+            Dividend.net_amount,
+            Dividend.withholding_tax,
+            Dividend.currency,
+            Dividend.notes
+        )
+
+        return pd.read_sql_query(
+            query.statement,
+            self.session.connection(),
+            parse_dates=['date']
+        )
+
+    def _dividends_query(self, ticker=None, year=None, start_date=None, end_date=None):
+        """Construye la query filtrada de dividendos (orden por fecha descendente)"""
         query = self.session.query(Dividend)
 
         if ticker:
             query = query.filter(Dividend.ticker == ticker.upper())
 
         if year:
-            from sqlalchemy import extract
-            query = query.filter(extract('year', Dividend.date) == year)
+            year_start, year_end = _year_bounds(year)
+            query = query.filter(Dividend.date >= year_start, Dividend.date <= year_end)
 
         if start_date:
             if isinstance(start_date, str):
@@ -599,7 +704,34 @@ class Database:
                 end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
             query = query.filter(Dividend.date <= end_date)
 
-        return query.order_by(Dividend.date.desc()).all()
+        return query.order_by(Dividend.date.desc())
+
+    def get_dividend_sums_by_ticker(self, start_date: str = None) -> List[Dict]:
+        """
+        Suma dividendos por ticker en una sola consulta (GROUP BY).
+
+        Args:
+            start_date: Fecha inicio (YYYY-MM-DD, opcional)
+
+        Returns:
+            Lista de dicts con ticker, gross, net y payments
+        """
+        query = self.session.query(
+            Dividend.ticker,
+            func.sum(Dividend.gross_amount).label('gross'),
+            func.sum(Dividend.net_amount).label('net'),
+            func.count(Dividend.id).label('payments')
+        )
+
+        if start_date:
+            if isinstance(start_date, str):
+                start_date = datetime.strptime(start_date, '%Y-%m-%d').date()
+            query = query.filter(Dividend.date >= start_date)
+
+        return [
+            {'ticker': r.ticker, 'gross': r.gross or 0.0, 'net': r.net or 0.0, 'payments': r.payments}
+            for r in query.group_by(Dividend.ticker).all()
+        ]
 
     def update_dividend(self, dividend_id: int, update_data: Dict) -> bool:
         """
@@ -879,6 +1011,24 @@ class Database:
     # UTILIDADES
     # =========================================================================
 
+    def count_transactions(self) -> int:
+        """Número total de transacciones (SELECT COUNT(*), sin cargar filas)"""
+        return self.session.query(func.count(Transaction.id)).scalar() or 0
+
+    def count_dividends(self) -> int:
+        """Número total de dividendos (SELECT COUNT(*), sin cargar filas)"""
+        return self.session.query(func.count(Dividend.id)).scalar() or 0
+
+    def count_transactions_by_type(self) -> Dict[str, int]:
+        """Retorna {tipo: nº de transacciones} agrupando en la BD"""
+        result = (
+            self.session.query(Transaction.type, func.count(Transaction.id))
+            .group_by(Transaction.type)
+            .order_by(func.count(Transaction.id).desc())
+            .all()
+        )
+        return {t: n for t, n in result}
+
     def get_database_stats(self) -> Dict:
         """Retorna estadísticas de la base de datos"""
         stats = {
@@ -0,0 +1,135 @@
+"""
+Migración 004: Índice compuesto (ticker, date) en transactions
+
+Acelera el resumen por ticker (GROUP BY ticker con MIN/MAX de fecha).
+Las BDs nuevas ya lo crean con create_all; esta migración lo añade a las
+BDs existentes, donde create_all no crea índices nuevos.
+
+Ejecutar:
+    python -m src.data.migrations.004_add_transactions_ticker_date_index
+
+O desde la raiz del proyecto:
+    python src/data/migrations/004_add_transactions_ticker_date_index.py
+"""
+
+import sys
+from pathlib import Path
+
+# Agregar raiz del proyecto al path
+ROOT_DIR = Path(__file__).parent.parent.parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from sqlalchemy import inspect, text
+from src.data.database import Database
+
+
+# Índices a crear
+NEW_INDEXES = [
+    ('ix_transactions_ticker_date', 'transactions', 'ticker, date'),
+]
+
+
+def get_existing_indexes(engine, table_name: str) -> set:
+    """Obtiene los nombres de índices existentes en una tabla."""
+    inspector = inspect(engine)
+    if table_name not in inspector.get_table_names():
+        return set()
+    indexes = inspector.get_indexes(table_name)
+    return {idx['name'] for idx in indexes if idx['name']}
+
+
+def run_migration(db_path: str = None):
+    """
+    Ejecuta la migración para crear el índice (ticker, date).
+
+    Args:
+        db_path: Ruta a la base de datos. Si es None, usa la por defecto.
+    """
+    print("=" * 60)
+    print("Migración 004: Índice (ticker, date) en transactions")
+    print("=" * 60)
+
+    db = Database(db_path=db_path) if db_path else Database()
+    engine = db.engine
+
+    try:
+        changes_made = []
+
+        for idx_name, table_name, columns in NEW_INDEXES:
+            existing_idx = get_existing_indexes(engine, table_name)
+            if idx_name in existing_idx:
+                print(f"   OK - Índice {idx_name} ya existe")
+            else:
+                sql = f"CREATE INDEX IF NOT EXISTS {idx_name} ON {table_name}({columns})"
+                print(f"   Ejecutando: {sql}")
+                with engine.connect() as conn:
+                    conn.execute(text(sql))
+                    conn.commit()
+                changes_made.append(f"Índice {idx_name} creado")
+
+        print("\n" + "=" * 60)
+        if changes_made:
+            print(f"Migración completada. Cambios realizados: {len(changes_made)}")
+            for change in changes_made:
+                print(f"  - {change}")
+        else:
+            print("Migración completada. No se requirieron cambios.")
+        print("=" * 60)
+
+        return True
+
+    except Exception as e:
+        print(f"\nERROR durante la migración: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+    finally:
+        db.close()
+
+
+def rollback_migration(db_path: str = None):
+    """Deshace la migración (elimina el índice)."""
+    print("=" * 60)
+    print("Rollback: Eliminar índice (ticker, date) de transactions")
+    print("=" * 60)
+
+    db = Database(db_path=db_path) if db_path else Database()
+    engine = db.engine
+
+    try:
+        for idx_name, _, _ in NEW_INDEXES:
+            with engine.connect() as conn:
+                conn.execute(text(f"DROP INDEX IF EXISTS {idx_name}"))
+                conn.commit()
+            print(f"   Índice {idx_name} eliminado")
+        return True
+
+    except Exception as e:
+        print(f"ERROR durante rollback: {e}")
+        return False
+
+    finally:
+        db.close()
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description='Migración: índice (ticker, date) en transactions'
+    )
+    parser.add_argument('--rollback', action='store_true', help='Deshacer migracion')
+    parser.add_argument(
+        '--db-path',
+        type=str,
+        help='Ruta a la base de datos (opcional)'
+    )
+    args = parser.parse_args()
+
+    if args.rollback:
+        success = rollback_migration(args.db_path)
+    else:
+        success = run_migration(args.db_path)
+
+    sys.exit(0 if success else 1)
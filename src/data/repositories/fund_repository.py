@@ -28,7 +28,7 @@ import json
 from datetime import date
 from typing import List, Optional, Dict, Any
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_, desc, asc
+from sqlalchemy import and_, or_, desc, asc, update
 
 try:
     from src.data.models import Fund
@@ -127,6 +127,24 @@ class FundRepository:
         self.session.refresh(fund)
         return fund
 
+    def set_custom_category(self, isin: str, category: Optional[str]) -> bool:
+        """
+        Asigna (o quita, con None) la categoria personalizada de un fondo.
+
+        Emite un unico UPDATE sobre la columna, sin cargar ni refrescar
+        el fondo completo.
+
+        Returns:
+            True si se actualizo, False si el ISIN no existe
+        """
+        result = self.session.execute(
+            update(Fund)
+            .where(Fund.isin == isin)
+            .values(custom_category=category)
+        )
+        self.session.commit()
+        return result.rowcount > 0
+
     def delete(self, fund_id: int) -> bool:
         """
         Elimina un fondo por su ID.
@@ -374,43 +392,52 @@ class FundRepository:
         """
         Obtiene estadisticas del catalogo.
 
+        Todos los agregados salen de una unica consulta (UNION ALL de los
+        GROUP BY), en lugar de una ida y vuelta a la BD por cada conteo.
+
         Returns:
-            Dict con conteos por categoria, gestora, etc.
+            Dict con conteos por categoria, gestora, etc. y TER medio
         """
-        from sqlalchemy import func
-
-        total = self.count()
-
-        # Conteo por categoria
-        by_category = dict(
-            self.session.query(Fund.category, func.count(Fund.id))
-            .group_by(Fund.category)
-            .all()
+        from sqlalchemy import func, literal, select, cast, union_all, Float, Integer, String
+
+        # Columnas: (tipo, clave, conteo, media); la media solo va en la fila avg_ter
+        no_avg = literal(None, Float)
+        stats_query = union_all(
+            select(literal('category'), Fund.category, func.count(Fund.id), no_avg)
+            .group_by(Fund.category),
+            select(literal('risk_level'), cast(Fund.risk_level, String), func.count(Fund.id), no_avg)
+            .group_by(Fund.risk_level),
+            select(literal('manager'), Fund.manager, func.count(Fund.id), no_avg)
+            .group_by(Fund.manager),
+            select(literal('avg_ter'), literal(None, String), literal(0, Integer),
+                   cast(func.avg(Fund.ter), Float)),
         )
 
-        # Conteo por riesgo
-        by_risk = dict(
-            self.session.query(Fund.risk_level, func.count(Fund.id))
-            .group_by(Fund.risk_level)
-            .all()
-        )
+        by_category = {}
+        by_risk = {}
+        managers = []
+        avg_ter = None
+        for kind, key, count, avg in self.session.execute(stats_query):
+            if kind == 'category':
+                by_category[key] = count
+            elif kind == 'risk_level':
+                by_risk[int(key) if key is not None else None] = count
+            elif kind == 'manager':
+                managers.append((key, count))
+            else:
+                avg_ter = avg
 
         # Top gestoras
-        top_managers = (
-            self.session.query(Fund.manager, func.count(Fund.id))
-            .group_by(Fund.manager)
-            .order_by(desc(func.count(Fund.id)))
-            .limit(10)
-            .all()
-        )
+        managers.sort(key=lambda m: m[1], reverse=True)
 
         return {
-            'total_funds': total,
+            'total_funds': sum(by_category.values()),
             'by_category': by_category,
             'by_risk_level': by_risk,
-            'top_managers': dict(top_managers),
+            'top_managers': dict(managers[:10]),
             'num_categories': len(by_category),
-            'num_managers': len(self.get_managers()),
+            'num_managers': sum(1 for name, _ in managers if name),
+            'avg_ter': float(avg_ter) if avg_ter is not None else 0,
         }
 
     # =========================================================================
@@ -477,7 +504,11 @@ class FundRepository:
 
         return {'inserted': inserted, 'updated': updated}
 
-    def upsert_from_provider(self, provider_data: Dict[str, Any]) -> Fund:
+    def upsert_from_provider(
+        self,
+        provider_data: Dict[str, Any],
+        custom_category: Optional[str] = None
+    ) -> Fund:
         """
         Inserta o actualiza un fondo desde datos del FundDataProvider.
 
@@ -486,6 +517,8 @@ class FundRepository:
 
         Args:
             provider_data: Diccionario devuelto por FundDataProvider.get_fund_data()
+            custom_category: Categoria personalizada a guardar en la misma
+                escritura (None = no tocar la existente)
 
         Returns:
             El fondo insertado o actualizado
@@ -528,6 +561,7 @@ class FundRepository:
             'source': 'morningstar',
             'external_id': provider_data.get('morningstar_code'),
             'data_date': date.today(),
+            'custom_category': custom_category,
         }
 
         # Serializar campos JSON
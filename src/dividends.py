@@ -14,6 +14,7 @@ Autor: Investment Tracker Project
 Fecha: Enero 2026
 """
 
+import io
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
@@ -232,24 +233,44 @@ class DividendManager:
         Returns:
             DataFrame con dividendos
         """
-        dividends = self.db.get_dividends(
+        df = self.get_dividends_df(
             ticker=ticker,
             year=year,
             start_date=start_date,
             end_date=end_date
         )
         
-        if not dividends:
+        if df.empty:
             return pd.DataFrame()
         
-        data = [self._dividend_to_dict(d) for d in dividends]
-        df = pd.DataFrame(data)
+        return df
+    
+    def get_dividends_df(self,
+                        ticker: str = None,
+                        year: int = None,
+                        start_date: str = None,
+                        end_date: str = None) -> pd.DataFrame:
+        """
+        Lee los dividendos de la BD directamente a un DataFrame.
         
-        if not df.empty:
-            df['date'] = pd.to_datetime(df['date'])
-            df = df.sort_values('date', ascending=False)
+        Evita materializar objetos ORM y reconstruir la tabla fila a fila.
+        Devuelve siempre las columnas aunque no haya resultados.
+        
+        Args:
+            ticker: Filtrar por ticker
+            year: Filtrar por año
+            start_date: Fecha inicio (YYYY-MM-DD)
+            end_date: Fecha fin (YYYY-MM-DD)
         
-        return df.reset_index(drop=True)
+        Returns:
+            DataFrame ordenado por fecha descendente
+        """
+        return self.db.get_dividends_dataframe(
+            ticker=ticker,
+            year=year,
+            start_date=start_date,
+            end_date=end_date
+        )
     
     def get_dividends_by_ticker(self, ticker: str) -> pd.DataFrame:
         """Obtiene todos los dividendos de un activo"""
@@ -354,14 +375,7 @@ class DividendManager:
         annual_dividends_net = df['net_amount'].sum() if not df.empty else 0
         
         # Obtener coste de adquisición desde portfolio
-        try:
-            from src.portfolio import Portfolio
-        except ImportError:
-            from portfolio import Portfolio
-        
-        portfolio = Portfolio()
-        positions = portfolio.get_current_positions()
-        portfolio.close()
+        positions = self._get_current_positions()
         
         position = positions[positions['ticker'] == ticker.upper()]
         
@@ -398,23 +412,82 @@ class DividendManager:
             'payments_last_year': len(df)
         }
     
-    def get_portfolio_yield(self) -> Dict:
+    def get_dividend_yields_all(self, positions: pd.DataFrame = None) -> pd.DataFrame:
         """
-        Calcula el yield medio de toda la cartera.
+        Calcula el YOC de todos los activos en cartera de una vez.
+        
+        Suma los dividendos del último año con un único GROUP BY y los
+        cruza con las posiciones actuales (en lugar de una consulta por ticker).
+        
+        Args:
+            positions: Posiciones actuales ya calculadas (None = calcularlas)
         
         Returns:
-            Dict con métricas de yield del portfolio
+            DataFrame con ticker, name, quantity, cost_basis,
+            annual_dividends_gross, annual_dividends_net, dividend_per_share,
+            yoc_gross, yoc_net y payments_last_year. Los yields quedan
+            a NaN si el coste base (o la cantidad) es cero.
         """
-        # Obtener coste total de la cartera
+        columns = [
+            'ticker', 'name', 'quantity', 'cost_basis',
+            'annual_dividends_gross', 'annual_dividends_net',
+            'dividend_per_share', 'yoc_gross', 'yoc_net', 'payments_last_year'
+        ]
+        
+        one_year_ago = (datetime.now() - timedelta(days=365)).strftime('%Y-%m-%d')
+        sums = pd.DataFrame(self.db.get_dividend_sums_by_ticker(start_date=one_year_ago))
+        
+        if sums.empty:
+            return pd.DataFrame(columns=columns)
+        
+        if positions is None:
+            positions = self._get_current_positions()
+        if positions.empty:
+            return pd.DataFrame(columns=columns)
+        
+        df = positions[['ticker', 'name', 'quantity', 'cost_basis']].merge(
+            sums, on='ticker', how='inner'
+        )
+        
+        cost = df['cost_basis'].where(df['cost_basis'] > 0)
+        quantity = df['quantity'].where(df['quantity'] > 0)
+        
+        df['annual_dividends_gross'] = df['gross'].round(2)
+        df['annual_dividends_net'] = df['net'].round(2)
+        df['dividend_per_share'] = (df['gross'] / quantity).round(4)
+        df['yoc_gross'] = (df['gross'] / cost * 100).round(2)
+        df['yoc_net'] = (df['net'] / cost * 100).round(2)
+        df['payments_last_year'] = df['payments']
+        df['cost_basis'] = df['cost_basis'].round(2)
+        
+        return df[columns].sort_values('yoc_net', ascending=False).reset_index(drop=True)
+    
+    def _get_current_positions(self) -> pd.DataFrame:
+        """Posiciones actuales leídas de la misma base de datos que los dividendos"""
         try:
             from src.portfolio import Portfolio
         except ImportError:
             from portfolio import Portfolio
         
-        portfolio = Portfolio()
-        total_cost = portfolio.get_total_cost_basis()
+        portfolio = Portfolio(self.db.db_path) if self.db.db_path else Portfolio()
         positions = portfolio.get_current_positions()
         portfolio.close()
+        return positions
+    
+    def get_portfolio_yield(self, positions: pd.DataFrame = None) -> Dict:
+        """
+        Calcula el yield medio de toda la cartera.
+        
+        Args:
+            positions: Posiciones actuales ya calculadas (None = calcularlas)
+        
+        Returns:
+            Dict con métricas de yield del portfolio
+        """
+        # Obtener coste total de la cartera
+        if positions is None:
+            positions = self._get_current_positions()
+        total_cost = round(positions['cost_basis'].sum(), 2) if not positions.empty else 0.0
         
         # Dividendos del último año
         one_year_ago = (datetime.now() - timedelta(days=365)).strftime('%Y-%m-%d')
@@ -765,30 +838,53 @@ class DividendManager:
             return None
         
         if format == 'excel':
-            with pd.ExcelWriter(filepath, engine='openpyxl') as writer:
-                # Hoja 1: Detalle
-                df.to_excel(writer, sheet_name='Detalle', index=False)
-                
-                # Hoja 2: Por activo
-                by_asset = self.get_dividends_by_asset(year=year)
-                if not by_asset.empty:
-                    by_asset.to_excel(writer, sheet_name='Por Activo', index=False)
-                
-                # Hoja 3: Calendario
-                if year:
-                    calendar = self.get_dividend_calendar(year)
-                    calendar.to_excel(writer, sheet_name='Calendario', index=False)
-                
-                # Hoja 4: Resumen
-                totals = self.get_total_dividends(year=year)
-                summary_df = pd.DataFrame([totals])
-                summary_df.to_excel(writer, sheet_name='Resumen', index=False)
+            self._write_dividends_excel(filepath, df, year)
         else:
             df.to_csv(filepath, index=False)
         
         print(f"✅ Dividendos exportados a: {filepath}")
         return str(filepath)
     
+    def export_dividends_bytes(self, year: int = None) -> Optional[bytes]:
+        """
+        Genera el Excel de dividendos en memoria (sin escribir en disco).
+        
+        Args:
+            year: Año específico (None = todo)
+        
+        Returns:
+            Contenido del fichero .xlsx, o None si no hay dividendos
+        """
+        df = self.get_dividends(year=year)
+        
+        if df.empty:
+            return None
+        
+        buffer = io.BytesIO()
+        self._write_dividends_excel(buffer, df, year)
+        return buffer.getvalue()
+    
+    def _write_dividends_excel(self, target, df: pd.DataFrame, year: int = None):
+        """Escribe las hojas del Excel de dividendos en una ruta o buffer"""
+        with pd.ExcelWriter(target, engine='openpyxl') as writer:
+            # Hoja 1: Detalle
+            df.to_excel(writer, sheet_name='Detalle', index=False)
+            
+            # Hoja 2: Por activo
+            by_asset = self.get_dividends_by_asset(year=year)
+            if not by_asset.empty:
+                by_asset.to_excel(writer, sheet_name='Por Activo', index=False)
+            
+            # Hoja 3: Calendario
+            if year:
+                calendar = self.get_dividend_calendar(year)
+                calendar.to_excel(writer, sheet_name='Calendario', index=False)
+            
+            # Hoja 4: Resumen
+            totals = self.get_total_dividends(year=year)
+            summary_df = pd.DataFrame([totals])
+            summary_df.to_excel(writer, sheet_name='Resumen', index=False)
+    
     # =========================================================================
     # FUNCIONES DE CONVENIENCIA (PRINT)
     # =========================================================================
@@ -14,8 +14,9 @@ Fecha: Enero 2026
 
 import pandas as pd
 import numpy as np
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Tuple
+from typing import Callable, Dict, List, Optional, Tuple
 from pathlib import Path
 import warnings
 
@@ -276,14 +277,23 @@ class MarketDataManager:
     def download_portfolio_prices(self,
                                   start_date: str,
                                   end_date: str = None,
-                                  tickers: List[str] = None) -> Dict[str, int]:
+                                  tickers: List[str] = None,
+                                  max_workers: int = 8,
+                                  progress_callback: Callable[[int, int, str], None] = None) -> Dict[str, int]:
         """
         Descarga precios históricos de todos los activos de la cartera.
         
+        Las descargas (red) se lanzan en paralelo con un pool de hilos; el
+        guardado en base de datos se hace en el hilo llamante, ya que la
+        sesión de SQLAlchemy no es thread-safe.
+        
         Args:
             start_date: Fecha inicio
             end_date: Fecha fin
             tickers: Lista específica de tickers (si None, usa todos de la cartera)
+            max_workers: Máximo de descargas simultáneas (1 = secuencial)
+            progress_callback: Función (completados, total, ticker) llamada
+                               al terminar cada ticker
         
         Returns:
             Dict con {ticker: num_registros_descargados}
@@ -293,18 +303,32 @@ class MarketDataManager:
             tickers = [t['ticker'] for t in portfolio_tickers]
         
         results = {}
-        
-        for ticker in tickers:
-            print(f"📥 Descargando {ticker}...")
-            df = self.download_ticker_prices(ticker, start_date, end_date)
-            results[ticker] = len(df)
+        if not tickers:
+            return results
+        
+        workers = max(1, min(max_workers, len(tickers)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(self.download_ticker_prices, ticker, start_date, end_date, False): ticker
+                for ticker in tickers
+            }
             
-            if len(df) > 0:
-                print(f"   ✅ {len(df)} registros")
-            else:
-                print(f"   ⚠️ Sin datos")
+            for done, future in enumerate(as_completed(futures), start=1):
+                ticker = futures[future]
+                df = future.result()
+                results[ticker] = len(df)
+                
+                if len(df) > 0:
+                    self._save_prices_to_db(ticker, df)
+                    print(f"📥 {ticker}: ✅ {len(df)} registros")
+                else:
+                    print(f"📥 {ticker}: ⚠️ Sin datos")
+                
+                if progress_callback:
+                    progress_callback(done, len(tickers), ticker)
         
-        return results
+        # Mantener el orden de entrada en el resultado
+        return {ticker: results[ticker] for ticker in tickers}
     
     def get_ticker_prices(self,
                          ticker: str,
@@ -321,15 +345,16 @@ class MarketDataManager:
         Returns:
             DataFrame con precios
         """
-        # 1. Intentar cache en memoria
+        # 1. Intentar cache en memoria (el filtrado por fechas ya crea un
+        #    DataFrame nuevo; solo se copia si se devuelve el de la cache)
         if ticker in self._price_cache:
-            df = self._price_cache[ticker].copy()
+            df = self._price_cache[ticker]
             if start_date:
                 df = df[df['date'] >= pd.to_datetime(start_date)]
             if end_date:
                 df = df[df['date'] <= pd.to_datetime(end_date)]
             if not df.empty:
-                return df
+                return df if (start_date or end_date) else df.copy()
         
         # 2. Intentar base de datos
         db_prices = self.db.get_asset_prices(ticker, start_date, end_date)
@@ -356,7 +381,8 @@ class MarketDataManager:
     def get_portfolio_market_value_series(self,
                                           start_date: str,
                                           end_date: str = None,
-                                          include_closed: bool = True) -> pd.DataFrame:
+                                          include_closed: bool = True,
+                                          only_with_market_prices: bool = False) -> pd.DataFrame:
         """
         Calcula el valor de mercado REAL de la cartera en cada fecha.
         
@@ -366,6 +392,8 @@ class MarketDataManager:
             start_date: Fecha inicio
             end_date: Fecha fin (si None, usa hoy)
             include_closed: Si incluir ganancias/pérdidas de posiciones cerradas
+            only_with_market_prices: Si omitir los días sin ningún precio real
+                                     de mercado (valorados solo a coste)
         
         Returns:
             DataFrame con columnas:
@@ -373,6 +401,7 @@ class MarketDataManager:
             - market_value: Valor de mercado de posiciones abiertas
             - cost_basis: Coste de adquisición
             - unrealized_pnl: Ganancia/pérdida latente
+            - return_pct: Rendimiento % sobre coste (0 si no hay coste)
             - realized_pnl: Ganancia/pérdida realizada (si include_closed)
             - total_value: market_value + realized_pnl (si include_closed)
         """
@@ -491,6 +520,9 @@ class MarketDataManager:
                         # Sin datos de precio, usar coste
                         market_value += pos['cost']
             
+            if only_with_market_prices and not has_real_prices:
+                continue
+
             # Solo incluir si hay posiciones
             if cost_basis > 0 or (include_closed and realized_pnl != 0):
                 unrealized_pnl = market_value - cost_basis
@@ -500,6 +532,7 @@ class MarketDataManager:
                     'market_value': round(market_value, 2),
                     'cost_basis': round(cost_basis, 2),
                     'unrealized_pnl': round(unrealized_pnl, 2),
+                    'return_pct': round((market_value / cost_basis - 1) * 100, 2) if cost_basis > 0 else 0,
                     'has_market_prices': has_real_prices  # True si hay precios reales de mercado
                 }
 
@@ -555,7 +588,8 @@ class MarketDataManager:
     
     def get_open_positions_only_series(self,
                                        start_date: str,
-                                       end_date: str = None) -> pd.DataFrame:
+                                       end_date: str = None,
+                                       only_with_market_prices: bool = False) -> pd.DataFrame:
         """
         Calcula SOLO el valor de las posiciones actualmente abiertas.
         
@@ -565,6 +599,8 @@ class MarketDataManager:
         Args:
             start_date: Fecha inicio
             end_date: Fecha fin
+            only_with_market_prices: Si omitir los días sin ningún precio real
+                                     de mercado (valorados solo a coste)
         
         Returns:
             DataFrame con valor de mercado de posiciones actuales
@@ -681,6 +717,9 @@ class MarketDataManager:
                     else:
                         market_value += p['cost']
 
+            if only_with_market_prices and not has_real_prices:
+                continue
+
             if cost_basis > 0:
                 results.append({
                     'date': current_date,
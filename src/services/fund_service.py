@@ -46,6 +46,10 @@ except ImportError:
 
 logger = get_logger(__name__)
 
+# Etiquetas precalculadas para formatear columnas sin construir strings por fila
+_RATING_STARS = {n: "★" * n for n in range(6)}
+_RISK_LABELS = {n: f"{n}/7" for n in FUND_RISK_LEVELS}
+
 
 class FundService(BaseService):
     """
@@ -352,17 +356,8 @@ class FundService(BaseService):
             - top_managers
             - avg_ter
         """
-        stats = self.repository.get_stats()
-
-        # Calcular TER promedio
-        funds = self.repository.get_all()
-        if funds:
-            ters = [f.ter for f in funds if f.ter is not None]
-            stats['avg_ter'] = sum(ters) / len(ters) if ters else 0
-        else:
-            stats['avg_ter'] = 0
-
-        return stats
+        # get_stats ya incluye el TER medio (AVG en la misma consulta)
+        return self.repository.get_stats()
 
     def get_filter_options(self) -> Dict[str, List]:
         """
@@ -381,6 +376,8 @@ class FundService(BaseService):
 
     def count_funds(self, **filters) -> int:
         """Cuenta fondos que cumplen los filtros."""
+        if not filters:
+            return self.repository.count()
         funds = self.search_funds(**filters)
         return len(funds)
 
@@ -465,14 +462,10 @@ class FundService(BaseService):
             )
 
         if 'Rating' in formatted.columns:
-            formatted['Rating'] = formatted['Rating'].apply(
-                lambda x: "★" * int(x) if pd.notna(x) else "-"
-            )
+            formatted['Rating'] = formatted['Rating'].map(_RATING_STARS).fillna("-")
 
         if 'Riesgo' in formatted.columns:
-            formatted['Riesgo'] = formatted['Riesgo'].apply(
-                lambda x: f"{int(x)}/7" if pd.notna(x) else "-"
-            )
+            formatted['Riesgo'] = formatted['Riesgo'].map(_RISK_LABELS).fillna("-")
 
         return formatted
 
@@ -529,6 +522,28 @@ class FundService(BaseService):
 
         return fund
 
+    def import_fund_from_preview(
+        self,
+        preview: Dict[str, Any],
+        custom_category: Optional[str] = None
+    ) -> Fund:
+        """
+        Guarda en BD un fondo a partir de un preview ya obtenido.
+
+        Evita volver a consultar Morningstar cuando el usuario ya ha visto
+        la ficha con fetch_fund_preview().
+
+        Args:
+            preview: Dict devuelto por fetch_fund_preview()
+            custom_category: Categoria personalizada (se guarda en la misma escritura)
+
+        Returns:
+            Fund guardado en BD
+        """
+        fund = self.repository.upsert_from_provider(preview, custom_category=custom_category)
+        logger.info(f"Fondo importado desde preview: {fund.isin} - {fund.name}")
+        return fund
+
     def get_fund_nav_history(self, isin: str, years: int = 3) -> pd.DataFrame:
         """
         Obtiene historico de NAV desde Morningstar.
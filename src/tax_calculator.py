@@ -21,6 +21,7 @@ Autor: Investment Tracker Project
 Fecha: Enero 2026
 """
 
+import io
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
@@ -54,6 +55,22 @@ TRAMOS_IRPF_AHORRO = [
 # Período de la regla antiaplicación (wash sale rule)
 WASH_SALE_DAYS = 60  # 2 meses = ~60 días
 
+# Columnas y tipos de los lotes cuando se piden como DataFrame
+LOT_COLUMNS = [
+    'date', 'quantity', 'original_quantity', 'price', 'cost', 'name',
+    'is_transfer', 'original_purchase_date', 'days_held'
+]
+LOT_DTYPES = {
+    'date': 'datetime64[ns]',
+    'quantity': 'float64',
+    'original_quantity': 'float64',
+    'price': 'float64',
+    'cost': 'float64',
+    'is_transfer': 'bool',
+    'original_purchase_date': 'datetime64[ns]',
+    'days_held': 'int64'
+}
+
 
 class TaxCalculator:
     """
@@ -105,7 +122,7 @@ class TaxCalculator:
     # GESTIÓN DE LOTES
     # =========================================================================
     
-    def get_available_lots(self, ticker: str) -> List[Dict]:
+    def get_available_lots(self, ticker: str, as_dataframe: bool = False) -> Union[List[Dict], pd.DataFrame]:
         """
         Obtiene los lotes de compra disponibles (no vendidos) de un ticker.
         
@@ -117,6 +134,7 @@ class TaxCalculator:
         
         Args:
             ticker: Símbolo del activo
+            as_dataframe: Si True, devuelve un DataFrame tipado (fechas datetime64)
         
         Returns:
             Lista de lotes disponibles, cada uno con:
@@ -132,7 +150,7 @@ class TaxCalculator:
         transactions = self.db.get_transactions(ticker=ticker)
         
         if not transactions:
-            return []
+            return pd.DataFrame(columns=LOT_COLUMNS).astype(LOT_DTYPES) if as_dataframe else []
         
         # Convertir a lista de dicts y ordenar por fecha
         trans_list = []
@@ -249,10 +267,16 @@ class TaxCalculator:
                     original_date = datetime.strptime(original_date, '%Y-%m-%d')
                 
                 lot['days_held'] = (today - original_date).days
-                lot['date'] = lot['date'].strftime('%Y-%m-%d') if isinstance(lot['date'], datetime) else lot['date']
-                lot['original_purchase_date'] = original_date.strftime('%Y-%m-%d') if isinstance(original_date, datetime) else original_date
+                lot['original_purchase_date'] = original_date
                 available_lots.append(lot)
         
+        if as_dataframe:
+            return pd.DataFrame(available_lots, columns=LOT_COLUMNS).astype(LOT_DTYPES)
+        
+        for lot in available_lots:
+            lot['date'] = lot['date'].strftime('%Y-%m-%d') if isinstance(lot['date'], datetime) else lot['date']
+            lot['original_purchase_date'] = lot['original_purchase_date'].strftime('%Y-%m-%d')
+        
         return available_lots
     
     def _extract_cost_basis_from_notes(self, notes: str, quantity: float, price: float) -> float:
@@ -988,6 +1012,31 @@ class TaxCalculator:
         filepath = Path(filepath)
         filepath.parent.mkdir(parents=True, exist_ok=True)
         
+        self._write_fiscal_report(filepath, year, include_lots)
+        
+        print(f"✅ Informe fiscal exportado a: {filepath}")
+        return str(filepath)
+    
+    def export_fiscal_report_bytes(self, year: int, include_lots: bool = True) -> bytes:
+        """
+        Genera el informe fiscal en memoria (sin escribir en disco).
+        
+        Mismo contenido que export_fiscal_report(); pensado para pasarlo
+        directamente a st.download_button.
+        
+        Args:
+            year: Año fiscal
+            include_lots: Si incluir hoja con detalle de lotes
+        
+        Returns:
+            Contenido del fichero .xlsx
+        """
+        buffer = io.BytesIO()
+        self._write_fiscal_report(buffer, year, include_lots)
+        return buffer.getvalue()
+    
+    def _write_fiscal_report(self, target, year: int, include_lots: bool = True):
+        """Escribe las hojas del informe fiscal en una ruta o buffer"""
         # Obtener datos
         summary = self.get_fiscal_year_summary(year)
         detail = self.get_fiscal_year_detail(year)
@@ -995,7 +1044,7 @@ class TaxCalculator:
         wash_sales = self.get_wash_sales_in_year(year)
         
         # Crear Excel con múltiples hojas
-        with pd.ExcelWriter(filepath, engine='openpyxl') as writer:
+        with pd.ExcelWriter(target, engine='openpyxl') as writer:
             
             # Hoja 1: Resumen
             summary_data = {
@@ -1118,9 +1167,6 @@ class TaxCalculator:
                     'tax': 'Cuota'
                 })
                 df_tax.to_excel(writer, sheet_name='Desglose Impuesto', index=False)
-        
-        print(f"✅ Informe fiscal exportado a: {filepath}")
-        return str(filepath)
     
     # =========================================================================
     # FUNCIONES DE CONVENIENCIA (PRINT)
@@ -14,6 +14,7 @@ Ejecutar:
 
 import pytest
 import os
+import pandas as pd
 import tempfile
 from pathlib import Path
 from unittest.mock import patch
@@ -116,6 +117,51 @@ class TestDatabaseStatsWithMode:
         finally:
             db.close()
 
+    def test_count_methods_sqlite(self, temp_db_path):
+        """Los conteos en SQL coinciden con las filas insertadas."""
+        db = Database(db_path=temp_db_path)
+        try:
+            assert db.count_transactions() == 0
+            assert db.count_dividends() == 0
+            assert db.count_transactions_by_type() == {}
+
+            for t_type in ('buy', 'buy', 'sell'):
+                db.add_transaction({
+                    'date': '2024-01-15',
+                    'type': t_type,
+                    'ticker': 'TEST',
+                    'quantity': 1,
+                    'price': 10.0
+                })
+            db.add_dividend({
+                'ticker': 'TEST',
+                'date': '2024-06-15',
+                'gross_amount': 1.0,
+                'net_amount': 0.81
+            })
+
+            assert db.count_transactions() == 3
+            assert db.count_dividends() == 1
+            assert db.count_transactions_by_type() == {'buy': 2, 'sell': 1}
+        finally:
+            db.close()
+
+
+class TestSqlitePragmas:
+    """Tests para los PRAGMAs aplicados a cada conexión SQLite."""
+
+    def test_read_pragmas_applied(self, temp_db_path):
+        """Cada conexión usa synchronous=NORMAL y cache de 64 MB."""
+        from sqlalchemy import text
+
+        db = Database(db_path=temp_db_path)
+        try:
+            assert db.session.execute(text('PRAGMA synchronous')).scalar() == 1
+            assert db.session.execute(text('PRAGMA cache_size')).scalar() == -65536
+            assert db.session.execute(text('PRAGMA temp_store')).scalar() == 2
+        finally:
+            db.close()
+
 
 class TestDatabaseMethodsCompatibility:
     """Tests para verificar que los métodos funcionan en modo SQLite."""
@@ -168,6 +214,53 @@ class TestDatabaseMethodsCompatibility:
         finally:
             db.close()
 
+    def test_get_tickers_summary_sqlite(self, temp_db_path):
+        """get_tickers_summary agrega por ticker en la BD."""
+        db = Database(db_path=temp_db_path)
+        try:
+            for date, t_type in (('2024-03-01', 'buy'), ('2024-01-15', 'buy'), ('2024-06-30', 'sell')):
+                db.add_transaction({
+                    'date': date,
+                    'type': t_type,
+                    'ticker': 'AAPL',
+                    'name': 'Apple',
+                    'asset_type': 'accion',
+                    'currency': 'USD',
+                    'quantity': 1,
+                    'price': 150.0
+                })
+            db.add_transaction({
+                'date': '2024-02-01',
+                'type': 'buy',
+                'ticker': 'SAN',
+                'quantity': 10,
+                'price': 4.0
+            })
+
+            summary = db.get_tickers_summary()
+
+            assert summary['ticker'].tolist() == ['AAPL', 'SAN']
+            aapl = summary.iloc[0]
+            assert aapl['name'] == 'Apple'
+            assert aapl['currency'] == 'USD'
+            assert aapl['first_date'] == pd.Timestamp('2024-01-15')
+            assert aapl['last_date'] == pd.Timestamp('2024-06-30')
+            assert aapl['n_operations'] == 3
+            assert summary.iloc[1]['n_operations'] == 1
+        finally:
+            db.close()
+
+    def test_ticker_date_index_created(self, temp_db_path):
+        """La tabla de transacciones tiene índice (ticker, date)."""
+        from sqlalchemy import inspect
+
+        db = Database(db_path=temp_db_path)
+        try:
+            indexes = inspect(db.engine).get_indexes('transactions')
+            assert any(ix['column_names'] == ['ticker', 'date'] for ix in indexes)
+        finally:
+            db.close()
+
 
 class TestDatabaseContextManager:
     """Tests para verificar que Database funciona sin context manager."""
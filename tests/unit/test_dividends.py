@@ -0,0 +1,171 @@
+"""
+Tests Unitarios para DividendManager
+
+Verifican los calculos agregados de dividendos (YOC) usando
+una BD temporal con transacciones y dividendos recientes.
+
+Ejecutar:
+    pytest tests/unit/test_dividends.py -v
+"""
+
+import pytest
+import pandas as pd
+from datetime import datetime, timedelta
+
+
+@pytest.fixture
+def dividend_manager(test_database_with_data, temp_db_path):
+    """DividendManager sobre la BD de prueba con dividendos del ultimo año."""
+    from src.dividends import DividendManager
+
+    recent = (datetime.now() - timedelta(days=30)).strftime('%Y-%m-%d')
+    test_database_with_data.add_dividend({
+        'ticker': 'TEF',
+        'name': 'Telefonica',
+        'date': recent,
+        'gross_amount': 10.0,
+        'net_amount': 8.10,
+        'currency': 'EUR'
+    })
+    test_database_with_data.add_dividend({
+        'ticker': 'SAN',
+        'name': 'Banco Santander',
+        'date': recent,
+        'gross_amount': 5.0,
+        'net_amount': 4.05,
+        'currency': 'EUR'
+    })
+
+    dm = DividendManager(db_path=temp_db_path)
+    yield dm
+    dm.close()
+
+
+class TestDividendYieldsAll:
+    """Tests para get_dividend_yields_all()."""
+
+    def test_empty_database(self, temp_db_path):
+        """Sin dividendos devuelve DataFrame vacio con columnas."""
+        from src.dividends import DividendManager
+
+        dm = DividendManager(db_path=temp_db_path)
+        result = dm.get_dividend_yields_all()
+        dm.close()
+
+        assert result.empty
+        assert 'yoc_net' in result.columns
+
+    def test_only_recent_dividends(self, dividend_manager):
+        """Solo suma dividendos del ultimo año."""
+        result = dividend_manager.get_dividend_yields_all().set_index('ticker')
+
+        assert result.loc['TEF', 'annual_dividends_gross'] == pytest.approx(10.0)
+        assert result.loc['TEF', 'payments_last_year'] == 1
+
+    def test_matches_single_ticker_yield(self, dividend_manager):
+        """Coincide con get_dividend_yield() ticker a ticker."""
+        result = dividend_manager.get_dividend_yields_all().set_index('ticker')
+
+        for ticker in ['TEF', 'SAN']:
+            single = dividend_manager.get_dividend_yield(ticker)
+            assert result.loc[ticker, 'yoc_gross'] == pytest.approx(single['yoc_gross'])
+            assert result.loc[ticker, 'yoc_net'] == pytest.approx(single['yoc_net'])
+            assert result.loc[ticker, 'cost_basis'] == pytest.approx(single['cost_basis'])
+
+    def test_excludes_tickers_without_position(self, dividend_manager, test_database_with_data):
+        """Tickers con dividendos pero sin posicion no aparecen."""
+        test_database_with_data.add_dividend({
+            'ticker': 'BBVA',
+            'date': datetime.now().strftime('%Y-%m-%d'),
+            'gross_amount': 3.0,
+            'net_amount': 2.43
+        })
+
+        result = dividend_manager.get_dividend_yields_all()
+
+        assert 'BBVA' not in result['ticker'].values
+
+    def test_zero_cost_basis_gives_nan(self, dividend_manager):
+        """Sin coste base el YOC queda a NaN en lugar de 0."""
+        positions = dividend_manager._get_current_positions()
+        positions.loc[positions['ticker'] == 'SAN', 'cost_basis'] = 0
+
+        result = dividend_manager.get_dividend_yields_all(positions=positions).set_index('ticker')
+
+        assert pd.isna(result.loc['SAN', 'yoc_net'])
+        assert result.loc['TEF', 'yoc_net'] > 0
+
+    def test_reuses_given_positions(self, dividend_manager):
+        """Con positions precalculadas no vuelve a calcular la cartera."""
+        positions = dividend_manager._get_current_positions()
+        dividend_manager._get_current_positions = None  # fallaria si se llamase
+
+        result = dividend_manager.get_dividend_yields_all(positions=positions)
+        portfolio = dividend_manager.get_portfolio_yield(positions=positions)
+
+        assert set(result['ticker']) == {'TEF', 'SAN'}
+        assert portfolio['total_positions'] == len(positions)
+
+
+class TestDividendsDataFrame:
+    """Tests para get_dividends_df()."""
+
+    def test_returns_parsed_dates(self, dividend_manager):
+        """La columna date llega como datetime sin conversion posterior."""
+        df = dividend_manager.get_dividends_df()
+
+        assert pd.api.types.is_datetime64_any_dtype(df['date'])
+        assert df['date'].is_monotonic_decreasing
+
+    def test_filters_by_year_and_ticker(self, dividend_manager):
+        """Aplica los mismos filtros que get_dividends()."""
+        df = dividend_manager.get_dividends_df(ticker='tef', year=2024)
+
+        assert list(df['ticker']) == ['TEF']
+        assert df['gross_amount'].iloc[0] == pytest.approx(15.0)
+
+    def test_year_filter_includes_bounds(self, dividend_manager, test_database_with_data):
+        """El filtro por año en SQL incluye el 1 de enero y el 31 de diciembre."""
+        for day in ['2023-12-31', '2024-01-01', '2024-12-31', '2025-01-01']:
+            test_database_with_data.add_dividend({
+                'ticker': 'TEF',
+                'date': day,
+                'gross_amount': 1.0,
+                'net_amount': 0.81
+            })
+
+        dates = dividend_manager.get_dividends_df(year=2024)['date'].dt.strftime('%Y-%m-%d')
+
+        assert '2024-01-01' in dates.values
+        assert '2024-12-31' in dates.values
+        assert '2023-12-31' not in dates.values
+        assert '2025-01-01' not in dates.values
+
+    def test_empty_keeps_columns(self, temp_db_path):
+        """Sin resultados devuelve DataFrame vacio con columnas."""
+        from src.dividends import DividendManager
+
+        dm = DividendManager(db_path=temp_db_path)
+        df = dm.get_dividends_df(year=1999)
+        dm.close()
+
+        assert df.empty
+        assert 'net_amount' in df.columns
+
+
+class TestExportDividends:
+    """Tests para export_dividends_bytes()."""
+
+    def test_bytes_is_valid_excel(self, dividend_manager):
+        """Genera un Excel legible con las hojas esperadas."""
+        import io
+
+        data = dividend_manager.export_dividends_bytes(year=2024)
+        sheets = pd.read_excel(io.BytesIO(data), sheet_name=None)
+
+        assert {'Detalle', 'Por Activo', 'Calendario', 'Resumen'} <= set(sheets)
+        assert len(sheets['Detalle']) == 2
+
+    def test_no_dividends_returns_none(self, dividend_manager):
+        """Sin dividendos en el año devuelve None."""
+        assert dividend_manager.export_dividends_bytes(year=1999) is None
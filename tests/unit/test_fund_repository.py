@@ -279,6 +279,21 @@ class TestFundRepositoryCRUD:
         assert result is False
 
 
+    def test_set_custom_category(self, fund_repository, sample_fund_data):
+        """set_custom_category asigna y quita la categoria personalizada."""
+        fund_repository.add(Fund(**sample_fund_data))
+
+        assert fund_repository.set_custom_category('ES0114105036', 'RV Global') is True
+        assert fund_repository.get_by_isin('ES0114105036').custom_category == 'RV Global'
+
+        assert fund_repository.set_custom_category('ES0114105036', None) is True
+        assert fund_repository.get_by_isin('ES0114105036').custom_category is None
+
+    def test_set_custom_category_nonexistent(self, fund_repository):
+        """set_custom_category con ISIN inexistente devuelve False."""
+        assert fund_repository.set_custom_category('XX0000000000', 'RV Global') is False
+
+
 class TestFundRepositorySearch:
     """Tests para metodos de busqueda."""
 
@@ -398,6 +413,24 @@ class TestFundRepositoryHelpers:
         assert 'by_risk_level' in stats
         assert stats['by_category']['Renta Variable'] == 3
 
+    def test_get_stats_single_query_aggregates(self, fund_repository_with_data):
+        """get_stats reparte los agregados de la consulta unica."""
+        stats = fund_repository_with_data.get_stats()
+
+        assert stats['by_risk_level'] == {5: 2, 6: 1, 2: 1, 4: 1}
+        assert stats['num_categories'] == 3
+        assert stats['num_managers'] == 5
+        assert len(stats['top_managers']) == 5
+        assert stats['avg_ter'] == pytest.approx((1.78 + 1.89 + 0.22 + 0.85 + 1.45) / 5)
+
+    def test_get_stats_empty_catalog(self, fund_repository):
+        """get_stats con catalogo vacio devuelve ceros."""
+        stats = fund_repository.get_stats()
+
+        assert stats['total_funds'] == 0
+        assert stats['by_category'] == {}
+        assert stats['avg_ter'] == 0
+
 
 class TestFundRepositoryUpsert:
     """Tests para operaciones upsert."""
@@ -268,6 +268,17 @@ class TestFundServiceDataFrame:
         # TER formateado
         assert '%' in str(formatted['TER %'].iloc[0])
 
+    def test_format_rating_and_risk_labels(self, fund_service):
+        """Rating y riesgo se formatean con las etiquetas precalculadas."""
+        df = pd.DataFrame({
+            'morningstar_rating': [5, 3, None],
+            'risk_level': [6, 2, None],
+        })
+        formatted = fund_service.format_funds_for_display(df)
+
+        assert formatted['Rating'].tolist() == ["★★★★★", "★★★", "-"]
+        assert formatted['Riesgo'].tolist() == ["6/7", "2/7", "-"]
+
 
 # =============================================================================
 # TESTS DE IMPORTACION
@@ -305,6 +316,35 @@ class TestFundServiceImport:
         assert updated.ter == 0.5
         assert fund_service.repository.count() == 1
 
+    def test_import_fund_from_preview(self, fund_service):
+        """import_fund_from_preview guarda el preview sin consultar Morningstar."""
+        preview = {
+            'isin': 'IE00B3RBWM25',
+            'name': 'Vanguard FTSE All-World',
+            'ter': 0.22,
+            'category_name': 'RV Global',
+            'holdings': [{'name': 'Apple', 'weight': 4.5, 'sector': 'Tech'}],
+            'allocation': {'us_equity': 60.0},
+        }
+
+        fund = fund_service.import_fund_from_preview(preview)
+
+        assert fund.isin == 'IE00B3RBWM25'
+        assert fund.morningstar_category == 'RV Global'
+        assert fund.source == 'morningstar'
+        assert fund_service.repository.count() == 1
+
+    def test_import_fund_from_preview_with_category(self, fund_service):
+        """La categoria personalizada se guarda junto al fondo."""
+        preview = {'isin': 'IE00B3RBWM25', 'name': 'Vanguard FTSE All-World'}
+
+        fund = fund_service.import_fund_from_preview(preview, custom_category='RV Global')
+        assert fund.custom_category == 'RV Global'
+
+        # Reimportar sin categoria no borra la existente
+        fund = fund_service.import_fund_from_preview(preview)
+        assert fund.custom_category == 'RV Global'
+
     def test_import_funds_bulk(self, fund_service, sample_funds_data):
         """import_funds_bulk importa multiples fondos."""
         result = fund_service.import_funds_bulk(sample_funds_data)
@@ -0,0 +1,131 @@
+"""
+Tests Unitarios para MarketDataManager
+
+Verifican la descarga de precios de la cartera sin acceder a la red
+(la descarga por ticker se sustituye en cada test).
+
+Ejecutar:
+    pytest tests/unit/test_market_data.py -v
+"""
+
+import pytest
+import pandas as pd
+
+
+def _fake_prices(days: int) -> pd.DataFrame:
+    """Precios ficticios con el formato de download_ticker_prices()."""
+    dates = pd.date_range('2024-01-01', periods=days, freq='D')
+    return pd.DataFrame({'date': dates, 'close': 10.0, 'adj_close': 10.0})
+
+
+@pytest.fixture
+def market_data_manager(test_database_with_data, temp_db_path):
+    """MarketDataManager sobre la BD de prueba."""
+    from src.market_data import MarketDataManager
+
+    mdm = MarketDataManager(db_path=temp_db_path)
+    yield mdm
+    mdm.close()
+
+
+class TestDownloadPortfolioPrices:
+    """Tests para download_portfolio_prices()."""
+
+    def test_counts_and_saves_each_ticker(self, market_data_manager, monkeypatch):
+        """Devuelve registros por ticker y guarda en BD desde el hilo llamante."""
+        sizes = {'TEF': 3, 'SAN': 0, 'BBVA': 2}
+        calls = []
+
+        def fake_download(ticker, start_date, end_date=None, save_to_db=True):
+            calls.append((ticker, save_to_db))
+            return _fake_prices(sizes[ticker])
+
+        monkeypatch.setattr(market_data_manager, 'download_ticker_prices', fake_download)
+
+        results = market_data_manager.download_portfolio_prices(
+            '2024-01-01', '2024-01-31', tickers=['TEF', 'SAN', 'BBVA']
+        )
+
+        assert results == {'TEF': 3, 'SAN': 0, 'BBVA': 2}
+        assert all(save is False for _, save in calls)
+        assert len(market_data_manager.db.get_asset_prices('TEF')) == 3
+        assert market_data_manager.db.get_asset_prices('SAN') == []
+
+    def test_progress_callback(self, market_data_manager, monkeypatch):
+        """Informa del progreso una vez por ticker."""
+        monkeypatch.setattr(
+            market_data_manager, 'download_ticker_prices',
+            lambda ticker, start_date, end_date=None, save_to_db=True: _fake_prices(1)
+        )
+        progress = []
+
+        market_data_manager.download_portfolio_prices(
+            '2024-01-01', tickers=['TEF', 'SAN'], max_workers=2,
+            progress_callback=lambda done, total, ticker: progress.append((done, total))
+        )
+
+        assert sorted(progress) == [(1, 2), (2, 2)]
+
+    def test_empty_ticker_list(self, market_data_manager):
+        """Sin tickers no lanza descargas."""
+        assert market_data_manager.download_portfolio_prices('2024-01-01', tickers=[]) == {}
+
+
+class TestMarketValueSeries:
+    """Tests para las series de valor de mercado."""
+
+    @pytest.fixture
+    def mdm_with_prices(self, market_data_manager, monkeypatch):
+        """Solo TEF tiene precios, desde el 1 de marzo de 2024."""
+        monkeypatch.setattr(
+            market_data_manager, 'download_ticker_prices',
+            lambda *args, **kwargs: pd.DataFrame()
+        )
+        for day in pd.date_range('2024-03-01', '2024-03-10'):
+            market_data_manager.db.add_asset_price(
+                ticker='TEF', date=day.strftime('%Y-%m-%d'),
+                close_price=4.5, adj_close_price=4.5
+            )
+        return market_data_manager
+
+    @pytest.mark.parametrize('method', [
+        'get_portfolio_market_value_series',
+        'get_open_positions_only_series'
+    ])
+    def test_only_with_market_prices(self, mdm_with_prices, method):
+        """Omite los días sin precios reales sin alterar el resto."""
+        series = getattr(mdm_with_prices, method)
+        full = series('2024-01-01', '2024-03-31')
+        priced = series('2024-01-01', '2024-03-31', only_with_market_prices=True)
+
+        assert priced['has_market_prices'].all()
+        assert priced['date'].min() == pd.Timestamp('2024-03-01')
+        expected = full[full['has_market_prices']].reset_index(drop=True)
+        pd.testing.assert_frame_equal(priced, expected)
+
+    @pytest.mark.parametrize('method', [
+        'get_portfolio_market_value_series',
+        'get_open_positions_only_series'
+    ])
+    def test_return_pct_over_cost(self, mdm_with_prices, method):
+        """Ambas series traen el rendimiento % sobre coste ya calculado."""
+        df = getattr(mdm_with_prices, method)('2024-01-01', '2024-03-31')
+        expected = ((df['market_value'] / df['cost_basis'] - 1) * 100).round(2)
+
+        pd.testing.assert_series_equal(df['return_pct'], expected, check_names=False)
+
+
+class TestTickerPricesCache:
+    """Tests para la cache en memoria de get_ticker_prices()."""
+
+    def test_returned_frame_does_not_alias_cache(self, market_data_manager):
+        """Modificar el resultado no altera la cache, con o sin filtro de fechas."""
+        market_data_manager._price_cache['TEF'] = _fake_prices(5)
+
+        unfiltered = market_data_manager.get_ticker_prices('TEF')
+        filtered = market_data_manager.get_ticker_prices('TEF', start_date='2024-01-03')
+        unfiltered['close'] = 0.0
+        filtered['close'] = 0.0
+
+        assert len(filtered) == 3
+        assert (market_data_manager._price_cache['TEF']['close'] == 10.0).all()
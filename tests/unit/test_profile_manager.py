@@ -162,6 +162,108 @@ class TestDuplicateProfile:
         assert profile_manager.profile_exists('Copia')
 
 
+class TestWalFiles:
+    """La BD usa WAL: copiar o mover un perfil no debe perder datos."""
+
+    def _add_dividend(self, db_path):
+        """Escribe un dividendo dejando la conexión abierta (datos en el WAL)."""
+        from src.data.database import Database
+
+        db = Database(db_path=db_path)
+        db.add_dividend({
+            'ticker': 'TEF', 'date': '2024-06-01',
+            'gross_amount': 10.0, 'net_amount': 8.1
+        })
+        return db
+
+    def _count_dividends(self, db_path):
+        from src.data.database import Database
+
+        db = Database(db_path=db_path)
+        count = len(db.get_dividends())
+        db.close()
+        return count
+
+    def test_sqlite_uses_wal(self, profile_manager):
+        """Las conexiones SQLite se abren en modo WAL."""
+        from src.data.database import Database
+        from sqlalchemy import text
+
+        db = Database(db_path=profile_manager.create_profile('Wal'))
+        mode = db.session.execute(text('PRAGMA journal_mode')).scalar()
+        db.close()
+
+        assert mode == 'wal'
+
+    def test_duplicate_includes_wal_data(self, profile_manager):
+        """La copia incluye cambios que aún estaban en el WAL."""
+        source = profile_manager.create_profile('Origen')
+        db = self._add_dividend(source)
+
+        copy_path = profile_manager.duplicate_profile('Origen', 'Copia')
+        db.close()
+
+        assert self._count_dividends(copy_path) == 1
+
+    def test_rename_keeps_wal_data(self, profile_manager, temp_profiles_dir):
+        """Renombrar vuelca el WAL y no deja ficheros auxiliares huérfanos."""
+        source = profile_manager.create_profile('Antes')
+        self._add_dividend(source).close()
+
+        profile_manager.rename_profile('Antes', 'Despues')
+
+        assert self._count_dividends(str(Path(temp_profiles_dir) / 'Despues.db')) == 1
+        assert not Path(f'{source}-wal').exists()
+
+    def _open_reader(self, db_path):
+        """Conexión con una transacción de lectura abierta (bloquea el checkpoint)."""
+        import sqlite3
+
+        reader = sqlite3.connect(db_path, isolation_level=None)
+        reader.execute('BEGIN')
+        reader.execute('SELECT COUNT(*) FROM dividends').fetchone()
+        return reader
+
+    def test_rename_refuses_with_open_reader(self, profile_manager, temp_profiles_dir, monkeypatch):
+        """Con un lector abierto el WAL no se vuelca: no se renombra ni se pierden datos."""
+        import src.core.profile_manager as pm_module
+
+        monkeypatch.setattr(pm_module, 'SQLITE_CHECKPOINT_TIMEOUT', 0.1)
+        source = profile_manager.create_profile('Antes')
+        self._add_dividend(source).close()
+        reader = self._open_reader(source)
+
+        try:
+            with pytest.raises(PermissionError):
+                profile_manager.rename_profile('Antes', 'Despues')
+        finally:
+            reader.close()
+
+        assert not (Path(temp_profiles_dir) / 'Despues.db').exists()
+        assert self._count_dividends(source) == 1
+
+        profile_manager.rename_profile('Antes', 'Despues')
+        assert self._count_dividends(str(Path(temp_profiles_dir) / 'Despues.db')) == 1
+
+    def test_delete_refuses_with_open_reader(self, profile_manager, monkeypatch):
+        """No se borra una cartera mientras otra conexión la está leyendo."""
+        import src.core.profile_manager as pm_module
+
+        monkeypatch.setattr(pm_module, 'SQLITE_CHECKPOINT_TIMEOUT', 0.1)
+        profile_manager.create_profile('Otra')
+        source = profile_manager.create_profile('Borrar')
+        self._add_dividend(source).close()
+        reader = self._open_reader(source)
+
+        try:
+            with pytest.raises(PermissionError):
+                profile_manager.delete_profile('Borrar', confirm=True)
+        finally:
+            reader.close()
+
+        assert self._count_dividends(source) == 1
+
+
 class TestGetDefaultProfile:
     """Tests para perfil por defecto."""
 
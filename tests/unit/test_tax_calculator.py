@@ -0,0 +1,80 @@
+"""
+Tests Unitarios para TaxCalculator
+
+Verifican la gestion de lotes e informes fiscales con una BD
+temporal precargada (fixture test_database_with_data).
+
+Ejecutar:
+    pytest tests/unit/test_tax_calculator.py -v
+"""
+
+import pytest
+import pandas as pd
+
+
+@pytest.fixture
+def tax_calculator(test_database_with_data, temp_db_path):
+    """TaxCalculator FIFO sobre la BD de prueba."""
+    from src.tax_calculator import TaxCalculator
+
+    tax = TaxCalculator(method='FIFO', db_path=temp_db_path)
+    yield tax
+    tax.close()
+
+
+class TestAvailableLots:
+    """Tests para get_available_lots()."""
+
+    def test_list_keeps_string_dates(self, tax_calculator):
+        """Por defecto devuelve dicts con fechas YYYY-MM-DD."""
+        lots = tax_calculator.get_available_lots('TEF')
+
+        assert len(lots) == 1
+        assert lots[0]['date'] == '2024-01-15'
+        assert lots[0]['quantity'] == pytest.approx(50)
+
+    def test_dataframe_has_typed_columns(self, tax_calculator):
+        """Con as_dataframe las fechas ya son datetime64."""
+        lots_df = tax_calculator.get_available_lots('TEF', as_dataframe=True)
+
+        assert len(lots_df) == 1
+        assert pd.api.types.is_datetime64_any_dtype(lots_df['date'])
+        assert lots_df['date'].iloc[0] == pd.Timestamp('2024-01-15')
+        assert lots_df['cost'].iloc[0] == pytest.approx(200.0)
+
+    def test_dataframe_unknown_ticker(self, tax_calculator):
+        """Ticker sin transacciones devuelve DataFrame vacio con columnas."""
+        lots_df = tax_calculator.get_available_lots('XXX', as_dataframe=True)
+
+        assert lots_df.empty
+        assert 'price' in lots_df.columns
+
+
+class TestExportFiscalReport:
+    """Tests para la exportacion del informe fiscal."""
+
+    def test_bytes_is_valid_excel(self, tax_calculator, fiscal_year):
+        """El informe en memoria se puede leer como Excel."""
+        import io
+
+        data = tax_calculator.export_fiscal_report_bytes(fiscal_year)
+        sheets = pd.read_excel(io.BytesIO(data), sheet_name=None)
+
+        assert isinstance(data, bytes)
+        assert 'Resumen' in sheets
+        assert 'Detalle Ventas' in sheets
+
+    def test_bytes_matches_file_export(self, tax_calculator, fiscal_year, tmp_path):
+        """Mismas hojas que el informe escrito en disco."""
+        import io
+
+        filepath = tax_calculator.export_fiscal_report(
+            fiscal_year, filepath=str(tmp_path / 'informe.xlsx')
+        )
+        from_file = pd.read_excel(filepath, sheet_name=None)
+        from_bytes = pd.read_excel(
+            io.BytesIO(tax_calculator.export_fiscal_report_bytes(fiscal_year)),
+            sheet_name=None
+        )
+
+        assert list(from_file) == list(from_bytes)